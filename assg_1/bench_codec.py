@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: encode/decode cost of the RPC codecs across payload sizes.
+
+Two payload shapes are measured:
+  numbers - a list of integers (both codecs can carry it)
+  blob    - raw bytes; JSON needs base64, bin1 sends them inline below
+            the out-of-band threshold and as a separate buffer above it
+
+Times cover building the full frame (encode) and decoding it back from the
+frame bytes (decode), so the JSON/base64 and out-of-band paths pay their
+real costs.
+
+Usage:
+  python3 bench_codec.py [--sizes 64,1024,65536,1048576,16777216]
+"""
+
+import argparse
+import base64
+import os
+import time
+
+from protocol import CODECS, FRAME, BUFLEN, encode_frame
+
+JSON, BIN = CODECS["json"], CODECS["bin1"]
+
+
+def decode_frame(chunks, codec):
+    """Decode a frame from the chunks encode_frame produced, as a receiver would."""
+    head = chunks[0]
+    length, nbuf = FRAME.unpack_from(head, 0)
+    sizes = [BUFLEN.unpack_from(head, FRAME.size + i * BUFLEN.size)[0] for i in range(nbuf)]
+    start = FRAME.size + nbuf * BUFLEN.size
+    payload = memoryview(head)[start:start + length]
+    return codec.decode(payload, [memoryview(c) for c in chunks[1:]] if sizes else [])
+
+
+def timeit(fn, budget=0.5):
+    """Return the mean seconds per call of fn, repeating for about `budget` seconds."""
+    fn()
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / runs
+
+
+def row(shape, size, label, message, codec):
+    chunks = encode_frame(message, codec)
+    wire = sum(len(c) for c in chunks)
+    enc = timeit(lambda: encode_frame(message, codec))
+    dec = timeit(lambda: decode_frame(chunks, codec))
+    print(f"{shape:<8} {size:>10} {label:<12} {wire:>12} {enc * 1e6:>12.1f} {dec * 1e6:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPC codec benchmark")
+    parser.add_argument("--sizes", default="64,1024,65536,1048576,16777216",
+                        help="Comma-separated payload sizes in bytes")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    print(f"{'shape':<8} {'size':>10} {'codec':<12} {'wire bytes':>12} {'encode us':>12} {'decode us':>12}")
+    print("-" * 72)
+    for size in sizes:
+        numbers = list(range(size // 8))
+        row("numbers", size, "json", {"params": {"x": numbers}}, JSON)
+        row("numbers", size, "bin1", {"params": {"x": numbers}}, BIN)
+
+    for size in sizes:
+        blob = os.urandom(size)
+        row("blob", size, "json+base64", {"params": {"x": base64.b64encode(blob).decode('ascii')}}, JSON)
+        inline = BIN.oob_threshold
+        BIN.oob_threshold = size + 1
+        row("blob", size, "bin1 inline", {"params": {"x": blob}}, BIN)
+        BIN.oob_threshold = inline
+        if size >= BIN.oob_threshold:
+            row("blob", size, "bin1 oob", {"params": {"x": blob}}, BIN)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tail latency across several local servers when some are slow.
+
+Starts --servers local servers; the last --slow-servers of them delay a
+fraction of their calls (--slow-prob) by 2 x --slow-delay. Then runs the
+same sequential workload three ways and prints p50/p99:
+
+  random      - a random server per call, no hedging
+  p2c         - power of two choices on observed latency, no hedging
+  p2c+hedge   - p2c plus a hedged duplicate after the current p95
+
+Usage:
+  python3 bench_hedge.py [--calls 2000] [--slow-delay 0.05] [--slow-prob 0.3]
+  python3 bench_hedge.py --slow-servers 3 --slow-prob 0.05
+
+With one slow server, p2c alone learns to avoid it. When every server is
+occasionally slow there is nothing to avoid, and hedging is what keeps
+p99 flat.
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+
+import client
+
+BASE_PORT = 5600
+
+
+def start_servers(count, slow_count, slow_delay, slow_prob):
+    procs = []
+    for i in range(count):
+        args = [sys.executable, "server.py", "--port", str(BASE_PORT + i), "--quiet", "--delay", "0"]
+        if i >= count - slow_count:
+            args += ["--delay", str(slow_delay), "--delay-prob", str(slow_prob)]
+        procs.append(subprocess.Popen(args))
+    time.sleep(1.0)
+    return procs
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def run(label, call, calls):
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        assert call("add", {"a": i, "b": 1}) == i + 1
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label:<12} p50={percentile(latencies, 50) * 1000:7.2f}ms  "
+          f"p99={percentile(latencies, 99) * 1000:7.2f}ms  max={latencies[-1] * 1000:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load balancing / hedging benchmark")
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--slow-servers", type=int, default=1)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--slow-prob", type=float, default=0.3)
+    args = parser.parse_args()
+
+    client.VERBOSE = False
+    procs = start_servers(args.servers, args.slow_servers, args.slow_delay, args.slow_prob)
+    servers = [f"127.0.0.1:{BASE_PORT + i}" for i in range(args.servers)]
+    try:
+        pools = [client.ConnectionPool("127.0.0.1", BASE_PORT + i) for i in range(args.servers)]
+        run("random", lambda m, p: client.pooled_call(random.choice(pools), m, p), args.calls)
+
+        p2c = client.ClusterClient(servers, hedge=False)
+        run("p2c", p2c.call, args.calls)
+
+        hedged = client.ClusterClient(servers, hedge=True)
+        run("p2c+hedge", hedged.call, args.calls)
+        print(f"hedges sent={hedged.hedges_sent} won={hedged.hedges_won}")
+
+        for c in [p2c, hedged]:
+            c.close()
+        for pool in pools:
+            pool.close()
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: calls/sec with a fresh TCP connection per call vs. a pooled,
+multiplexed framed connection, plus a batched fan-out via call_many.
+
+Starts the server in-process on a free local port with the artificial
+delay disabled, then drives it from several client threads.
+
+Usage:
+  python3 bench_rpc.py [--calls 2000] [--threads 8] [--fanout 1000]
+"""
+
+import argparse
+import threading
+import time
+
+import client
+import server
+
+
+def start_server():
+    """Run the RPC server in a background thread and return its port."""
+    server.ARTIFICIAL_DELAY = 0
+    server.VERBOSE = False
+    bound = threading.Event()
+    ports = []
+
+    def on_listen(port):
+        ports.append(port)
+        bound.set()
+
+    threading.Thread(target=server.serve, args=("127.0.0.1", 0, on_listen), daemon=True).start()
+    bound.wait()
+    return ports[0]
+
+
+def run(label, call, calls, threads):
+    """Split `calls` across `threads` workers and print throughput."""
+    per_thread = calls // threads
+
+    def worker():
+        for i in range(per_thread):
+            assert call("add", {"a": i, "b": 1}) == i + 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    total = per_thread * threads
+    print(f"{label:<28} {total:>7} calls  {elapsed:>7.2f}s  {total / elapsed:>10.0f} calls/sec")
+
+
+def run_fanout(pool, fanout, batch_size):
+    """Issue `fanout` add calls through call_many and wait for all of them."""
+    calls = [("add", {"a": i, "b": 1}) for i in range(fanout)]
+    start = time.perf_counter()
+    futures = client.call_many(pool, calls, batch_size=batch_size)
+    results = [f.result(timeout=30) for f in futures]
+    elapsed = time.perf_counter() - start
+    assert results == [i + 1 for i in range(fanout)]
+    frames = -(-fanout // batch_size)
+    print(f"{'call_many fan-out':<28} {fanout:>7} calls  {elapsed:>7.2f}s  "
+          f"{fanout / elapsed:>10.0f} calls/sec  ({frames} request frames)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPC connection pooling benchmark")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--fanout", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=client.BATCH_SIZE)
+    args = parser.parse_args()
+
+    port = start_server()
+    client.VERBOSE = False
+    client.SERVER_PORT = port
+
+    run("connection per call", lambda m, p: client.rpc_call("127.0.0.1", m, p), args.calls, args.threads)
+
+    pool = client.ConnectionPool("127.0.0.1", port)
+    run("pooled framed connections", lambda m, p: client.pooled_call(pool, m, p), args.calls, args.threads)
+    run_fanout(pool, args.fanout, args.batch_size)
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,73 +4,453 @@ import uuid
 import time
 import datetime
 import sys
+import random
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeout, wait
+
+from protocol import CODECS, MAGIC, RECV_CHUNK, recv_message, send_message
 
 DEFAULT_SERVER_HOST = '44.200.84.170'
 SERVER_PORT = 5000
 TIMEOUT = 2
 MAX_RETRIES = 3
+BACKOFF_BASE = 0.1
+BACKOFF_MAX = 2.0
+BATCH_SIZE = 500
+# Multi-server client: latency tracking and hedging
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 200
+HEDGE_DEFAULT = 0.05
+HEDGE_MIN = 0.002
+HEDGE_MIN_SAMPLES = 20
+POOL_SIZE = 4
+# Codecs offered in the framed handshake, most preferred first
+CODEC_PREFERENCE = ["json"]
+VERBOSE = True
 
 def log(message):
+    if not VERBOSE:
+        return
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] {message}")
 
-def rpc_call(server_host, method, params, retry_count=0):
-    request_id = str(uuid.uuid4())
-    request = {
-        "request_id": request_id,
+class RPCConnection:
+    """One persistent framed connection carrying many concurrent requests.
+
+    A reader thread resolves pending futures by request_id, so responses
+    may arrive in any order.
+    """
+
+    def __init__(self, host, port=SERVER_PORT, timeout=TIMEOUT, codecs=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.sendall(MAGIC)
+        send_message(self.sock, {"hello": {"codecs": codecs or CODEC_PREFERENCE}})
+        reply = recv_message(self.sock)
+        if reply is None or reply.get("codec") not in CODECS:
+            self.sock.close()
+            raise ConnectionError(f"codec negotiation failed: {reply}")
+        self.codec = CODECS[reply["codec"]]
+        self.sock.settimeout(None)
+        self.send_lock = threading.Lock()
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self):
+        error = ConnectionError("connection closed")
+        try:
+            while True:
+                response = recv_message(self.sock, self.codec)
+                if response is None:
+                    break
+                for item in response.get("batch", [response]):
+                    with self.pending_lock:
+                        future = self.pending.pop(item.get("request_id"), None)
+                    if future is not None:
+                        future.set_result(item)
+        except Exception as e:
+            error = e
+        self._fail_all(error)
+
+    def _fail_all(self, error):
+        self.closed = True
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def submit(self, request):
+        """Send a request and return a Future resolving to the raw response dict."""
+        return self._send(request, [request])[0]
+
+    def submit_batch(self, requests):
+        """Send several requests in one frame; returns one Future per request."""
+        return self._send({"batch": requests}, requests)
+
+    def _send(self, message, requests):
+        futures = [Future() for _ in requests]
+        with self.pending_lock:
+            if self.closed:
+                raise ConnectionError("connection closed")
+            for request, future in zip(requests, futures):
+                self.pending[request["request_id"]] = future
+        try:
+            with self.send_lock:
+                send_message(self.sock, message, self.codec)
+        except OSError as e:
+            with self.pending_lock:
+                for request in requests:
+                    self.pending.pop(request["request_id"], None)
+            self.close()
+            raise ConnectionError(str(e))
+        return futures
+
+    def cancel(self, request_id):
+        """Stop waiting for a request, e.g. after a client-side timeout.
+
+        Returns its Future if it was still pending (it will not be resolved
+        by the reader any more), else None.
+        """
+        with self.pending_lock:
+            return self.pending.pop(request_id, None)
+
+    def in_flight(self):
+        return len(self.pending)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+class ConnectionPool:
+    """Up to `size` persistent connections to one server, opened lazily.
+
+    Each request goes to the least busy live connection; dead connections
+    are replaced on the next call.
+    """
+
+    def __init__(self, host, port=SERVER_PORT, size=POOL_SIZE, timeout=TIMEOUT, codecs=None):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.codecs = codecs
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            self.connections = [c for c in self.connections if not c.closed]
+            idle = [c for c in self.connections if c.in_flight() == 0]
+            if idle:
+                return idle[0]
+            if len(self.connections) < self.size:
+                conn = RPCConnection(self.host, self.port, self.timeout, self.codecs)
+                self.connections.append(conn)
+                return conn
+            return min(self.connections, key=lambda c: c.in_flight())
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+
+def _unwrap(response):
+    if response.get("status") == "OK":
+        return response["result"]
+    return f"Error: {response.get('error', 'Unknown')}"
+
+def _make_request(method, params):
+    return {
+        "request_id": str(uuid.uuid4()),
         "method": method,
         "params": params
     }
-    
-    log(f"Sending request {request_id}: {method}{params} (attempt {retry_count + 1}/{MAX_RETRIES + 1})")
-    
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(TIMEOUT)
-            s.connect((server_host, SERVER_PORT))
-            s.sendall(json.dumps(request).encode('utf-8'))
-            
-            data = s.recv(4096)
-            if not data:
-                raise Exception("No response data")
-            
-            response = json.loads(data.decode('utf-8'))
-            log(f"Received response for {request_id}: {response}")
-            
-            if response.get("status") == "OK":
-                return response["result"]
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter: up to 0.1s, 0.2s, 0.4s, ... capped at BACKOFF_MAX."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _result_future(raw):
+    """Chain a raw response Future into one that resolves to the call's result."""
+    future = Future()
+
+    def done(f):
+        if f.exception() is not None:
+            future.set_exception(f.exception())
+        else:
+            future.set_result(_unwrap(f.result()))
+
+    raw.add_done_callback(done)
+    return future
+
+def call_async(pool, method, params):
+    """Send one call without waiting; returns a Future of its result."""
+    return _result_future(pool.acquire().submit(_make_request(method, params)))
+
+def call_many(pool, calls, batch_size=BATCH_SIZE):
+    """Send (method, params) pairs in batch frames of up to batch_size calls.
+
+    The server runs each batch concurrently and answers with one frame, so
+    N calls cost about N / batch_size round trips. Returns one Future per
+    call, in call order.
+    """
+    calls = list(calls)
+    futures = []
+    for start in range(0, len(calls), batch_size):
+        requests = [_make_request(method, params) for method, params in calls[start:start + batch_size]]
+        futures.extend(_result_future(f) for f in pool.acquire().submit_batch(requests))
+    return futures
+
+def pooled_call(pool, method, params):
+    """Like rpc_call, but reuses a persistent framed connection from `pool`."""
+    request = _make_request(method, params)
+    for attempt in range(MAX_RETRIES + 1):
+        log(f"Sending request {request['request_id']}: {method}{params} (attempt {attempt + 1}/{MAX_RETRIES + 1})")
+        conn = None
+        try:
+            conn = pool.acquire()
+            response = conn.submit(request).result(timeout=pool.timeout)
+            log(f"Received response for {request['request_id']}: {response}")
+            return _unwrap(response)
+        except FutureTimeout:
+            log("Timeout waiting for response")
+            conn.cancel(request["request_id"])
+        except Exception as e:
+            log(f"Connection/error: {e}")
+        if attempt < MAX_RETRIES:
+            time.sleep(backoff_delay(attempt))
+    return "Failed after retries: no response"
+
+def rpc_call(server_host, method, params):
+    # Retries resend the same request_id so the server can recognise duplicates
+    request = _make_request(method, params)
+    request_id = request["request_id"]
+
+    for attempt in range(MAX_RETRIES + 1):
+        log(f"Sending request {request_id}: {method}{params} (attempt {attempt + 1}/{MAX_RETRIES + 1})")
+
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.settimeout(TIMEOUT)
+                s.connect((server_host, SERVER_PORT))
+                s.sendall(json.dumps(request).encode('utf-8'))
+
+                # The server closes the connection after replying, so read to EOF
+                data = bytearray()
+                while True:
+                    chunk = s.recv(RECV_CHUNK)
+                    if not chunk:
+                        break
+                    data += chunk
+                if not data:
+                    raise Exception("No response data")
+
+                response = json.loads(data.decode('utf-8'))
+                log(f"Received response for {request_id}: {response}")
+
+                return _unwrap(response)
+
+        except socket.timeout:
+            log("Timeout waiting for response")
+        except Exception as e:
+            log(f"Connection/error: {e}")
+
+        if attempt < MAX_RETRIES:
+            time.sleep(backoff_delay(attempt))
+
+    return "Failed after retries: no response"
+
+class ServerStats:
+    """Observed latency for one server: EWMA plus a window of recent samples."""
+
+    def __init__(self):
+        self.ewma = None
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.in_flight = 0
+        self.failures = 0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.ewma = seconds if self.ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+
+    def score(self):
+        """Expected wait: EWMA latency scaled by queued work; unmeasured servers go first."""
+        if self.ewma is None:
+            return 0.0
+        return self.ewma * (1 + self.in_flight)
+
+class ClusterClient:
+    """Framed RPC client over several equivalent servers.
+
+    Each call goes to the better of two randomly chosen servers (power of
+    two choices on observed latency). If it has not answered after the
+    current p95 latency, a hedged duplicate is sent to another server and
+    whichever answers first wins, so one slow server does not set the
+    tail latency.
+    """
+
+    def __init__(self, servers, hedge=True, timeout=TIMEOUT, codecs=None):
+        self.servers = [_parse_server(s) for s in servers]
+        self.pools = {s: ConnectionPool(s[0], s[1], timeout=timeout, codecs=codecs) for s in self.servers}
+        self.stats = {s: ServerStats() for s in self.servers}
+        self.hedge = hedge
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def pick(self, exclude=()):
+        candidates = [s for s in self.servers if s not in exclude]
+        if len(candidates) <= 2:
+            pair = candidates
+        else:
+            pair = random.sample(candidates, 2)
+        with self.lock:
+            return min(pair, key=lambda s: self.stats[s].score())
+
+    def hedge_delay(self):
+        """p95 of recent latencies across all servers, or HEDGE_DEFAULT until enough samples."""
+        with self.lock:
+            samples = sorted(x for st in self.stats.values() for x in st.samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT
+        return max(HEDGE_MIN, samples[int(0.95 * (len(samples) - 1))])
+
+    def _send(self, server, request):
+        """Submit request to server; returns (raw response Future, connection it went out on)."""
+        with self.lock:
+            self.stats[server].in_flight += 1
+        started = time.perf_counter()
+        try:
+            conn = self.pools[server].acquire()
+            raw = conn.submit(request)
+        except Exception:
+            self._finish(server, started, ok=False)
+            raise
+
+        def done(f):
+            self._finish(server, started, ok=f.exception() is None)
+
+        raw.add_done_callback(done)
+        return raw, conn
+
+    def _finish(self, server, started, ok):
+        with self.lock:
+            st = self.stats[server]
+            st.in_flight -= 1
+            if ok:
+                st.observe(time.perf_counter() - started)
             else:
-                return f"Error: {response.get('error', 'Unknown')}"
-                
-    except socket.timeout:
-        log("Timeout waiting for response")
-    except Exception as e:
-        log(f"Connection/error: {e}")
-    
-    if retry_count < MAX_RETRIES:
-        time.sleep(1)
-        return rpc_call(server_host, method, params, retry_count + 1)
-    else:
+                st.failures += 1
+                # Penalise failing servers so p2c steers away from them
+                st.observe(self.timeout)
+
+    def _attempt(self, request, tried):
+        """One (possibly hedged) attempt; returns the response dict or raises."""
+        primary = self.pick(exclude=tried)
+        tried.add(primary)
+        raw, conn = self._send(primary, request)
+        futures, conns = [raw], [conn]
+        deadline = time.perf_counter() + self.timeout
+
+        if self.hedge and len(self.servers) > 1:
+            wait(futures, timeout=self.hedge_delay())
+            if not futures[0].done() and len(tried) < len(self.servers):
+                backup = self.pick(exclude=tried)
+                tried.add(backup)
+                try:
+                    raw, conn = self._send(backup, request)
+                    futures.append(raw)
+                    conns.append(conn)
+                    with self.lock:
+                        self.hedges_sent += 1
+                except Exception as e:
+                    log(f"Hedge to {backup} failed: {e}")
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for f in done:
+                if f.exception() is None:
+                    if f is not futures[0]:
+                        with self.lock:
+                            self.hedges_won += 1
+                    return f.result()
+        # Give up on the stragglers: a retry reuses the request_id (maybe on the same
+        # connection), and failing them settles their servers' in_flight counts
+        error = TimeoutError("no server answered in time")
+        for f, conn in zip(futures, conns):
+            if not f.done() and conn.cancel(request["request_id"]) is f:
+                f.set_exception(error)
+        raise error
+
+    def call(self, method, params):
+        """Blocking call with load balancing, hedging and retries across servers."""
+        request = _make_request(method, params)
+        for attempt in range(MAX_RETRIES + 1):
+            tried = set()
+            try:
+                return _unwrap(self._attempt(request, tried))
+            except Exception as e:
+                log(f"Attempt {attempt + 1}/{MAX_RETRIES + 1} for {request['request_id']} failed: {e}")
+            if attempt < MAX_RETRIES:
+                time.sleep(backoff_delay(attempt))
         return "Failed after retries: no response"
 
-def main(server_host):
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+def _parse_server(server):
+    """Accept "host", "host:port" or a (host, port) tuple."""
+    if isinstance(server, tuple):
+        return server
+    host, _, port = server.rpartition(":")
+    if not host:
+        return (server, SERVER_PORT)
+    return (host, int(port))
+
+def main(server_host, pooled=False):
     log("RPC Client starting...")
     log(f"Target server: {server_host}:{SERVER_PORT}")
-    
+
+    if "," in server_host:
+        cluster = ClusterClient(server_host.split(","))
+        call = cluster.call
+    elif pooled:
+        pool = ConnectionPool(server_host)
+        call = lambda method, params: pooled_call(pool, method, params)
+    else:
+        call = lambda method, params: rpc_call(server_host, method, params)
+
     print("\n=== Calling add(5, 7) ===")
-    result1 = rpc_call(server_host, "add", {"a": 5, "b": 7})
+    result1 = call("add", {"a": 5, "b": 7})
     print(f"Result: {result1}")
-    
+
     print("\n=== Calling add(10, 20) ===")
-    result2 = rpc_call(server_host, "add", {"a": 10, "b": 20})
+    result2 = call("add", {"a": 10, "b": 20})
     print(f"Result: {result2}")
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        server_host = sys.argv[1]
+    pooled = "--pooled" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--pooled"]
+    if args:
+        server_host = args[0]
         print(f"Using server IP from command line: {server_host}")
     else:
         server_host = DEFAULT_SERVER_HOST
         print(f"Using default server IP: {server_host}")
-    
-    main(server_host)
\ No newline at end of file
+
+    main(server_host, pooled)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Load generator: many concurrent framed connections, p50/p99 latency.
+
+Opens --connections sockets to the server, each sending --requests
+sequential `add` calls, and reports latency percentiles over all calls.
+With --spawn it starts a local server (threads or asyncio engine) with the
+artificial delay disabled, so both engines can be compared.
+
+Usage:
+  python3 loadgen.py --spawn asyncio --connections 10000
+  python3 loadgen.py --spawn threads --connections 2000
+  python3 loadgen.py --host <server_ip> --port 5000 --connections 500
+"""
+
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+from protocol import MAGIC, FrameError, encode_message, read_message
+
+# Concurrent connect() calls, so the listen backlog is not overrun
+CONNECT_PARALLELISM = 256
+
+
+def raise_fd_limit(needed):
+    """Lift the soft open-file limit as far as the hard limit allows."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else needed
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, target), hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+async def client_task(host, port, requests, connect_sem, connected, start_gate, latencies, errors):
+    try:
+        async with connect_sem:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(MAGIC + encode_message({"hello": {"codecs": ["json"]}}))
+            await read_message(reader)
+    except (OSError, FrameError):
+        errors.append("connect")
+        return
+    finally:
+        connected.release()
+    await start_gate.wait()
+    try:
+        for i in range(requests):
+            request = {"request_id": str(uuid.uuid4()), "method": "add", "params": {"a": i, "b": 1}}
+            start = time.perf_counter()
+            writer.write(encode_message(request))
+            await writer.drain()
+            response = await read_message(reader)
+            if response is None or response.get("status") != "OK":
+                errors.append("response")
+                return
+            latencies.append(time.perf_counter() - start)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        writer.close()
+
+
+async def run(host, port, connections, requests):
+    connect_sem = asyncio.Semaphore(CONNECT_PARALLELISM)
+    connected = asyncio.Semaphore(0)
+    start_gate = asyncio.Event()
+    latencies, errors = [], []
+    tasks = [asyncio.create_task(client_task(host, port, requests, connect_sem, connected, start_gate,
+                                             latencies, errors))
+             for _ in range(connections)]
+
+    # Let every connection get established before the timed phase starts
+    for _ in range(connections):
+        await connected.acquire()
+
+    start = time.perf_counter()
+    start_gate.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"connections={connections} requests/conn={requests} ok={len(latencies)} errors={len(errors)}")
+    if latencies:
+        print(f"throughput={len(latencies) / elapsed:.0f} calls/sec over {elapsed:.2f}s")
+        print(f"p50={percentile(latencies, 50) * 1000:.2f}ms "
+              f"p99={percentile(latencies, 99) * 1000:.2f}ms "
+              f"max={latencies[-1] * 1000:.2f}ms")
+
+
+def spawn_server(engine, port):
+    proc = subprocess.Popen([sys.executable, "server.py", "--engine", engine, "--port", str(port),
+                             "--delay", "0", "--quiet"])
+    time.sleep(1.0)
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPC load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=5, help="Sequential calls per connection")
+    parser.add_argument("--spawn", choices=["threads", "asyncio"],
+                        help="Start a local server with this engine before the run")
+    args = parser.parse_args()
+
+    limit = raise_fd_limit(args.connections * 2 + 256)
+    if limit < args.connections + 64:
+        print(f"WARN open-file limit is {limit}; some connections will fail")
+
+    proc = spawn_server(args.spawn, args.port) if args.spawn else None
+    try:
+        asyncio.run(run(args.host, args.port, args.connections, args.requests))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Per-method RPC instrumentation: call/error counters and HDR-style latency
+histograms for queue, execution and serialization time.
+
+Histograms use log-linear buckets over integer microseconds (64 linear
+sub-buckets per power of two, so any recorded value is off by at most
+~1.6%), which keeps memory bounded no matter how many samples arrive.
+"""
+
+import threading
+
+SUB_BITS = 7  # 2**(SUB_BITS-1) = 64 linear sub-buckets per power of two
+SUB_COUNT = 1 << SUB_BITS
+HALF = SUB_COUNT >> 1
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+PHASES = ("queue", "execution", "serialization")
+
+
+class LatencyHistogram:
+    """Log-linear histogram of durations, recorded in seconds."""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _index(us):
+        if us < SUB_COUNT:
+            return us
+        shift = us.bit_length() - SUB_BITS
+        return (shift << (SUB_BITS - 1)) + (us >> shift)
+
+    @staticmethod
+    def _upper(index):
+        """Largest microsecond value that maps to this bucket."""
+        if index < SUB_COUNT:
+            return index
+        shift = index // HALF - 1
+        mantissa = index - shift * HALF
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        seconds = max(seconds, 0.0)
+        index = self._index(int(seconds * 1e6))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Return the q-quantile in seconds (bucket upper bound)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            **{f"p{q * 100:g}": self.quantile(q) for q in QUANTILES},
+        }
+
+
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.phases = {phase: LatencyHistogram() for phase in PHASES}
+
+
+class Metrics:
+    """Thread-safe registry of MethodStats keyed by method name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods = {}
+
+    def _stats(self, method):
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = self.methods[method] = MethodStats()
+        return stats
+
+    def record_call(self, method, ok, queue=None, execution=None):
+        with self.lock:
+            stats = self._stats(method)
+            stats.calls += 1
+            if not ok:
+                stats.errors += 1
+            if queue is not None:
+                stats.phases["queue"].record(queue)
+            if execution is not None:
+                stats.phases["execution"].record(execution)
+
+    def record_serialization(self, method, seconds):
+        with self.lock:
+            self._stats(method).phases["serialization"].record(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                method: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    **{phase: hist.snapshot() for phase, hist in stats.phases.items()},
+                }
+                for method, stats in self.methods.items()
+            }
+
+    def prometheus(self, extra=None):
+        """Render all metrics in the Prometheus text exposition format.
+
+        `extra` is an optional {name: value} dict of additional gauges.
+        """
+        snap = self.snapshot()
+        lines = [
+            "# HELP rpc_calls_total RPC calls handled, per method.",
+            "# TYPE rpc_calls_total counter",
+        ]
+        for method, stats in snap.items():
+            lines.append(f'rpc_calls_total{{method="{method}"}} {stats["calls"]}')
+        lines += [
+            "# HELP rpc_errors_total RPC calls that returned an ERROR status, per method.",
+            "# TYPE rpc_errors_total counter",
+        ]
+        for method, stats in snap.items():
+            lines.append(f'rpc_errors_total{{method="{method}"}} {stats["errors"]}')
+        for phase in PHASES:
+            name = f"rpc_{phase}_seconds"
+            lines += [f"# HELP {name} RPC {phase} time, per method.", f"# TYPE {name} summary"]
+            for method, stats in snap.items():
+                hist = stats[phase]
+                for q in QUANTILES:
+                    lines.append(f'{name}{{method="{method}",quantile="{q:g}"}} {hist[f"p{q * 100:g}"]:.6f}')
+                lines.append(f'{name}_sum{{method="{method}"}} {hist["sum"]:.6f}')
+                lines.append(f'{name}_count{{method="{method}"}} {hist["count"]}')
+        for name, value in (extra or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
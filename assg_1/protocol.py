@@ -0,0 +1,412 @@
+"""
+Wire helpers shared by the RPC server and client.
+
+Framed mode: the client opens a connection by sending MAGIC followed by a
+JSON hello frame {"hello": {"codecs": [...]}} listing the codecs it can
+speak, most preferred first. The server answers {"codec": name} and every
+later frame on that connection uses the chosen codec. Many requests can be
+in flight on one connection and responses are matched to requests by their
+request_id.
+
+Frame layout:
+    !II  payload length, number of out-of-band buffers
+    !Q   length of each out-of-band buffer (repeated)
+    payload
+    buffers, back to back
+
+Out-of-band buffers let large bytes-like values travel without being
+copied into the encoded payload; the receiver gets them back as
+memoryviews over a single receive buffer.
+"""
+
+import array
+import asyncio
+import json
+import struct
+import sys
+
+MAGIC = b"RPC1"
+FRAME = struct.Struct("!II")
+BUFLEN = struct.Struct("!Q")
+# Upper bound on one frame (payload + buffers); checked before anything is allocated
+MAX_FRAME = 64 * 1024 * 1024
+RECV_CHUNK = 64 * 1024
+
+
+class FrameError(Exception):
+    """Raised when the peer sends a malformed or oversized frame."""
+
+
+class CodecError(Exception):
+    """Raised when a value cannot be encoded or a payload cannot be decoded."""
+
+
+# ─── Codecs ──────────────────────────────────────────────────────────────────
+
+class JSONCodec:
+    """Default codec: UTF-8 JSON, no out-of-band buffers."""
+
+    name = "json"
+
+    def encode(self, obj):
+        """Return (payload, buffers)."""
+        try:
+            return json.dumps(obj).encode('utf-8'), []
+        except (TypeError, ValueError) as e:
+            raise CodecError(str(e))
+
+    def decode(self, payload, buffers):
+        try:
+            return json.loads(bytes(payload).decode('utf-8'))
+        except ValueError as e:
+            raise CodecError(str(e))
+
+
+class BinaryCodec:
+    """Compact tagged binary encoding in the spirit of msgpack.
+
+    Supports None, bool, int (any size), float, str, bytes-like, list/tuple
+    and dict. Lists made only of int64 or only of floats are packed as
+    arrays. bytes-like values of at least oob_threshold bytes are sent as
+    out-of-band buffers and decode to memoryviews.
+    """
+
+    name = "bin1"
+
+    NONE, FALSE, TRUE = 0x00, 0x01, 0x02
+    INT8, INT64, BIGINT = 0x03, 0x04, 0x05
+    FLOAT = 0x06
+    STR, BYTES, OOB = 0x07, 0x08, 0x09
+    LIST, DICT = 0x0A, 0x0B
+    INT_ARRAY, FLOAT_ARRAY = 0x0C, 0x0D
+
+    _u32 = struct.Struct("!I")
+    _i8 = struct.Struct("!b")
+    _i64 = struct.Struct("!q")
+    _f64 = struct.Struct("!d")
+
+    def __init__(self, oob_threshold=64 * 1024):
+        self.oob_threshold = oob_threshold
+
+    def encode(self, obj):
+        out = bytearray()
+        buffers = []
+        self._encode(obj, out, buffers)
+        return out, buffers
+
+    def _encode(self, obj, out, buffers):
+        if obj is None:
+            out.append(self.NONE)
+        elif obj is True:
+            out.append(self.TRUE)
+        elif obj is False:
+            out.append(self.FALSE)
+        elif isinstance(obj, int):
+            if -128 <= obj <= 127:
+                out.append(self.INT8)
+                out += self._i8.pack(obj)
+            elif -(1 << 63) <= obj < (1 << 63):
+                out.append(self.INT64)
+                out += self._i64.pack(obj)
+            else:
+                raw = obj.to_bytes((obj.bit_length() + 8) // 8, "big", signed=True)
+                out.append(self.BIGINT)
+                out += self._u32.pack(len(raw))
+                out += raw
+        elif isinstance(obj, float):
+            out.append(self.FLOAT)
+            out += self._f64.pack(obj)
+        elif isinstance(obj, str):
+            raw = obj.encode('utf-8')
+            out.append(self.STR)
+            out += self._u32.pack(len(raw))
+            out += raw
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            view = memoryview(obj).cast("B")
+            if view.nbytes >= self.oob_threshold:
+                out.append(self.OOB)
+                out += self._u32.pack(len(buffers))
+                buffers.append(view)
+            else:
+                out.append(self.BYTES)
+                out += self._u32.pack(view.nbytes)
+                out += view
+        elif isinstance(obj, (list, tuple)) and len(obj) > 1 and self._pack_array(obj, out):
+            pass
+        elif isinstance(obj, (list, tuple)):
+            out.append(self.LIST)
+            out += self._u32.pack(len(obj))
+            for item in obj:
+                self._encode(item, out, buffers)
+        elif isinstance(obj, dict):
+            out.append(self.DICT)
+            out += self._u32.pack(len(obj))
+            for key, value in obj.items():
+                self._encode(key, out, buffers)
+                self._encode(value, out, buffers)
+        else:
+            raise CodecError(f"cannot encode {type(obj).__name__}")
+
+    def _pack_array(self, items, out):
+        """Append items as a packed numeric array if they are homogeneous; return success."""
+        first = type(items[0])
+        if first is int:
+            if not all(type(x) is int for x in items):
+                return False
+            try:
+                packed = array.array("q", items)
+            except OverflowError:
+                return False
+            tag = self.INT_ARRAY
+        elif first is float:
+            if not all(type(x) is float for x in items):
+                return False
+            packed = array.array("d", items)
+            tag = self.FLOAT_ARRAY
+        else:
+            return False
+        if sys.byteorder == "little":
+            packed.byteswap()
+        out.append(tag)
+        out += self._u32.pack(len(packed))
+        out += packed.tobytes()
+        return True
+
+    def _unpack_array(self, typecode, view, pos):
+        (count,) = self._u32.unpack_from(view, pos)
+        pos += 4
+        end = pos + count * 8
+        if end > len(view):
+            raise IndexError("truncated array")
+        packed = array.array(typecode)
+        packed.frombytes(view[pos:end])
+        if sys.byteorder == "little":
+            packed.byteswap()
+        return packed.tolist(), end
+
+    def decode(self, payload, buffers):
+        view = memoryview(payload)
+        try:
+            obj, pos = self._decode(view, 0, buffers)
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise CodecError(f"malformed payload: {e}")
+        if pos != len(view):
+            raise CodecError("trailing bytes after payload")
+        return obj
+
+    def _decode(self, view, pos, buffers):
+        tag = view[pos]
+        pos += 1
+        if tag == self.NONE:
+            return None, pos
+        if tag == self.TRUE:
+            return True, pos
+        if tag == self.FALSE:
+            return False, pos
+        if tag == self.INT8:
+            return self._i8.unpack_from(view, pos)[0], pos + 1
+        if tag == self.INT64:
+            return self._i64.unpack_from(view, pos)[0], pos + 8
+        if tag == self.FLOAT:
+            return self._f64.unpack_from(view, pos)[0], pos + 8
+        if tag == self.OOB:
+            (index,) = self._u32.unpack_from(view, pos)
+            return buffers[index], pos + 4
+        if tag in (self.BIGINT, self.STR, self.BYTES):
+            (length,) = self._u32.unpack_from(view, pos)
+            pos += 4
+            raw = view[pos:pos + length]
+            if len(raw) != length:
+                raise IndexError("truncated value")
+            pos += length
+            if tag == self.BIGINT:
+                return int.from_bytes(raw, "big", signed=True), pos
+            if tag == self.STR:
+                return str(raw, 'utf-8'), pos
+            return bytes(raw), pos
+        if tag == self.LIST:
+            (count,) = self._u32.unpack_from(view, pos)
+            pos += 4
+            items = []
+            for _ in range(count):
+                item, pos = self._decode(view, pos, buffers)
+                items.append(item)
+            return items, pos
+        if tag == self.INT_ARRAY:
+            return self._unpack_array("q", view, pos)
+        if tag == self.FLOAT_ARRAY:
+            return self._unpack_array("d", view, pos)
+        if tag == self.DICT:
+            (count,) = self._u32.unpack_from(view, pos)
+            pos += 4
+            result = {}
+            for _ in range(count):
+                key, pos = self._decode(view, pos, buffers)
+                value, pos = self._decode(view, pos, buffers)
+                result[key] = value
+            return result, pos
+        raise CodecError(f"unknown tag 0x{tag:02x}")
+
+
+JSON = JSONCodec()
+CODECS = {codec.name: codec for codec in (JSON, BinaryCodec())}
+
+
+def choose_codec(offered):
+    """Pick the first codec in the client's preference list that we support."""
+    for name in offered or []:
+        if name in CODECS:
+            return CODECS[name]
+    return JSON
+
+
+# ─── Blocking sockets ────────────────────────────────────────────────────────
+
+def recv_exact(sock, n):
+    """Read exactly n bytes, or return None if the peer closed the connection."""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        count = sock.recv_into(view[got:], min(n - got, RECV_CHUNK))
+        if count == 0:
+            return None
+        got += count
+    return buf
+
+
+def _buffer_table(header):
+    """Validate a frame header; return (payload_length, buffer_count)."""
+    length, nbuf = FRAME.unpack(header)
+    if length > MAX_FRAME or nbuf * BUFLEN.size > MAX_FRAME:
+        raise FrameError(f"frame too large: {length} bytes, {nbuf} buffers")
+    return length, nbuf
+
+
+def _split_buffers(table, nbuf, length):
+    sizes = [BUFLEN.unpack_from(table, i * BUFLEN.size)[0] for i in range(nbuf)]
+    if length + sum(sizes) > MAX_FRAME:
+        raise FrameError(f"frame too large: {length + sum(sizes)} bytes")
+    return sizes
+
+
+def _slice_buffers(data, sizes):
+    view = memoryview(data)
+    buffers, pos = [], 0
+    for size in sizes:
+        buffers.append(view[pos:pos + size])
+        pos += size
+    return buffers
+
+
+def encode_frame(message, codec=JSON):
+    """Encode a message into a list of chunks to be written back to back."""
+    payload, buffers = codec.encode(message)
+    total = len(payload) + sum(b.nbytes for b in buffers)
+    if total > MAX_FRAME:
+        raise FrameError(f"frame too large: {total} bytes")
+    head = bytearray(FRAME.pack(len(payload), len(buffers)))
+    for b in buffers:
+        head += BUFLEN.pack(b.nbytes)
+    head += payload
+    return [head] + buffers
+
+
+def encode_message(message, codec=JSON):
+    """Encode a message as one contiguous frame."""
+    return b"".join(encode_frame(message, codec))
+
+
+def send_message(sock, message, codec=JSON):
+    """Encode and send one frame; large buffers are written without copying."""
+    for chunk in encode_frame(message, codec):
+        sock.sendall(chunk)
+
+
+def recv_message(sock, codec=JSON):
+    """Receive and decode one frame, or None on clean EOF."""
+    header = recv_exact(sock, FRAME.size)
+    if header is None:
+        return None
+    length, nbuf = _buffer_table(header)
+    sizes = []
+    if nbuf:
+        table = recv_exact(sock, nbuf * BUFLEN.size)
+        if table is None:
+            raise FrameError("connection closed mid-frame")
+        sizes = _split_buffers(table, nbuf, length)
+    payload = recv_exact(sock, length)
+    data = recv_exact(sock, sum(sizes)) if sizes else b""
+    if payload is None or data is None:
+        raise FrameError("connection closed mid-frame")
+    return codec.decode(payload, _slice_buffers(data, sizes))
+
+
+def _may_be_complete(data):
+    """Cheap check before attempting a full parse: a JSON request ends in } or ]."""
+    stripped = data.rstrip()
+    return bool(stripped) and stripped[-1:] in (b"}", b"]")
+
+
+def recv_json_stream(sock, head=b""):
+    """Read one unframed JSON document (legacy protocol) of any size up to MAX_FRAME.
+
+    Keeps reading until the bytes received so far parse as a complete
+    document, instead of trusting a single fixed-size recv().
+    """
+    data = bytearray(head)
+    while True:
+        if _may_be_complete(data):
+            try:
+                return json.loads(data.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError):
+                pass
+        if len(data) > MAX_FRAME:
+            raise FrameError(f"request too large: over {MAX_FRAME} bytes")
+        chunk = sock.recv(RECV_CHUNK)
+        if not chunk:
+            if not data:
+                return None
+            raise FrameError("connection closed before a complete request")
+        data += chunk
+
+
+# ─── asyncio streams ─────────────────────────────────────────────────────────
+
+async def read_message(reader, codec=JSON):
+    """asyncio counterpart of recv_message for an asyncio.StreamReader."""
+    try:
+        header = await reader.readexactly(FRAME.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise FrameError("connection closed mid-frame")
+        return None
+    length, nbuf = _buffer_table(header)
+    try:
+        sizes = []
+        if nbuf:
+            sizes = _split_buffers(await reader.readexactly(nbuf * BUFLEN.size), nbuf, length)
+        payload = await reader.readexactly(length)
+        data = await reader.readexactly(sum(sizes)) if sizes else b""
+    except asyncio.IncompleteReadError:
+        raise FrameError("connection closed mid-frame")
+    return codec.decode(payload, _slice_buffers(data, sizes))
+
+
+async def read_json_stream(reader, head=b""):
+    """asyncio counterpart of recv_json_stream."""
+    data = bytearray(head)
+    while True:
+        if _may_be_complete(data):
+            try:
+                return json.loads(data.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError):
+                pass
+        if len(data) > MAX_FRAME:
+            raise FrameError(f"request too large: over {MAX_FRAME} bytes")
+        chunk = await reader.read(RECV_CHUNK)
+        if not chunk:
+            if not data:
+                return None
+            raise FrameError("connection closed before a complete request")
+        data += chunk
@@ -1,90 +1,869 @@
 import socket
-import json
 import uuid
 import threading
 import time
 import datetime
+import argparse
+import asyncio
+import contextlib
+import functools
+import inspect
+import os
+import random
+import signal
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from metrics import Metrics
+from protocol import (JSON, MAGIC, CodecError, FrameError, choose_codec, encode_frame, read_json_stream,
+                      read_message, recv_exact, recv_json_stream, recv_message)
 
 HOST = '0.0.0.0'
 PORT = 5000
 FUNCTIONS = {}
+LIMITS = {}  # method name -> MethodLimiter
+LIMIT_SPECS = {}  # method name -> (executor, max_concurrency, max_queue) as given to @register
+
+# Artificial work before and after each call (seconds), used to demonstrate client timeouts
+ARTIFICIAL_DELAY = 6
+# Fraction of calls that get the artificial delay (1.0 = all), to simulate an intermittently slow server
+DELAY_PROBABILITY = 1.0
+# Worker threads shared by all framed connections
+FRAMED_WORKERS = 32
+# Executor size for plain (sync) functions under the asyncio engine
+ASYNC_SYNC_WORKERS = 16
+VERBOSE = True
+# Idempotency cache: completed responses kept per request_id
+CACHE_CAPACITY = 10000
+CACHE_TTL = 300  # seconds
+# Worker processes for functions registered with executor="process"
+PROCESS_WORKERS = os.cpu_count() or 2
+
+framed_executor = None
+process_pool = None
+
+class ResponseCache:
+    """Bounded LRU/TTL map of request_id -> Future of the response.
+
+    The first request with a given id "owns" it and executes the call;
+    retries that arrive while it is running join the same Future, and
+    retries after it finished get the stored response without re-running
+    the function. Entries expire CACHE_TTL seconds after completion.
+    """
+
+    def __init__(self, capacity=CACHE_CAPACITY, ttl=CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.entries = OrderedDict()  # request_id -> (expires_at or None while in flight, Future)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.joins = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def claim(self, req_id):
+        """Return (future, owner). The owner must call complete() exactly once."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(req_id)
+            if entry is not None:
+                expires_at, future = entry
+                if expires_at is None or expires_at > now:
+                    self.entries.move_to_end(req_id)
+                    if future.done():
+                        self.hits += 1
+                    else:
+                        self.joins += 1
+                    return future, False
+                del self.entries[req_id]
+            future = Future()
+            self.entries[req_id] = (None, future)
+            self.misses += 1
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return future, True
+
+    def complete(self, req_id, future, response):
+        with self.lock:
+            if req_id in self.entries:
+                self.entries[req_id] = (time.monotonic() + self.ttl, future)
+        future.set_result(response)
+
+    def discard(self, req_id, future, response):
+        """Like complete(), but forget req_id so a retry executes again (e.g. after a rejection)."""
+        with self.lock:
+            entry = self.entries.get(req_id)
+            if entry is not None and entry[1] is future:
+                del self.entries[req_id]
+        future.set_result(response)
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "capacity": self.capacity, "ttl": self.ttl,
+                    "hits": self.hits, "joins": self.joins, "misses": self.misses,
+                    "evictions": self.evictions}
+
+class Rejected(Exception):
+    """Raised when a method's admission limit is reached."""
+
+class MethodLimiter:
+    """Per-method admission control.
+
+    At most max_concurrency calls run at once and at most max_queue more
+    may wait for a slot; anything beyond that is rejected immediately
+    instead of piling up threads or queue entries. None means unlimited.
+
+    Process-pool calls wait for their slot in `waiting` (see submit()), so
+    a queued call does not hold a server thread.
+    """
+
+    def __init__(self, executor="thread", max_concurrency=None, max_queue=None):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.slots = threading.Semaphore(max_concurrency) if max_concurrency else None
+        self.async_slots = None
+        self.waiting = deque()  # (future, pool, func, params, callbacks) of submit() calls without a slot yet
+        self.running = 0        # submit() calls holding a slot
+
+    def async_semaphore(self):
+        """asyncio counterpart of `slots`, created on first use inside the event loop."""
+        if self.async_slots is None and self.max_concurrency:
+            self.async_slots = asyncio.Semaphore(self.max_concurrency)
+        return self.async_slots
+
+    def admit(self):
+        with self.lock:
+            if self.max_concurrency and self.max_queue is not None:
+                if self.in_flight >= self.max_concurrency + self.max_queue:
+                    self.rejected += 1
+                    raise Rejected(f"server busy: queue full ({self.in_flight} calls in flight)")
+            self.in_flight += 1
 
-def register(func):
-    """Decorator to register remote functions"""
-    FUNCTIONS[func.__name__] = func
-    return func
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def submit(self, pool, func, params, callbacks):
+        """Future of func(**params) run on pool once one of max_concurrency slots is free.
+
+        The Future is resolved, and the next waiting call started, from a
+        `callbacks` executor thread rather than the pool's own.
+        """
+        future = Future()
+        with self.lock:
+            self.waiting.append((future, pool, func, params, callbacks))
+        self._start_waiting()
+        return future
+
+    def _start_waiting(self):
+        while True:
+            with self.lock:
+                if not self.waiting or (self.max_concurrency and self.running >= self.max_concurrency):
+                    return
+                future, pool, func, params, callbacks = self.waiting.popleft()
+                self.running += 1
+            try:
+                call = pool.submit(func, **params)
+            except Exception as e:  # e.g. the pool is shutting down
+                call = Future()
+                call.set_exception(e)
+            call.add_done_callback(lambda call, future=future, callbacks=callbacks:
+                                   callbacks.submit(self._done, future, call))
+
+    def _done(self, future, call):
+        with self.lock:
+            self.running -= 1
+        self._start_waiting()
+        if call.exception() is not None:
+            future.set_exception(call.exception())
+        else:
+            future.set_result(call.result())
+
+    def stats(self):
+        with self.lock:
+            return {"executor": self.executor, "max_concurrency": self.max_concurrency,
+                    "max_queue": self.max_queue, "in_flight": self.in_flight, "rejected": self.rejected}
+
+RESPONSE_CACHE = ResponseCache()
+METRICS = Metrics()
+
+def register(func=None, *, executor="thread", max_concurrency=None, max_queue=None):
+    """Decorator to register remote functions (plain or `async def`).
+
+    Use bare (@register) or with options:
+        @register(executor="process", max_concurrency=4, max_queue=16)
+    executor="process" runs the function in the worker-process pool, for
+    CPU-bound work that would otherwise hold the GIL. max_concurrency and
+    max_queue bound how many calls of this method may run and wait; either
+    may be a callable, evaluated by build_limiters() (e.g. to scale with
+    --process-workers).
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"unknown executor: {executor}")
+
+    def decorate(f):
+        if executor == "process" and inspect.iscoroutinefunction(f):
+            raise ValueError("async functions cannot use executor='process'")
+        FUNCTIONS[f.__name__] = f
+        LIMIT_SPECS[f.__name__] = (executor, max_concurrency, max_queue)
+        LIMITS[f.__name__] = _make_limiter(LIMIT_SPECS[f.__name__])
+        return f
+
+    return decorate(func) if func is not None else decorate
+
+def _make_limiter(spec):
+    executor, max_concurrency, max_queue = spec
+    resolve = lambda limit: limit() if callable(limit) else limit
+    return MethodLimiter(executor, resolve(max_concurrency), resolve(max_queue))
+
+def build_limiters():
+    """Recreate every method's limiter from its @register spec, after settings such as PROCESS_WORKERS changed."""
+    for name, spec in LIMIT_SPECS.items():
+        LIMITS[name] = _make_limiter(spec)
 
 @register
 def add(a, b):
     return a + b
 
+@register(executor="process", max_concurrency=lambda: PROCESS_WORKERS, max_queue=lambda: 4 * PROCESS_WORKERS)
+def fib(n):
+    """Deliberately CPU-bound: naive recursive Fibonacci."""
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+FUNCTIONS['__cache_stats__'] = lambda: RESPONSE_CACHE.stats()
+
+def __metrics__(format="json"):
+    """Built-in: per-method counters and latency percentiles, as a dict or Prometheus text."""
+    if format == "prometheus":
+        return prometheus_text()
+    return {"methods": METRICS.snapshot(), "cache": RESPONSE_CACHE.stats(),
+            "limits": {name: limiter.stats() for name, limiter in LIMITS.items()}}
+
+FUNCTIONS['__metrics__'] = __metrics__
+
+def prometheus_text():
+    cache = RESPONSE_CACHE.stats()
+    extra = {f"rpc_cache_{key}": cache[key] for key in ("size", "hits", "joins", "misses", "evictions")}
+    return METRICS.prometheus(extra)
+
 
 def log(message):
+    if not VERBOSE:
+        return
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] {message}")
 
+def _ok(req_id, result):
+    return {"request_id": req_id, "result": result, "status": "OK"}
+
+def _error(req_id, error):
+    return {"request_id": req_id, "status": "ERROR", "error": error}
+
+def _log_response(response):
+    outcome = response['result'] if response['status'] == 'OK' else response['error']
+    log(f"Sent response for {response['request_id']}: {outcome}")
+
+def _warmup():
+    return os.getpid()
+
+def start_process_pool():
+    """Create the worker-process pool if any method needs it, and spawn every worker now.
+
+    Warming up at startup keeps process creation (and fork cost) off the
+    first calls' latency.
+    """
+    global process_pool
+    if process_pool is not None or not any(l.executor == "process" for l in LIMITS.values()):
+        return
+    process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS)
+    pids = {f.result() for f in [process_pool.submit(_warmup) for _ in range(PROCESS_WORKERS * 4)]}
+    log(f"Process pool ready: {len(pids)} workers")
+
+def stop_process_pool():
+    """Shut the worker processes down so they are not left behind, reparented to init."""
+    global process_pool
+    if process_pool is not None:
+        process_pool.shutdown(wait=True, cancel_futures=True)
+        process_pool = None
+
+def _on_sigterm(signum, frame):
+    # Unwind main() the same way Ctrl+C does, so the process pool gets shut down
+    raise KeyboardInterrupt
+
+def call_function(func, params):
+    """Run a registered function from a worker thread; async handlers get their own loop."""
+    if inspect.iscoroutinefunction(func):
+        return asyncio.run(func(**params))
+    return func(**params)
+
+def run_limited(func, params, limiter):
+    """call_function, waiting for one of the method's concurrency slots first."""
+    if limiter is None or limiter.slots is None:
+        return call_function(func, params)
+    with limiter.slots:
+        return call_function(func, params)
+
+def _artificial_delay(method):
+    if method.startswith('__') or random.random() >= DELAY_PROBABILITY:
+        return 0
+    return ARTIFICIAL_DELAY
+
+def _metric_name(method):
+    """Label calls to unregistered methods as one series so junk names cannot grow the registry."""
+    return method if isinstance(method, str) and method in FUNCTIONS else "<unknown>"
+
+def _cacheable(request):
+    method = request.get('method')
+    return 'request_id' in request and isinstance(method, str) and not method.startswith('__')
+
+def dispatch(request, received_at=None):
+    """Execute one decoded request and return the response dict.
+
+    Requests whose request_id was already seen are answered from
+    RESPONSE_CACHE instead of being executed again. `received_at`
+    (time.perf_counter() when the request was decoded) is used to report
+    queue time.
+    """
+    return dispatch_future(request, received_at).result()
+
+def dispatch_future(request, received_at=None):
+    """Like dispatch(), but returns a Future of the response.
+
+    It is already resolved on return, except for calls to executor="process"
+    methods, which resolve once the worker process has answered.
+    """
+    if not _cacheable(request):
+        response = Future()
+        _execute_future(request, received_at).add_done_callback(lambda f: response.set_result(f.result()[0]))
+        return response
+    req_id = request['request_id']
+    future, owner = RESPONSE_CACHE.claim(req_id)
+    if not owner:
+        log(f"Duplicate request {req_id}: {'cached' if future.done() else 'joining in-flight call'}")
+        return future
+    _execute_future(request, received_at).add_done_callback(lambda f: _settle(req_id, future, *f.result()))
+    return future
+
+def run_dispatch(request, received_at, callback):
+    """framed_executor job: dispatch request and call callback(response) once it is ready.
+
+    A process-pool call calls back later, from another worker, so this one
+    is free while the call waits for its slot and runs.
+    """
+    dispatch_future(request, received_at).add_done_callback(lambda f: callback(f.result()))
+
+def _settle(req_id, future, response, rejected):
+    """Cache the owner's response; a rejected call is not cached, so retrying it runs again."""
+    if rejected:
+        RESPONSE_CACHE.discard(req_id, future, response)
+    else:
+        RESPONSE_CACHE.complete(req_id, future, response)
+
+def _execute_future(request, received_at=None):
+    """Future of _execute()'s (response, rejected), for either kind of method."""
+    method = request.get('method')
+    limiter = LIMITS.get(method) if isinstance(method, str) else None
+    if limiter is not None and limiter.executor == "process":
+        return _execute_process(request, received_at, limiter)
+    outcome = Future()
+    outcome.set_result(_execute(request, received_at))
+    return outcome
+
+def _execute_process(request, received_at, limiter):
+    """_execute() for executor="process" methods, without a thread blocked on the pool.
+
+    Admission runs in the calling thread. The call then waits in the
+    limiter's queue and the worker process, and the response is built on a
+    framed_executor thread. The artificial delays before and after the call
+    are timers, so no framed worker sleeps through them; admission still
+    bounds how many such calls exist.
+    """
+    req_id = request.get('request_id', 'unknown')
+    method = request['method']
+    started = time.perf_counter()
+    queue = started - received_at if received_at is not None else None
+    outcome = Future()
+
+    def finish(response, rejected=False):
+        METRICS.record_call(method, response['status'] == 'OK', queue, time.perf_counter() - started)
+        outcome.set_result((response, rejected))
+
+    try:
+        params = request['params']
+        log(f"Received request {req_id}: {method}{params}")
+        limiter.admit()
+    except Exception as e:
+        log(f"Error handling request: {e}")
+        finish(_error(req_id, str(e)), isinstance(e, Rejected))
+        return outcome
+    delay = _artificial_delay(method)
+
+    def complete(call):
+        limiter.release()
+        if call.exception() is not None:
+            log(f"Error handling request: {call.exception()}")
+            response = _error(req_id, str(call.exception()))
+        else:
+            response = _ok(req_id, call.result())
+            _log_response(response)
+        finish(response)
+
+    def submit():
+        limiter.submit(process_pool, FUNCTIONS[method], params, framed_executor).add_done_callback(
+            lambda call: _after(delay, complete, call))
+
+    _after(delay, submit)
+    return outcome
+
+def _after(delay, func, *args):
+    """Call func(*args) now, or from a timer thread after `delay` seconds."""
+    if not delay:
+        func(*args)
+        return
+    timer = threading.Timer(delay, func, args)
+    timer.daemon = True
+    timer.start()
+
+def _execute(request, received_at=None):
+    """Run one request; returns (response, rejected by admission control)."""
+    req_id = request.get('request_id', 'unknown')
+    started = time.perf_counter()
+    queue = started - received_at if received_at is not None else None
+    method = None
+    rejected = False
+    try:
+        method = request['method']
+        params = request['params']
+
+        log(f"Received request {req_id}: {method}{params}")
+
+        if method not in FUNCTIONS:
+            response = _error(req_id, "Unknown method")
+        else:
+            limiter = LIMITS.get(method)
+            if limiter is not None:
+                try:
+                    limiter.admit()
+                except Rejected:
+                    rejected = True
+                    raise
+            try:
+                delay = _artificial_delay(method)
+                if delay:
+                    time.sleep(delay)
+                result = run_limited(FUNCTIONS[method], params, limiter)
+                if delay:
+                    time.sleep(delay)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+            response = _ok(req_id, result)
+        _log_response(response)
+
+    except Exception as e:
+        log(f"Error handling request: {e}")
+        response = _error(req_id, str(e))
+
+    METRICS.record_call(_metric_name(method), response['status'] == 'OK', queue, time.perf_counter() - started)
+    return response, rejected
+
+def _reply_chunks(message, codec, methods=()):
+    """Encode a response (or batch of responses) for the wire.
+
+    A result the connection's codec cannot represent (e.g. bytes over JSON)
+    is turned into an ERROR response rather than dropping the connection.
+    Encoding time is recorded as serialization time, split evenly across
+    `methods` (the method of each response in the frame).
+    """
+    started = time.perf_counter()
+    try:
+        return _encode_reply(message, codec)
+    finally:
+        if methods:
+            share = (time.perf_counter() - started) / len(methods)
+            for method in methods:
+                METRICS.record_serialization(_metric_name(method), share)
+
+def _encode_reply(message, codec):
+    try:
+        return encode_frame(message, codec)
+    except (CodecError, FrameError) as e:
+        def safe(response):
+            try:
+                codec.encode(response)
+                return response
+            except CodecError as err:
+                return _error(response.get('request_id', 'unknown'), f"cannot encode result: {err}")
+        if "batch" in message:
+            message = {"batch": [safe(r) for r in message["batch"]]}
+        else:
+            message = _error(message.get('request_id', 'unknown'), f"cannot encode result: {e}")
+        return encode_frame(message, codec)
+
+def _legacy_payload(response, method=None):
+    """Raw JSON bytes for the unframed protocol."""
+    started = time.perf_counter()
+    try:
+        return JSON.encode(response)[0]
+    except CodecError as e:
+        return JSON.encode(_error(response.get('request_id', 'unknown'), f"cannot encode result: {e}"))[0]
+    finally:
+        METRICS.record_serialization(_metric_name(method), time.perf_counter() - started)
+
+def _negotiate(hello):
+    """Return the codec for a framed connection from the client's hello frame."""
+    offered = hello.get("hello", {}).get("codecs") if isinstance(hello, dict) else None
+    return choose_codec(offered)
+
+def handle_legacy(conn, head):
+    """One request per connection: a single JSON blob in, a single JSON blob out."""
+    try:
+        request = recv_json_stream(conn, head)
+    except Exception as e:
+        log(f"Error handling request: {e}")
+        request = None
+    if request is None:
+        request = {}
+        response = _error("unknown", "invalid json")
+    else:
+        response = dispatch(request, time.perf_counter())
+    try:
+        conn.sendall(_legacy_payload(response, request.get('method')))
+    except:
+        pass
+
+def handle_framed(conn, addr):
+    """Serve length-prefixed requests until the client disconnects.
+
+    The first frame is the client's JSON hello; the reply names the codec
+    used for the rest of the connection. Requests are executed on the shared
+    worker pool, so responses may be written out of order; the client
+    matches them by request_id. A frame of the form {"batch": [request, ...]}
+    runs every request concurrently and answers with a single
+    {"batch": [response, ...]} frame.
+    """
+    send_lock = threading.Lock()
+    try:
+        hello = recv_message(conn)
+        if hello is None:
+            return
+        codec = _negotiate(hello)
+        for chunk in encode_frame({"codec": codec.name}):
+            conn.sendall(chunk)
+    except (FrameError, CodecError, OSError) as e:
+        log(f"Handshake with {addr} failed: {e}")
+        return
+
+    def reply(message, methods):
+        chunks = _reply_chunks(message, codec, methods)
+        try:
+            with send_lock:
+                for chunk in chunks:
+                    conn.sendall(chunk)
+        except OSError as e:
+            log(f"Failed to send response to {addr}: {e}")
+
+    def run(request, received_at):
+        framed_executor.submit(run_dispatch, request, received_at,
+                               lambda response: reply(response, [request.get('method')]))
+
+    def run_batch(requests, received_at):
+        responses = [None] * len(requests)
+        remaining = [len(requests)]
+        remaining_lock = threading.Lock()
+
+        def finish(i, response):
+            responses[i] = response
+            with remaining_lock:
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                reply({"batch": responses}, [r.get('method') for r in requests])
+
+        for i, request in enumerate(requests):
+            framed_executor.submit(run_dispatch, request, received_at, functools.partial(finish, i))
+
+    while True:
+        try:
+            request = recv_message(conn, codec)
+        except (FrameError, CodecError, OSError) as e:
+            log(f"Dropping framed connection {addr}: {e}")
+            return
+        if request is None:
+            return
+        received_at = time.perf_counter()
+        if "batch" in request:
+            if request["batch"]:
+                run_batch(request["batch"], received_at)
+            else:
+                reply({"batch": []}, [])
+        else:
+            run(request, received_at)
+
 def handle_client(conn, addr):
     log(f"Connected by {addr}")
     with conn:
-        data = conn.recv(4096)
-        if not data:
+        head = recv_exact(conn, len(MAGIC))
+        if not head:
             return
-        
+        if head == MAGIC:
+            handle_framed(conn, addr)
+        else:
+            handle_legacy(conn, head)
+
+def serve(host=HOST, port=PORT, on_listen=None):
+    """Accept connections forever; calls on_listen(port) once the socket is bound."""
+    global framed_executor
+    start_process_pool()
+    framed_executor = ThreadPoolExecutor(max_workers=FRAMED_WORKERS)
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((host, port))
+        s.listen(1024)
+        log(f"Listening on port {s.getsockname()[1]}")
+        if on_listen is not None:
+            on_listen(s.getsockname()[1])
+
+        while True:
+            conn, addr = s.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
+
+# ─── asyncio engine ──────────────────────────────────────────────────────────
+# One event loop serves every connection. `async def` handlers are awaited
+# directly; plain functions run on a bounded thread pool so they cannot
+# block the loop.
+
+async def dispatch_async(request, executor, received_at=None):
+    """asyncio counterpart of dispatch()."""
+    if not _cacheable(request):
+        return (await _execute_async(request, executor, received_at))[0]
+    req_id = request['request_id']
+    future, owner = RESPONSE_CACHE.claim(req_id)
+    if not owner:
+        log(f"Duplicate request {req_id}: {'cached' if future.done() else 'joining in-flight call'}")
+        return await asyncio.wrap_future(future)
+    response, rejected = await _execute_async(request, executor, received_at)
+    _settle(req_id, future, response, rejected)
+    return response
+
+async def _execute_async(request, executor, received_at=None):
+    """asyncio counterpart of _execute(): returns (response, rejected)."""
+    req_id = request.get('request_id', 'unknown')
+    started = time.perf_counter()
+    queue = started - received_at if received_at is not None else None
+    executor_wait = 0.0
+    method = None
+    rejected = False
+    try:
+        method = request['method']
+        params = request['params']
+
+        log(f"Received request {req_id}: {method}{params}")
+
+        if method not in FUNCTIONS:
+            response = _error(req_id, "Unknown method")
+        else:
+            func = FUNCTIONS[method]
+            limiter = LIMITS.get(method)
+            if limiter is not None:
+                try:
+                    limiter.admit()
+                except Rejected:
+                    rejected = True
+                    raise
+            try:
+                delay = _artificial_delay(method)
+                if delay:
+                    await asyncio.sleep(delay)
+                submitted = time.perf_counter()
+                async with (limiter.async_semaphore() if limiter else None) or contextlib.nullcontext():
+                    picked_up = [time.perf_counter()]
+                    if inspect.iscoroutinefunction(func):
+                        result = await func(**params)
+                    elif limiter is not None and limiter.executor == "process":
+                        result = await asyncio.wrap_future(process_pool.submit(func, **params))
+                    else:
+                        def run():
+                            picked_up.append(time.perf_counter())
+                            return func(**params)
+
+                        result = await asyncio.get_running_loop().run_in_executor(executor, run)
+                # Waiting for a concurrency slot or a free executor thread counts as queue time
+                executor_wait = picked_up[-1] - submitted
+                if delay:
+                    await asyncio.sleep(delay)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+            response = _ok(req_id, result)
+        _log_response(response)
+
+    except Exception as e:
+        log(f"Error handling request: {e}")
+        response = _error(req_id, str(e))
+
+    execution = time.perf_counter() - started - executor_wait
+    if queue is not None:
+        queue += executor_wait
+    METRICS.record_call(_metric_name(method), response['status'] == 'OK', queue, execution)
+    return response, rejected
+
+async def handle_client_async(reader, writer, executor):
+    addr = writer.get_extra_info('peername')
+    log(f"Connected by {addr}")
+    try:
+        try:
+            head = await reader.readexactly(len(MAGIC))
+        except asyncio.IncompleteReadError:
+            return
+
+        if head != MAGIC:
+            try:
+                request = await read_json_stream(reader, head)
+            except Exception as e:
+                log(f"Error handling request: {e}")
+                request = None
+            if request is None:
+                request = {}
+                response = _error("unknown", "invalid json")
+            else:
+                response = await dispatch_async(request, executor, time.perf_counter())
+            writer.write(_legacy_payload(response, request.get('method')))
+            await writer.drain()
+            return
+
         try:
-            request = json.loads(data.decode('utf-8'))
-            req_id = request['request_id']
-            method = request['method']
-            params = request['params']
-            
-            log(f"Received request {req_id}: {method}{params}")
-            
-            if method not in FUNCTIONS:
-                response = {
-                    "request_id": req_id,
-                    "status": "ERROR",
-                    "error": "Unknown method"
-                }
+            hello = await read_message(reader)
+        except (FrameError, CodecError) as e:
+            log(f"Handshake with {addr} failed: {e}")
+            return
+        if hello is None:
+            return
+        codec = _negotiate(hello)
+        writer.writelines(encode_frame({"codec": codec.name}))
+
+        async def run(request, received_at):
+            if "batch" in request:
+                batch = request["batch"]
+                responses = await asyncio.gather(*(dispatch_async(r, executor, received_at) for r in batch))
+                response = {"batch": list(responses)}
+                methods = [r.get('method') for r in batch]
             else:
-                time.sleep(6)
-                result = FUNCTIONS[method](**params)
-                time.sleep(6)
-                response = {
-                    "request_id": req_id,
-                    "result": result,
-                    "status": "OK"
-                }
-                
-            conn.sendall(json.dumps(response).encode('utf-8'))
-            log(f"Sent response for {req_id}: {response['result'] if response['status'] == 'OK' else response['error']}")
-            
-        except Exception as e:
-            log(f"Error handling request: {e}")
-            error_resp = {
-                "request_id": request.get('request_id', 'unknown'),
-                "status": "ERROR",
-                "error": str(e)
-            }
+                response = await dispatch_async(request, executor, received_at)
+                methods = [request.get('method')]
+            writer.writelines(_reply_chunks(response, codec, methods))
+            await writer.drain()
+
+        tasks = set()
+        while True:
             try:
-                conn.sendall(json.dumps(error_resp).encode('utf-8'))
-            except:
-                pass
+                request = await read_message(reader, codec)
+            except (FrameError, CodecError) as e:
+                log(f"Dropping framed connection {addr}: {e}")
+                break
+            if request is None:
+                break
+            task = asyncio.create_task(run(request, time.perf_counter()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    except (ConnectionError, OSError) as e:
+        log(f"Connection {addr} failed: {e}")
+    finally:
+        writer.close()
+
+async def serve_async(host=HOST, port=PORT, on_listen=None):
+    """Serve forever on one event loop; calls on_listen(port) once bound."""
+    start_process_pool()
+    executor = ThreadPoolExecutor(max_workers=ASYNC_SYNC_WORKERS)
+    server = await asyncio.start_server(
+        lambda r, w: handle_client_async(r, w, executor), host, port, backlog=4096, reuse_address=True)
+    bound_port = server.sockets[0].getsockname()[1]
+    log(f"Listening on port {bound_port} (asyncio)")
+    if on_listen is not None:
+        on_listen(bound_port)
+    async with server:
+        await server.serve_forever()
+
+# ─── Prometheus endpoint ─────────────────────────────────────────────────────
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics returns prometheus_text()."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        return
+
+def start_metrics_server(port, host=HOST):
+    """Serve /metrics over HTTP from a daemon thread."""
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    log(f"Metrics on http://{host}:{httpd.server_address[1]}/metrics")
+    return httpd
 
 def main():
+    global ARTIFICIAL_DELAY, DELAY_PROBABILITY, VERBOSE, PROCESS_WORKERS
+    parser = argparse.ArgumentParser(description="Simple RPC server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--delay", type=float, default=ARTIFICIAL_DELAY,
+                        help="Artificial delay before and after each call (seconds)")
+    parser.add_argument("--delay-prob", type=float, default=DELAY_PROBABILITY,
+                        help="Fraction of calls that get the artificial delay")
+    parser.add_argument("--quiet", action="store_true", help="Disable per-request logging")
+    parser.add_argument("--cache-size", type=int, default=CACHE_CAPACITY,
+                        help="Max responses kept for duplicate request_ids")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL,
+                        help="Seconds a completed response stays in the cache")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Serve Prometheus text at http://HOST:PORT/metrics (0 = off)")
+    parser.add_argument("--process-workers", type=int, default=PROCESS_WORKERS,
+                        help="Worker processes for executor='process' functions")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                        help="threads: one thread per connection; asyncio: single event loop")
+    args = parser.parse_args()
+    ARTIFICIAL_DELAY = args.delay
+    DELAY_PROBABILITY = args.delay_prob
+    VERBOSE = not args.quiet
+    RESPONSE_CACHE.capacity = args.cache_size
+    RESPONSE_CACHE.ttl = args.cache_ttl
+    PROCESS_WORKERS = args.process_workers
+    build_limiters()
+
     log("Starting RPC server...")
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
     log(f"Registered functions: {list(FUNCTIONS.keys())}")
-    
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((HOST, PORT))
-        s.listen()
-        log(f"Listening on port {PORT}")
-        
-        try:
-            while True:
-                conn, addr = s.accept()
-                threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
-        except KeyboardInterrupt:
-            log("Server shutting down...")
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+    try:
+        if args.engine == "asyncio":
+            asyncio.run(serve_async(HOST, args.port))
+        else:
+            serve(HOST, args.port)
+    except KeyboardInterrupt:
+        log("Server shutting down...")
+    finally:
+        stop_process_pool()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
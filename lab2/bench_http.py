@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: urllib (a new TCP connection per request) vs. the keep-alive pool.
+
+Starts one node, stores a key, then sends --requests GET /get requests with
+each transport: first one at a time (latency), then from --threads threads
+(throughput). The pooled transport reuses connections, so it skips the TCP
+handshake and the server-side thread start on every request.
+
+Usage:
+  python3 bench_http.py [--requests 2000] [--threads 8]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from urllib import request
+
+from httppool import ConnectionPool
+
+PORT = 9140
+BASE = f"http://127.0.0.1:{PORT}"
+
+
+def via_urllib(url):
+    with request.urlopen(url, timeout=5) as resp:
+        return resp.status, json.loads(resp.read().decode("utf-8"))
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def run(name, get, requests, threads):
+    url = BASE + "/get?key=k"
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        status, _ = get(url)
+        latencies.append(time.perf_counter() - start)
+        assert status == 200
+    latencies.sort()
+
+    per_thread = requests // threads
+
+    def worker():
+        for _ in range(per_thread):
+            get(url)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<7} p50={percentile(latencies, 50) * 1000:6.3f}ms p99={percentile(latencies, 99) * 1000:6.3f}ms  "
+          f"{threads} threads: {per_thread * threads / elapsed:8.0f} req/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP transport benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    proc = subprocess.Popen([sys.executable, "node.py", "--id", "A", "--port", str(PORT), "--quiet"],
+                            stdout=subprocess.DEVNULL)
+    try:
+        time.sleep(1.0)
+        pool = ConnectionPool()
+        pool.request_json("POST", BASE + "/put", {"key": "k", "value": "v"})
+        run("urllib", via_urllib, args.requests, args.threads)
+        run("pooled", lambda url: pool.request_json("GET", url), args.requests, args.threads)
+        print(f"pool: {pool.stats()}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
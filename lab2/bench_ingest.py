@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk ingest with single-key /put vs. multi-key /mput.
+
+Starts a local 2-node cluster (A, B) for each mode, writes --keys keys to A
+and reports client round trips, ingest throughput, and the time until B
+holds every key.
+
+  put   - one /put per key from --threads keep-alive client threads
+  mput  - /mput requests of --batch-size keys each, sent sequentially
+
+Usage:
+  python3 bench_ingest.py [--keys 100000] [--put-keys 10000] [--batch-size 10000]
+
+Single-key /put is much slower, so it only writes --put-keys keys.
+"""
+
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+
+BASE_PORT = 9110
+
+
+def start_cluster():
+    ports = [BASE_PORT, BASE_PORT + 1]
+    procs = []
+    for i, node_id in enumerate("AB"):
+        peer = f"http://127.0.0.1:{ports[1 - i]}"
+        procs.append(subprocess.Popen([sys.executable, "node.py", "--id", node_id, "--port", str(ports[i]),
+                                       "--peers", peer, "--quiet"], stdout=subprocess.DEVNULL))
+    time.sleep(1.0)
+    return procs, ports
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return json.loads(resp.read().decode("utf-8"))
+
+
+def ingest_put(port, keys, threads):
+    per_thread = keys // threads
+
+    def writer(t):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        for i in range(per_thread):
+            request(conn, "POST", "/put", {"key": f"k{t}-{i}", "value": i})
+        conn.close()
+
+    workers = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads, per_thread * threads
+
+
+def ingest_mput(port, keys, batch_size):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    trips = 0
+    for start in range(0, keys, batch_size):
+        items = [{"key": f"k{i}", "value": i} for i in range(start, min(keys, start + batch_size))]
+        assert request(conn, "POST", "/mput", {"items": items})["ok"]
+        trips += 1
+    conn.close()
+    return keys, trips
+
+
+def run(mode, ingest):
+    procs, ports = start_cluster()
+    try:
+        start = time.perf_counter()
+        total, trips = ingest(ports[0])
+        write_time = time.perf_counter() - start
+        peer = http.client.HTTPConnection("127.0.0.1", ports[1], timeout=30)
+        while len(request(peer, "GET", "/status")["store"]) < total:
+            time.sleep(0.05)
+        drain_time = time.perf_counter() - start
+        print(f"{mode:<5} keys={total:<7} round trips={trips:<7} ingest={total / write_time:>9.0f} keys/sec  "
+              f"replicated in {drain_time:>6.2f}s")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest benchmark")
+    parser.add_argument("--keys", type=int, default=100000)
+    parser.add_argument("--put-keys", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run("put", lambda port: ingest_put(port, args.put_keys, args.threads))
+    run("mput", lambda port: ingest_mput(port, args.keys, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
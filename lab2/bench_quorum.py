@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency vs. consistency for read/write quorums on 3 local nodes.
+
+For each W/R pair in --configs, starts a 3-node cluster (A, B, C) and, --ops
+times, writes a fresh value to A with that W and immediately reads it back
+from B with that R. Reports put and get p50/p99 latency and the fraction of
+reads that returned an older value (stale). With R + W > N = 3 a read always
+overlaps the write quorum, so stale reads should drop to zero.
+
+Usage:
+  python3 bench_quorum.py [--ops 500] [--configs 1/1,2/1,1/2,2/2,3/1,1/3]
+"""
+
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import time
+
+BASE_PORT = 9120
+
+
+def start_cluster():
+    ports = [BASE_PORT + i for i in range(3)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    procs = []
+    for i, node_id in enumerate("ABC"):
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        procs.append(subprocess.Popen([sys.executable, "node.py", "--id", node_id, "--port", str(ports[i]),
+                                       "--peers", peers, "--quiet"], stdout=subprocess.DEVNULL))
+    time.sleep(1.0)
+    return procs, ports
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read().decode("utf-8"))
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def run(w, r, ops):
+    procs, ports = start_cluster()
+    try:
+        writer = http.client.HTTPConnection("127.0.0.1", ports[0], timeout=10)
+        reader = http.client.HTTPConnection("127.0.0.1", ports[1], timeout=10)
+        puts, gets, stale = [], [], 0
+        for i in range(ops):
+            start = time.perf_counter()
+            status, _ = request(writer, "POST", "/put", {"key": "k", "value": i, "w": w})
+            puts.append(time.perf_counter() - start)
+            assert status == 200
+
+            start = time.perf_counter()
+            status, obj = request(reader, "GET", f"/get?key=k&r={r}")
+            gets.append(time.perf_counter() - start)
+            if status != 200 or obj.get("value") != i:
+                stale += 1
+        puts.sort()
+        gets.sort()
+        print(f"W={w} R={r}  put p50={percentile(puts, 50) * 1000:6.2f}ms p99={percentile(puts, 99) * 1000:6.2f}ms  "
+              f"get p50={percentile(gets, 50) * 1000:6.2f}ms p99={percentile(gets, 99) * 1000:6.2f}ms  "
+              f"stale={stale / ops:6.1%}")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quorum latency/consistency benchmark")
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--configs", default="1/1,2/1,1/2,2/2,3/1,1/3")
+    args = parser.parse_args()
+    for config in args.configs.split(","):
+        w, r = (int(x) for x in config.split("/"))
+        run(w, r, args.ops)
+
+
+if __name__ == "__main__":
+    main()
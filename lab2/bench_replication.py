@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: write throughput and replication catch-up vs. batch size.
+
+For each --batch-sizes value, starts a local 3-node cluster (A/B/C),
+sends --puts writes to node A from --threads keep-alive client threads,
+and reports:
+  - write throughput seen by clients (puts/sec)
+  - time until both peers hold every key (replication drain)
+  - number of /replicate_batch requests A needed
+
+Usage:
+  python3 bench_replication.py [--puts 5000] [--threads 8] [--batch-sizes 1,16,256]
+"""
+
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+
+BASE_PORT = 9100
+
+
+def start_cluster(batch_size):
+    ports = [BASE_PORT, BASE_PORT + 1, BASE_PORT + 2]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    procs = []
+    for i, node_id in enumerate("ABC"):
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        procs.append(subprocess.Popen([sys.executable, "node.py", "--id", node_id, "--port", str(ports[i]),
+                                       "--peers", peers, "--batch-size", str(batch_size), "--quiet"],
+                                      stdout=subprocess.DEVNULL))
+    time.sleep(1.0)
+    return procs, ports
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return json.loads(resp.read().decode("utf-8"))
+
+
+def run(batch_size, puts, threads):
+    procs, ports = start_cluster(batch_size)
+    try:
+        per_thread = puts // threads
+
+        def writer(t):
+            conn = http.client.HTTPConnection("127.0.0.1", ports[0], timeout=10)
+            for i in range(per_thread):
+                request(conn, "POST", "/put", {"key": f"k{t}-{i}", "value": i})
+            conn.close()
+
+        workers = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        write_time = time.perf_counter() - start
+
+        total = per_thread * threads
+        peers = [http.client.HTTPConnection("127.0.0.1", p, timeout=10) for p in ports[1:]]
+        while True:
+            sizes = [len(request(c, "GET", "/status")["store"]) for c in peers]
+            if all(n >= total for n in sizes):
+                break
+            time.sleep(0.05)
+        drain_time = time.perf_counter() - start
+
+        status = request(http.client.HTTPConnection("127.0.0.1", ports[0], timeout=10), "GET", "/status")
+        batches = sum(s["batches"] for s in status["replication"].values())
+        print(f"batch={batch_size:<5} puts={total:<6} write={total / write_time:>8.0f} puts/sec  "
+              f"replicated in {drain_time:>6.2f}s  batches sent={batches}")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replication batching benchmark")
+    parser.add_argument("--puts", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batch-sizes", default="1,16,256")
+    args = parser.parse_args()
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        run(batch_size, args.puts, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full replication vs. consistent-hash partitioning as nodes are added.
+
+For each node count in --nodes, starts a local cluster in each mode:
+
+  full  - every node stores every key (the default, --replication-factor 0)
+  ring  - keys partitioned on the ring with --replication-factor replicas
+
+and has --clients keep-alive client threads /put random keys for --seconds,
+sending each request to a random node (non-owners forward it) or, with
+--route owner, straight to the key's first replica. Reports aggregate
+puts/sec, replication messages per put, and the keys each node ends up
+storing. Then adds one more node to the largest ring cluster and reports how
+many keys moved and how long the rebalance took.
+
+Full replication sends every write to all N-1 peers and stores every key on
+every node, so per-node work grows with the cluster. On the ring both stay
+at RF per write however many nodes there are. Aggregate throughput can only
+grow with the node count when the nodes have CPUs of their own; on a single
+machine the benchmark shows per-node load falling instead.
+
+Usage:
+  python3 bench_ring.py [--nodes 1,2,4] [--replication-factor 2] [--seconds 5] [--clients 8]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from ring import HashRing, DEFAULT_VNODES
+
+BASE_PORT = 9130
+
+
+def url(port):
+    return f"http://127.0.0.1:{port}"
+
+
+def start_node(i, port, peers, rf, join=""):
+    cmd = [sys.executable, "node.py", "--id", f"N{i}", "--port", str(port), "--quiet",
+           "--replication-factor", str(rf)]
+    if peers:
+        cmd += ["--peers", ",".join(peers)]
+    if join:
+        cmd += ["--join", join]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+
+
+def start_cluster(n, rf):
+    ports = [BASE_PORT + i for i in range(n)]
+    procs = [start_node(i, p, [url(q) for q in ports if q != p], rf) for i, p in enumerate(ports)]
+    time.sleep(1.0)
+    return procs, ports
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read().decode("utf-8"))
+
+
+def status(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        return request(conn, "GET", "/status")[1]
+    finally:
+        conn.close()
+
+
+def drain(ports):
+    """Wait until no node has replication queued."""
+    for _ in range(100):
+        if all(s["queued"] == 0 for p in ports for s in status(p)["replication"].values()):
+            return
+        time.sleep(0.1)
+
+
+def load(ports, rf, seconds, clients, keys, route):
+    ring = HashRing([url(p) for p in ports], DEFAULT_VNODES)
+    counts = [0] * clients
+    stop = threading.Event()
+
+    def client(t):
+        rng = random.Random(t)
+        conns = {p: http.client.HTTPConnection("127.0.0.1", p, timeout=30) for p in ports}
+        n = 0
+        while not stop.is_set():
+            key = f"key-{rng.randrange(keys)}"
+            if route == "owner" and rf:
+                port = int(ring.preference_list(key, 1)[0].rsplit(":", 1)[1])
+            else:
+                port = rng.choice(ports)
+            code, _ = request(conns[port], "POST", "/put", {"key": key, "value": n})
+            if code == 200:
+                n += 1
+        counts[t] = n
+        for c in conns.values():
+            c.close()
+
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(clients)]
+    for w in workers:
+        w.start()
+    time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    return sum(counts)
+
+
+def run(mode, n, args):
+    rf = args.replication_factor if mode == "ring" else 0
+    procs, ports = start_cluster(n, rf)
+    try:
+        puts = load(ports, rf, args.seconds, args.clients, args.keys, args.route)
+        drain(ports)
+        stats = [status(p) for p in ports]
+        sent = sum(s["sent"] for st in stats for s in st["replication"].values())
+        stored = [len(st["store"]) for st in stats]
+        forwarded = sum((st["ring"] or {}).get("forwarded", 0) for st in stats)
+        print(f"{mode:<4} nodes={n}  {puts / args.seconds:>7.0f} puts/sec  "
+              f"repl msgs/put={sent / max(puts, 1):4.2f}  forwarded={forwarded / max(puts, 1):4.0%}  "
+              f"keys/node={stored}")
+        if mode == "ring" and n == max(args.node_counts):
+            join(procs, ports, rf, stored)
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+
+def join(procs, ports, rf, stored_before):
+    port = ports[-1] + 1
+    start = time.perf_counter()
+    procs.append(start_node(len(ports), port, [], rf, join=url(ports[0])))
+    ports = ports + [port]
+    time.sleep(0.5)
+    while True:
+        try:
+            stats = [status(p) for p in ports]
+        except OSError:
+            time.sleep(0.1)
+            continue
+        ring_stats = [st["ring"] for st in stats[:-1]]
+        queued = sum(s["queued"] for st in stats for s in st["replication"].values())
+        if all(len(r["members"]) == len(ports) and r["rebalances"] >= 1 for r in ring_stats) and not queued:
+            break
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    moved = sum(r["keys_pushed"] for r in ring_stats)
+    stored = [len(st["store"]) for st in stats]
+    print(f"join node {len(ports)}: moved {moved} of {sum(stored_before)} stored copies "
+          f"({moved / max(sum(stored_before), 1):.0%}) in {elapsed:.2f}s  keys/node={stored}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioning scale-out benchmark")
+    parser.add_argument("--nodes", default="1,2,4")
+    parser.add_argument("--replication-factor", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--keys", type=int, default=20000)
+    parser.add_argument("--route", choices=["any", "owner"], default="any",
+                        help="send each put to a random node (any) or to the key's first replica (owner)")
+    args = parser.parse_args()
+    args.node_counts = [int(n) for n in args.nodes.split(",")]
+    for n in args.node_counts:
+        for mode in ("full", "ring"):
+            run(mode, n, args)
+
+
+if __name__ == "__main__":
+    main()
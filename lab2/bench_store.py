@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: StripedStore read/write throughput vs. shard count.
+
+For each --shards value, --threads worker threads run a mixed workload of
+gets and LWW applies (--write-ratio) over --keys keys for --seconds, while
+one extra thread keeps taking full snapshots the way WAL snapshots do. Reports
+worker ops/sec and how many snapshots completed.
+
+shards=1 is equivalent to the old single global lock: every snapshot copy
+blocks every reader and writer. With more shards, a snapshot only holds one
+shard's lock at a time and only re-copies shards that changed.
+
+Usage:
+  python3 bench_store.py [--threads 8] [--keys 100000] [--shards 1,4,16,64]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from node import lww_wins
+from store import StripedStore
+
+
+def run(shards, threads, keys, seconds, write_ratio):
+    store = StripedStore(shards)
+    names = [f"key-{i}" for i in range(keys)]
+    for i, key in enumerate(names):
+        store.apply(key, (i, 1, "A"), lww_wins)
+
+    stop = threading.Event()
+    ops = [0] * threads
+    snapshots = [0]
+
+    def worker(t):
+        rng = random.Random(t)
+        ts = 1
+        n = 0
+        while not stop.is_set():
+            for _ in range(100):
+                key = names[rng.randrange(keys)]
+                if rng.random() < write_ratio:
+                    ts += 1
+                    store.apply(key, (ts, ts, "A"), lww_wins)
+                else:
+                    store.get(key)
+            n += 100
+        ops[t] = n
+
+    def snapshotter():
+        while not stop.is_set():
+            sum(1 for _ in store.items())
+            snapshots[0] += 1
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    workers.append(threading.Thread(target=snapshotter))
+    for w in workers:
+        w.start()
+    time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    print(f"shards={shards:<4} {sum(ops) / seconds:>10.0f} ops/sec  snapshots={snapshots[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Striped store benchmark")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--keys", type=int, default=100000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--shards", default="1,4,16,64")
+    args = parser.parse_args()
+    for shards in [int(s) for s in args.shards.split(",")]:
+        run(shards, args.threads, args.keys, args.seconds, args.write_ratio)
+
+
+if __name__ == "__main__":
+    main()
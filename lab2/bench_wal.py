@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: node startup (recovery) time vs. store size.
+
+For each --sizes value, builds two data directories with the same N keys:
+  log only         - every write is still in the WAL (nothing compacted)
+  snapshot + tail  - a snapshot of the store plus a WAL tail of --tail-pct %
+and times WriteAheadLog.recover() into a fresh store (Merkle tree included,
+as in node.py). Also reports the on-disk size of each directory.
+
+Usage:
+  python3 bench_wal.py [--sizes 1000,10000,100000,500000] [--tail-pct 1]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from merkle import MerkleTree
+from node import lww_wins
+from store import StripedStore
+from wal import WriteAheadLog
+
+
+def build(path, size, snapshot, tail):
+    wal = WriteAheadLog(path)
+    wal.recover(lambda key, entry: None)
+    entries = {f"key-{i}": (i, i + 1, "A") for i in range(size)}
+    if snapshot:
+        wal.start(lambda: entries.items())
+        wal.write_snapshot(wal.segment)
+        keys = list(entries)[:tail]
+    else:
+        wal.start(lambda: [])
+        keys = list(entries)
+    for key in keys:
+        wal.append(key, entries[key])
+    wal.sync()
+    wal.close()
+    time.sleep(0.05)  # let the flusher close its segment
+
+
+def recover(path):
+    tree = MerkleTree()
+    store = StripedStore(64, on_change=tree.update)
+    start = time.perf_counter()
+    info = WriteAheadLog(path).recover(lambda key, entry: store.apply(key, entry, lww_wins))
+    return time.perf_counter() - start, len(store), info
+
+
+def disk_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WAL/snapshot recovery benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000,500000")
+    parser.add_argument("--tail-pct", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'keys':>8} {'layout':<16} {'disk MB':>8} {'startup s':>10} {'replayed':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for label, snapshot in (("log only", False), ("snapshot + tail", True)):
+            path = tempfile.mkdtemp(prefix="bench_wal_")
+            try:
+                build(path, size, snapshot, int(size * args.tail_pct / 100))
+                elapsed, keys, info = recover(path)
+                assert keys == size
+                print(f"{size:>8} {label:<16} {disk_bytes(path) / 1e6:>8.2f} {elapsed:>10.3f} {info['replayed']:>9}")
+            finally:
+                shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,38 @@
 #!/usr/bin/env python3
 """Lab 2 Starter Client (standard library only)."""
 
-from urllib import request, parse
+from urllib import parse
 import argparse
 import json
 import sys
 
+from httppool import ConnectionPool
+
+POOL = ConnectionPool()  # one keep-alive connection serves every request of a command (mput batches, scan --all)
+
 def http_post_json(url: str, payload: dict, timeout_s: float = 2.0):
-    """POST JSON and return (status_code, json_body)."""
-    data = json.dumps(payload).encode("utf-8")
-    req = request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
-    with request.urlopen(req, timeout=timeout_s) as resp:
-        return resp.status, json.loads(resp.read().decode("utf-8"))
+    """POST JSON and return (status_code, json_body); 4xx/5xx still carry a JSON body."""
+    return POOL.request_json("POST", url, payload, timeout_s)
 
 def http_get_json(url: str, timeout_s: float = 2.0):
     """GET and return (status_code, json_body)."""
-    with request.urlopen(url, timeout=timeout_s) as resp:
-        return resp.status, json.loads(resp.read().decode("utf-8"))
+    return POOL.request_json("GET", url, None, timeout_s)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--node", required=True, help="Base URL, e.g. http://10.0.1.12:8000")
-    ap.add_argument("cmd", choices=["put", "get", "status"])
-    ap.add_argument("key", nargs="?")
-    ap.add_argument("value", nargs="?")
-    args = ap.parse_args()
+    ap.add_argument("cmd", choices=["put", "get", "mput", "mget", "scan", "status", "join", "leave"])
+    ap.add_argument("key", nargs="?", help="put/get: key; scan: start key; join/leave: member base URL")
+    ap.add_argument("value", nargs="?", help="put: value; scan: page size")
+    ap.add_argument("more", nargs="*", help="mput: key=value ...; mget: key ...")
+    ap.add_argument("--context", help="put (vv mode): JSON version vector from a previous get, e.g. '{\"A\": 2}'")
+    ap.add_argument("--w", type=int, help="put/mput: replicas that must ack (write quorum)")
+    ap.add_argument("--r", type=int, help="get/mget: replicas to read from (read quorum)")
+    ap.add_argument("--file", help="mput: JSON object {key: value, ...} to load")
+    ap.add_argument("--batch-size", type=int, default=10000, help="mput/mget: keys per request")
+    ap.add_argument("--prefix", default="", help="scan: only keys with this prefix")
+    ap.add_argument("--all", action="store_true", help="scan: follow the cursor through every page")
+    args = ap.parse_intermixed_args()
 
     base = args.node.rstrip("/")
 
@@ -32,7 +40,12 @@ def main():
         if args.key is None or args.value is None:
             print("put requires key and value")
             sys.exit(2)
-        status, obj = http_post_json(base + "/put", {"key": args.key, "value": args.value})
+        payload = {"key": args.key, "value": args.value}
+        if args.context:
+            payload["context"] = json.loads(args.context)
+        if args.w:
+            payload["w"] = args.w
+        status, obj = http_post_json(base + "/put", payload)
         print(status, json.dumps(obj, indent=2))
         return
 
@@ -40,11 +53,70 @@ def main():
         if args.key is None:
             print("get requires key")
             sys.exit(2)
-        url = base + "/get?" + parse.urlencode({"key": args.key})
+        query = {"key": args.key}
+        if args.r:
+            query["r"] = args.r
+        url = base + "/get?" + parse.urlencode(query)
         status, obj = http_get_json(url)
         print(status, json.dumps(obj, indent=2))
         return
 
+    words = [w for w in (args.key, args.value) if w is not None] + args.more
+
+    if args.cmd == "mput":
+        if args.file:
+            with open(args.file, encoding="utf-8") as f:
+                items = [{"key": k, "value": v} for k, v in json.load(f).items()]
+        else:
+            if not words or not all("=" in w for w in words):
+                print("mput requires key=value pairs or --file")
+                sys.exit(2)
+            items = [{"key": k, "value": v} for k, v in (w.split("=", 1) for w in words)]
+        for i in range(0, len(items), args.batch_size):
+            payload = {"items": items[i:i + args.batch_size]}
+            if args.w:
+                payload["w"] = args.w
+            status, obj = http_post_json(base + "/mput", payload, timeout_s=30.0)
+            print(status, json.dumps(obj))
+            if status != 200:
+                sys.exit(1)
+        return
+
+    if args.cmd == "mget":
+        if not words:
+            print("mget requires keys")
+            sys.exit(2)
+        for i in range(0, len(words), args.batch_size):
+            payload = {"keys": words[i:i + args.batch_size]}
+            if args.r:
+                payload["r"] = args.r
+            status, obj = http_post_json(base + "/mget", payload, timeout_s=30.0)
+            print(status, json.dumps(obj, indent=2))
+        return
+
+    if args.cmd == "scan":
+        query = {"start": args.key or "", "limit": args.value or 100, "prefix": args.prefix}
+        while True:
+            status, obj = http_get_json(base + "/scan?" + parse.urlencode(query))
+            for e in obj.get("entries", []):
+                # In vv mode a key with concurrent writes has no single "value", only its siblings
+                shown = json.dumps(e["value"]) if "value" in e else "siblings=" + json.dumps(e["values"])
+                print(f"{e['key']}\t{shown}\tts={e['ts']} origin={e['origin']}")
+            if status != 200 or not args.all or obj.get("next") is None:
+                break
+            query["start"] = obj["next"]
+        if status != 200 or obj.get("next") is not None:
+            print(status, json.dumps({k: v for k, v in obj.items() if k != "entries"}))
+        return
+
+    if args.cmd in ("join", "leave"):
+        if args.key is None:
+            print(f"{args.cmd} requires the member's base URL")
+            sys.exit(2)
+        status, obj = http_post_json(base + "/membership", {"action": args.cmd, "url": args.key}, timeout_s=30.0)
+        print(status, json.dumps(obj, indent=2))
+        return
+
     if args.cmd == "status":
         status, obj = http_get_json(base + "/status")
         print(status, json.dumps(obj, indent=2))
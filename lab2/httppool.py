@@ -0,0 +1,137 @@
+"""
+Keep-alive HTTP connection pool shared by the Lab 2 node and client.
+
+Opening a TCP connection per request costs a handshake (and a server
+thread) every time. The pool keeps finished connections per host and hands
+them to the next request for that host, so steady traffic between two
+nodes runs over a few long-lived connections.
+
+  - At most max_connections connections per host are open at once (in use
+    or idle); a request that finds none free waits up to its timeout.
+  - At most max_idle idle connections per host are kept. A connection idle
+    for longer than idle_timeout is closed instead of reused, which also
+    lets the server's handler thread for it exit.
+  - A reused connection may have been closed by the server meanwhile (e.g.
+    it restarted). A request that fails that way before any response is
+    retried once on a fresh connection.
+
+Needs the server to speak HTTP/1.1 (the node's Handler does).
+"""
+
+import http.client
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib import parse
+
+MAX_CONNECTIONS = 16  # per host, in use or idle
+MAX_IDLE = 8          # idle connections kept per host
+IDLE_TIMEOUT = 30.0   # seconds an idle connection may be reused
+
+# Errors that mean the server closed a kept-alive connection before answering
+_STALE = (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine)
+
+
+class _Host:
+    __slots__ = ("idle", "slots")
+
+    def __init__(self, max_connections: int) -> None:
+        self.idle: Deque[Tuple[http.client.HTTPConnection, float]] = deque()  # oldest first
+        self.slots = threading.BoundedSemaphore(max_connections)
+
+
+class ConnectionPool:
+    def __init__(self, max_connections: int = MAX_CONNECTIONS, max_idle: int = MAX_IDLE,
+                 idle_timeout: float = IDLE_TIMEOUT) -> None:
+        self.max_connections = max_connections
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.hosts: Dict[Tuple[str, int], _Host] = {}
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _evict(self, host: _Host, now: float) -> None:
+        while host.idle and now - host.idle[0][1] > self.idle_timeout:
+            host.idle.popleft()[0].close()
+            self.evicted += 1
+
+    def _checkout(self, addr: Tuple[str, int], host: _Host,
+                  timeout_s: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """An idle connection to addr (most recently used first), or a new one. Returns (conn, reused)."""
+        with self.lock:
+            self._evict(host, time.monotonic())
+            if host.idle:
+                self.reused += 1
+                return host.idle.pop()[0], True
+            self.created += 1
+        return http.client.HTTPConnection(addr[0], addr[1], timeout=timeout_s), False
+
+    def _checkin(self, host: _Host, conn: http.client.HTTPConnection) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self._evict(host, now)
+            if len(host.idle) < self.max_idle:
+                host.idle.append((conn, now))
+                return
+        conn.close()
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None, timeout_s: float = 2.0) -> Tuple[int, bytes]:
+        """Send one request to an absolute http:// URL and return (status, body) whatever the status."""
+        parsed = parse.urlsplit(url)
+        addr = (parsed.hostname or "127.0.0.1", parsed.port or 80)
+        path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        with self.lock:
+            host = self.hosts.get(addr)
+            if host is None:
+                host = self.hosts[addr] = _Host(self.max_connections)
+        if not host.slots.acquire(timeout=timeout_s):
+            raise TimeoutError(f"no free connection to {addr[0]}:{addr[1]}")
+        try:
+            while True:
+                conn, reused = self._checkout(addr, host, timeout_s)
+                conn.timeout = timeout_s
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout_s)
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except _STALE:
+                    conn.close()
+                    if reused:
+                        continue  # closed while idle: retry on a fresh connection
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._checkin(host, conn)
+                return resp.status, data
+        finally:
+            host.slots.release()
+
+    def request_json(self, method: str, url: str, obj: Any = None,
+                     timeout_s: float = 2.0) -> Tuple[int, Dict[str, Any]]:
+        """request() with a JSON body (if obj is not None) and a JSON reply."""
+        body = json.dumps(obj).encode("utf-8") if obj is not None else None
+        status, data = self.request(method, url, body, {"Content-Type": "application/json"}, timeout_s)
+        return status, json.loads(data.decode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            idle = sum(len(h.idle) for h in self.hosts.values())
+            return {"hosts": len(self.hosts), "idle": idle, "created": self.created,
+                    "reused": self.reused, "evicted": self.evicted}
+
+    def close(self) -> None:
+        with self.lock:
+            for host in self.hosts.values():
+                while host.idle:
+                    host.idle.pop()[0].close()
@@ -0,0 +1,95 @@
+"""
+Incrementally maintained Merkle tree over key-hash buckets, for anti-entropy.
+
+Every key falls into one of 2**depth leaf buckets by a stable hash of the
+key. A leaf's hash is the XOR of the digests of the entries in it, and an
+inner node's hash is the XOR of its children. A write therefore updates the
+tree in O(depth) integer XORs, without rehashing anything.
+
+Nodes are numbered heap-style: 1 is the root, the children of i are 2i and
+2i+1, and leaf bucket b is node 2**depth + b. Two replicas with equal node
+hashes hold the same entries under that node. diff_leaves() descends only
+into nodes that differ, so the work grows with the divergence and not with
+the store size.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+Entry = Tuple[Any, int, str]  # (value, ts, origin)
+
+DEFAULT_DEPTH = 10  # 1024 leaf buckets
+
+
+def _h(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=16).digest(), "big")
+
+
+def entry_digest(key: str, entry: Entry) -> int:
+    value, ts, origin = entry
+    return _h(json.dumps([key, value, ts, origin], sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+
+class MerkleTree:
+    def __init__(self, depth: int = DEFAULT_DEPTH) -> None:
+        self.depth = depth
+        self.leaves = 1 << depth
+        self.tree: List[int] = [0] * (2 * self.leaves)
+        self.keys: List[Set[str]] = [set() for _ in range(self.leaves)]
+        self.lock = threading.Lock()
+
+    def bucket(self, key: str) -> int:
+        """Leaf bucket of a key; stable across processes, unlike hash()."""
+        return _h(key.encode("utf-8")) & (self.leaves - 1)
+
+    def update(self, key: str, old: Optional[Entry], new: Optional[Entry]) -> None:
+        """Account for key changing from `old` to `new` (None = absent on either side)."""
+        delta = 0
+        if new is not None:
+            delta ^= entry_digest(key, new)
+        if old is not None:
+            delta ^= entry_digest(key, old)
+        b = self.bucket(key)
+        with self.lock:
+            if old is None:
+                self.keys[b].add(key)
+            elif new is None:
+                self.keys[b].discard(key)
+            i = self.leaves + b
+            while i:
+                self.tree[i] ^= delta
+                i >>= 1
+
+    def hashes(self, nodes: List[int]) -> List[int]:
+        with self.lock:
+            return [self.tree[i] if 0 < i < len(self.tree) else 0 for i in nodes]
+
+    def keys_in(self, bucket: int) -> List[str]:
+        with self.lock:
+            return list(self.keys[bucket])
+
+    def root(self) -> int:
+        return self.tree[1]
+
+
+def diff_leaves(local: MerkleTree, remote_hashes: Callable[[List[int]], List[int]]) -> Tuple[List[int], int]:
+    """
+    Find the leaf buckets whose hashes differ between `local` and a remote tree
+    of the same depth. `remote_hashes(nodes)` returns the remote hashes for a
+    list of node ids, and is called once per tree level that still differs.
+
+    Returns (differing leaf buckets, number of node hashes fetched).
+    """
+    frontier = [1]
+    fetched = 0
+    while frontier:
+        theirs = remote_hashes(frontier)
+        fetched += len(frontier)
+        ours = local.hashes(frontier)
+        differing = [n for n, a, b in zip(frontier, ours, theirs) if a != b]
+        if not differing or differing[0] >= local.leaves:
+            return [n - local.leaves for n in differing], fetched
+        frontier = [c for n in differing for c in (2 * n, 2 * n + 1)]
+    return [], fetched
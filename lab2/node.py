@@ -4,28 +4,58 @@ Lab 2 Starter Node (3-node ready)
 Lamport Clock + Replicated Key–Value Store (LWW)
 
 Endpoints:
-  POST /put        {"key": "...", "value": ...}
-  GET  /get?key=...
-  POST /replicate  {"key":"...", "value":..., "ts": <lamport>, "origin":"A"}
-  GET  /status
+  POST /put              {"key": "...", "value": ..., "w": <acks>}
+  GET  /get?key=...&r=<replicas>
+  POST /replicate        {"key":"...", "value":..., "ts": <lamport>, "origin":"A"}
+  POST /mput             {"items": [{"key": "...", "value": ...}, ...], "w": <acks>}
+  POST /mget             {"keys": ["...", ...], "r": <replicas>}
+  POST /fetch            {"keys": [...]} -> raw local entries (used by quorum reads)
+  POST /replicate_batch  {"from":"A", "updates": [{"key":..., "value":..., "ts":..., "origin":...}, ...]}
+  POST /sync             {"nodes": [1, 2, ...]} -> Merkle node hashes; {"buckets": [...]} -> entries
+  POST /membership       {"action": "join"|"leave", "url": "..."} (ring mode: --replication-factor > 0)
+  GET  /scan?start=&limit=&prefix=   ordered page of entries + "next" cursor
+  GET  /status           (store streamed with chunked transfer encoding)
 
 Look for '# YOUR CODE HERE' markers for required and optional extensions.
 """
 
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib import request, parse
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait
+from urllib import parse
 import argparse
 import json
 import threading
 import time
-from typing import Dict, Any, Tuple, List
+from typing import Callable, Dict, Any, Tuple, List, Optional
 
-lock = threading.Lock()
+from httppool import ConnectionPool
+from merkle import MerkleTree, diff_leaves
+from ring import HashRing, DEFAULT_VNODES
+from store import StripedStore
+from wal import WriteAheadLog, COMPACT_BYTES
+import vclock
+
+clock_lock = threading.Lock()  # guards LAMPORT only; the store has its own per-shard locks
 
 LAMPORT = 0
-STORE: Dict[str, Tuple[Any, int, str]] = {}  # key -> (value, ts, origin)
+STORE_SHARDS = 64
+MERKLE = MerkleTree()  # hash tree over key buckets, kept in step with STORE
+WAL: Optional[WriteAheadLog] = None  # durable log of applied writes, when --data-dir is set
+
+
+def on_store_change(key: str, old: Optional[Tuple[Any, int, str]], new: Optional[Tuple[Any, int, str]]) -> None:
+    """Runs under the key's shard lock for every write or delete STORE accepts (new is None on delete)."""
+    MERKLE.update(key, old, new)
+    if WAL is not None:
+        WAL.append(key, new)
+
+
+STORE = StripedStore(STORE_SHARDS, on_change=on_store_change)  # key -> (value, ts, origin)
 NODE_ID = ""
 PEERS: List[str] = []  # base URLs, e.g. http://10.0.1.12:8000
+VERBOSE = True  # per-request log lines
+MODE = "lww"  # conflict handling: "lww" (Lamport last-writer-wins) or "vv" (version vectors + siblings)
 
 DELAY_RULES = {
     # Example format:
@@ -33,11 +63,46 @@ DELAY_RULES = {
     # Configured dynamically in main() based on NODE_ID for Scenario A
 }
 
+# Replication: one long-lived sender per peer (see PeerSender)
+REPL_BATCH_SIZE = 256        # max updates per /replicate_batch request
+REPL_QUEUE_SIZE = 100000     # max distinct keys waiting per peer
+REPL_ENQUEUE_TIMEOUT = 1.0   # seconds a writer waits for queue space before dropping
+REPL_BACKOFF_MAX = 60.0      # seconds, cap for per-peer exponential backoff
+SENDERS: Dict[str, "PeerSender"] = {}
+HTTP_POOL = ConnectionPool()  # keep-alive connections to peers, shared by senders, sync, quorums and forwarding
+
+# Anti-entropy: Merkle-tree diff against each peer, pulling only differing buckets
+ANTI_ENTROPY_INTERVAL = 10.0  # seconds between background rounds; 0 disables
+SYNC_BUCKETS_PER_REQUEST = 64
+SYNC_STATS = {"rounds": 0, "hashes_fetched": 0, "buckets_pulled": 0, "keys_applied": 0}
+
+# Quorums over the N = 1 + len(PEERS) replicas; W=R=1 is plain async replication
+QUORUM_W = 1                 # replicas (including this node) that must ack a write
+QUORUM_R = 1                 # replicas (including this node) a read consults
+QUORUM_TIMEOUT = 2.0         # seconds to wait for W acks / R replies
+QUORUM_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="quorum")
+QUORUM_STATS = {"write_timeouts": 0, "read_timeouts": 0, "read_repairs": 0}
+
+SCAN_DEFAULT_LIMIT = 100
+SCAN_MAX_LIMIT = 10000
+STATUS_PAGE = 1000  # entries per chunk when streaming /status
+
+# Partitioning: with --replication-factor > 0, keys live only on their replicas on a consistent-hash ring
+RING: Optional[HashRing] = None  # None = full replication (every node stores every key)
+SELF_URL = ""                # this node's base URL, as the other members know it
+REPLICATION_FACTOR = 0       # replicas per key on the ring
+FORWARD_TIMEOUT = 5.0        # seconds to wait for an owner handling a forwarded request (covers its quorum wait)
+REBALANCE_PAGE = 1000        # keys examined, and pushed as one group per new owner, per rebalance step
+REBALANCE_TIMEOUT = 30.0     # seconds to wait for a step's pushes before keeping its keys instead of dropping them
+REBALANCE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rebalance")  # ring changes in order
+MEMBERSHIP_LOCK = threading.Lock()
+RING_STATS = {"forwarded": 0, "rebalances": 0, "keys_pushed": 0, "keys_dropped": 0, "last_rebalance_s": 0.0}
+
 
 def lamport_tick_local() -> int:
     """Increment Lamport clock for a local event and return new value."""
     global LAMPORT
-    with lock:
+    with clock_lock:
         LAMPORT += 1
         return LAMPORT
 
@@ -45,15 +110,23 @@ def lamport_tick_local() -> int:
 def lamport_on_receive(received_ts: int) -> int:
     """On receive: L = max(L, received_ts) + 1. Return new value."""
     global LAMPORT
-    with lock:
+    with clock_lock:
         LAMPORT = max(LAMPORT, received_ts) + 1
         return LAMPORT
 
 
+def lamport_reserve(n: int) -> int:
+    """Reserve n consecutive local-event timestamps in one step; return the first."""
+    global LAMPORT
+    with clock_lock:
+        first = LAMPORT + 1
+        LAMPORT += n
+        return first
+
+
 def get_lamport() -> int:
-    """Return current Lamport clock value."""
-    with lock:
-        return LAMPORT
+    """Return current Lamport clock value (a single read, so no lock is needed)."""
+    return LAMPORT
 
 
 def apply_lww(key: str, value: Any, ts: int, origin: str) -> bool:
@@ -61,80 +134,673 @@ def apply_lww(key: str, value: Any, ts: int, origin: str) -> bool:
     Apply Last-Writer-Wins update using Lamport timestamp.
     Tie-breaker: origin lexicographic. Returns True if applied.
     """
-    with lock:
-        cur = STORE.get(key)
-        if cur is None:
-            STORE[key] = (value, ts, origin)
-            return True
-        _, cur_ts, cur_origin = cur
-        if ts > cur_ts or (ts == cur_ts and origin > cur_origin):
-            STORE[key] = (value, ts, origin)
-            return True
-        return False
+    return STORE.apply(key, (value, ts, origin), lww_wins)
+
+
+def apply_lww_many(updates: List[Tuple[str, Tuple[Any, int, str]]]) -> int:
+    """Apply a batch of (key, (value, ts, origin)) atomically with LWW. Returns how many were applied."""
+    return STORE.apply_many(updates, lww_wins)
+
+
+def apply_update(key: str, value: Any, ts: int, origin: str) -> bool:
+    """
+    Apply a replicated, synced or recovered update in the node's MODE.
+    In "vv" mode, value is the sender's whole vclock state and is merged.
+    """
+    if MODE == "vv":
+        if not vclock.is_state(value):
+            return False
+        return STORE.merge(key, lambda cur: vclock.merge_entry(cur, (value, ts, origin))) is not None
+    return apply_lww(key, value, ts, origin)
+
+
+def apply_updates_many(updates: List[Tuple[str, Tuple[Any, int, str]]]) -> int:
+    """apply_update() a batch atomically. Returns how many changed the store."""
+    if MODE == "vv":
+        stored = STORE.merge_many([(key, lambda cur, e=entry: vclock.merge_entry(cur, e))
+                                   for key, entry in updates if vclock.is_state(entry[0])])
+        return sum(e is not None for e in stored)
+    return apply_lww_many(updates)
+
+
+def local_write(value: Any, ts: int, context: Dict[str, int]):
+    """Store-merge function for a client write at this node with Lamport ts."""
+    if MODE == "vv":
+        return lambda cur: vclock.put_entry(cur, value, NODE_ID, ts, context)
+    entry = (value, ts, NODE_ID)
+    return lambda cur: entry if cur is None or lww_wins(entry, cur) else None
+
+
+def parse_context(obj: Any) -> Dict[str, int]:
+    """Client-supplied version vector ({"A": 3, ...}) as read from /get; empty if absent."""
+    if not isinstance(obj, dict):
+        return {}
+    return {str(node): int(c) for node, c in obj.items()}
+
+
+def client_view(key: str, entry: Tuple[Any, int, str]) -> Dict[str, Any]:
+    """An entry as returned to clients; in "vv" mode, siblings are listed as `values` with their `context`."""
+    value, ts, origin = entry
+    if MODE == "vv" and vclock.is_state(value):
+        values = vclock.values(value)
+        view = {"key": key, "values": values, "conflict": len(values) > 1,
+                "context": vclock.context(value), "ts": ts, "origin": origin}
+        if len(values) == 1:
+            view["value"] = values[0]
+        return view
+    return {"key": key, "value": value, "ts": ts, "origin": origin}
+
+
+def wait_durable() -> None:
+    """Before acknowledging a write: wait for the WAL group commit covering this thread's appends."""
+    if WAL is not None:
+        WAL.sync()
+
+
+def lww_wins(new: Tuple[Any, int, str], cur: Tuple[Any, int, str]) -> bool:
+    """True if entry `new` beats `cur` under LWW: higher ts, then higher origin."""
+    return new[1] > cur[1] or (new[1] == cur[1] and new[2] > cur[2])
+
+
+def sync_with_peer(peer: str, timeout_s: float = 2.0) -> int:
+    """
+    Pull whatever differs from `peer` (one direction; the peer's own
+    anti-entropy pulls the other way). Compares Merkle trees level by level
+    over POST /sync, then fetches only the differing buckets and applies them
+    with LWW. Returns the number of keys applied.
+    """
+    def remote_hashes(nodes: List[int]) -> List[int]:
+        return [int(h, 16) for h in _peer_post(peer, "/sync", {"nodes": nodes}, timeout_s)["hashes"]]
+
+    buckets, fetched = diff_leaves(MERKLE, remote_hashes)
+    applied = 0
+    max_ts = 0
+    for i in range(0, len(buckets), SYNC_BUCKETS_PER_REQUEST):
+        data = _peer_post(peer, "/sync", {"buckets": buckets[i:i + SYNC_BUCKETS_PER_REQUEST]}, timeout_s)
+        for e in data["entries"]:
+            max_ts = max(max_ts, e["ts"])
+            if apply_update(e["key"], e["value"], e["ts"], e["origin"]):
+                applied += 1
+    if max_ts:
+        lamport_on_receive(max_ts)
+    SYNC_STATS["rounds"] += 1
+    SYNC_STATS["hashes_fetched"] += fetched
+    SYNC_STATS["buckets_pulled"] += len(buckets)
+    SYNC_STATS["keys_applied"] += applied
+    return applied
 
 
 def sync_from_peers() -> None:
-    """Request full store state from peers on startup to catch up after outage (Scenario C)."""
-    if not PEERS:
-        return
-    
+    """Catch up from the first reachable peer on startup (Scenario C)."""
     for peer in PEERS:
         try:
-            url = peer.rstrip("/") + "/status"
-            req = request.Request(url, method="GET")
-            with request.urlopen(req, timeout=2.0) as resp:
-                data = json.loads(resp.read().decode("utf-8"))
-                if data.get("ok") and "store" in data:
-                    peer_store = data["store"]
-                    synced_count = 0
-                    for key, entry in peer_store.items():
-                        # Apply each entry from peer's store using LWW
-                        if apply_lww(key, entry["value"], entry["ts"], entry["origin"]):
-                            synced_count += 1
-                    if synced_count > 0:
-                        print(f"[{NODE_ID}] Synced {synced_count} keys from {peer}")
-                    break  # Only need to sync from one peer
+            synced_count = sync_with_peer(peer)
+            if synced_count > 0:
+                print(f"[{NODE_ID}] Synced {synced_count} keys from {peer}")
+            break  # Only need to sync from one peer
         except Exception as e:
             print(f"[{NODE_ID}] WARN sync failed from {peer}: {e}")
             continue
 
 
-def replicate_to_peers(key: str, value: Any, ts: int, origin: str, retries: int = 2, timeout_s: float = 2.0) -> None:
+def anti_entropy_loop(interval: float) -> None:
+    """Periodically pull divergent buckets from every peer, so missed replication heals."""
+    while True:
+        time.sleep(interval)
+        for peer in PEERS:
+            try:
+                synced_count = sync_with_peer(peer)
+                if synced_count > 0:
+                    print(f"[{NODE_ID}] anti-entropy: {synced_count} keys from {peer}")
+            except Exception as e:
+                if VERBOSE:
+                    print(f"[{NODE_ID}] WARN anti-entropy with {peer} failed: {e}")
+
+
+class PeerSender:
     """
-    Send update to all peers via POST /replicate.
-    Where to add code:
-      - Artificial delay to one peer (Scenario A)
-      - Exponential backoff (optional)
-      - Drop simulation (optional)
+    Long-lived replication sender for one peer.
+
+    Updates are queued per key and coalesced (only the LWW winner per key is
+    kept), then shipped in batches of up to REPL_BATCH_SIZE over a pooled
+    keep-alive HTTP connection to POST /replicate_batch. Multi-key writes
+    (/mput) are queued as whole groups instead, and each group goes out as
+    one /replicate_batch message, which the peer applies atomically. Delay rules and
+    exponential backoff apply to this peer only, so a slow or dead peer
+    never holds up replication to the others.
+
+    Callers that need an ack (write quorums) pass a Future, resolved with
+    True once the peer has acknowledged that update (or a newer one for the
+    same key that superseded it), or False if the update was dropped.
     """
-    payload = json.dumps({"key": key, "value": value, "ts": ts, "origin": origin}).encode("utf-8")
-    headers = {"Content-Type": "application/json"}
 
-    for peer in PEERS:
-        url = peer.rstrip("/") + "/replicate"
+    def __init__(self, peer: str, batch_size: int = REPL_BATCH_SIZE, queue_size: int = REPL_QUEUE_SIZE):
+        self.peer = peer
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.pending: "OrderedDict[str, Tuple[Any, int, str]]" = OrderedDict()
+        self.groups: "deque[Tuple[List[Tuple[str, Tuple[Any, int, str]]], List[Future]]]" = deque()
+        self.waiters: Dict[str, List[Tuple[int, Future]]] = {}  # key -> [(ts, future)] awaiting an ack
+        self.group_entries = 0
+        self.take_group = False
+        self.cond = threading.Condition()
+        self.failures = 0
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.stopped = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def enqueue(self, key: str, value: Any, ts: int, origin: str, done: Optional[Future] = None) -> bool:
+        """Queue an update, merging with any pending update for the same key. False if dropped."""
+        with self.cond:
+            if done is not None:
+                self.waiters.setdefault(key, []).append((ts, done))
+            cur = self.pending.get(key)
+            if cur is not None:
+                _, cur_ts, cur_origin = cur
+                if ts > cur_ts or (ts == cur_ts and origin > cur_origin):
+                    self.pending[key] = (value, ts, origin)
+                return True
+            deadline = time.time() + REPL_ENQUEUE_TIMEOUT
+            while len(self.pending) >= self.queue_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.dropped += 1
+                    print(f"[{NODE_ID}] WARN replication queue to {self.peer} full, dropped key={key}")
+                    if done is not None:
+                        self.waiters[key].remove((ts, done))
+                        done.set_result(False)
+                    return False
+                self.cond.wait(remaining)
+            self.pending[key] = (value, ts, origin)
+            self.cond.notify_all()
+            return True
 
-        delay_s = DELAY_RULES.get((NODE_ID, peer), 0.0)
-        if delay_s > 0:
-            # Apply delay before sending to create reordering effects (Scenario A)
-            time.sleep(delay_s)
+    def enqueue_group(self, updates: List[Tuple[str, Tuple[Any, int, str]]], done: Optional[Future] = None) -> bool:
+        """Queue a multi-key write to be sent as a single message. False if dropped."""
+        with self.cond:
+            deadline = time.time() + REPL_ENQUEUE_TIMEOUT
+            # A group larger than the whole queue is still let through when the queue is empty
+            while self.group_entries and self.group_entries + len(updates) > self.queue_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.dropped += len(updates)
+                    print(f"[{NODE_ID}] WARN replication queue to {self.peer} full, dropped batch of {len(updates)}")
+                    if done is not None:
+                        done.set_result(False)
+                    return False
+                self.cond.wait(remaining)
+            self.groups.append((updates, [done] if done is not None else []))
+            self.group_entries += len(updates)
+            self.cond.notify_all()
+            return True
+
+    def _take_batch(self) -> Tuple[List[Tuple[str, Tuple[Any, int, str]]], Optional[List[Future]]]:
+        """Next message to send, plus its group's futures (None for coalesced single-key updates)."""
+        with self.cond:
+            while not self.pending and not self.groups and not self.stopped:
+                self.cond.wait()
+            if self.stopped:
+                return [], None
+            # Alternate between groups and coalesced single-key updates so neither starves
+            self.take_group = not self.take_group
+            if self.groups and (self.take_group or not self.pending):
+                batch, dones = self.groups.popleft()
+                self.group_entries -= len(batch)
+                self.cond.notify_all()
+                return batch, dones
+            batch = []
+            while self.pending and len(batch) < self.batch_size:
+                batch.append(self.pending.popitem(last=False))
+            self.cond.notify_all()
+            return batch, None
+
+    def _requeue(self, batch: List[Tuple[str, Tuple[Any, int, str]]], dones: Optional[List[Future]]) -> None:
+        """Put a failed batch back without overwriting newer updates queued meanwhile."""
+        with self.cond:
+            if self.stopped:
+                for done in dones or []:
+                    done.set_result(False)
+                return
+            if dones is not None:
+                self.groups.appendleft((batch, dones))
+                self.group_entries += len(batch)
+                self.cond.notify_all()
+                return
+            for key, (value, ts, origin) in batch:
+                cur = self.pending.get(key)
+                if cur is None or ts > cur[1] or (ts == cur[1] and origin > cur[2]):
+                    self.pending[key] = (value, ts, origin)
+                    self.pending.move_to_end(key, last=False)
+            self.cond.notify_all()
 
-        for attempt in range(retries + 1):
+    def _acked(self, batch: List[Tuple[str, Tuple[Any, int, str]]], dones: Optional[List[Future]]) -> None:
+        """Resolve the futures a delivered batch satisfies."""
+        if dones is not None:
+            for done in dones:
+                done.set_result(True)
+            return
+        with self.cond:
+            for key, (_, ts, _) in batch:
+                waiting = self.waiters.get(key)
+                if not waiting:
+                    continue
+                # The delivered entry covers every waiter for this key up to its ts
+                still = [(w_ts, done) for w_ts, done in waiting if w_ts > ts]
+                for w_ts, done in waiting:
+                    if w_ts <= ts:
+                        done.set_result(True)
+                if still:
+                    self.waiters[key] = still
+                else:
+                    del self.waiters[key]
+
+    def _post(self, payload: bytes, timeout_s: float = 2.0) -> None:
+        status, _ = HTTP_POOL.request("POST", self.peer + "/replicate_batch", payload,
+                                     {"Content-Type": "application/json"}, timeout_s)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}")
+
+    def _run(self) -> None:
+        while True:
+            batch, dones = self._take_batch()
+            if not batch and dones is None:
+                return  # stopped
+
+            delay_s = DELAY_RULES.get((NODE_ID, self.peer), 0.0)
+            if delay_s > 0:
+                # Apply delay before sending to create reordering effects (Scenario A)
+                time.sleep(delay_s)
+
+            updates = [{"key": k, "value": v, "ts": ts, "origin": o} for k, (v, ts, o) in batch]
+            payload = json.dumps({"from": NODE_ID, "updates": updates}).encode("utf-8")
             try:
-                req = request.Request(url, data=payload, headers=headers, method="POST")
-                with request.urlopen(req, timeout=timeout_s) as resp:
-                    _ = resp.read()
-                break
+                # Large /mput groups take the peer a while to apply and fsync
+                self._post(payload, timeout_s=max(2.0, len(batch) / 5000))
+                self.failures = 0
+                self.sent += len(batch)
+                self.batches += 1
+                self._acked(batch, dones)
             except Exception as e:
-                if attempt == retries:
-                    print(f"[{NODE_ID}] WARN replicate failed to {url}: {e}")
-                else:
-                    # Exponential backoff: 1s, 2s, 4s, etc., capped at 60 seconds
-                    backoff_time = min(2 ** attempt, 60)
-                    time.sleep(backoff_time)
+                self._requeue(batch, dones)
+                # Exponential backoff: 1s, 2s, 4s, etc., capped at REPL_BACKOFF_MAX
+                backoff_time = min(2 ** self.failures, REPL_BACKOFF_MAX)
+                self.failures += 1
+                print(f"[{NODE_ID}] WARN replicate batch to {self.peer} failed ({e}); retry in {backoff_time}s")
+                time.sleep(backoff_time)
+
+    def stop(self) -> None:
+        """Stop sending (the peer left the ring); updates still queued for it are dropped."""
+        with self.cond:
+            self.stopped = True
+            for waiting in self.waiters.values():
+                for _, done in waiting:
+                    done.set_result(False)
+            for _, dones in self.groups:
+                for done in dones:
+                    done.set_result(False)
+            self.pending.clear()
+            self.groups.clear()
+            self.waiters.clear()
+            self.group_entries = 0
+            self.cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            queued = len(self.pending) + self.group_entries
+        return {"queued": queued, "sent": self.sent, "batches": self.batches,
+                "dropped": self.dropped, "failures": self.failures}
+
+
+def start_senders(batch_size: int = REPL_BATCH_SIZE, queue_size: int = REPL_QUEUE_SIZE) -> None:
+    """Create one PeerSender per peer."""
+    global REPL_BATCH_SIZE, REPL_QUEUE_SIZE
+    REPL_BATCH_SIZE, REPL_QUEUE_SIZE = batch_size, queue_size  # senders for nodes that join later
+    for peer in PEERS:
+        SENDERS[peer] = PeerSender(peer, batch_size, queue_size)
+
+
+def replicas(key: str) -> List[str]:
+    """Base URLs of the nodes that store key, in preference order (SELF_URL stands for this node)."""
+    if RING is None:
+        return [SELF_URL] + PEERS
+    return RING.preference_list(key, REPLICATION_FACTOR)
+
+
+def replica_peers(key: str) -> List[str]:
+    """The other nodes that store key: where its writes replicate and its quorum reads go."""
+    return [url for url in replicas(key) if url != SELF_URL]
+
+
+def n_replicas() -> int:
+    """N, the number of replicas per key that W and R are counted against."""
+    if RING is None:
+        return 1 + len(PEERS)
+    return min(REPLICATION_FACTOR, len(RING))
+
+
+def is_replica(key: str) -> bool:
+    return RING is None or SELF_URL in replicas(key)
+
+
+def replicate_to_peers(key: str, value: Any, ts: int, origin: str, want_acks: bool = False) -> List[Future]:
+    """
+    Queue an update for every other replica of key. Returns immediately;
+    each peer's PeerSender delivers it (batched, with its own delay rule and
+    backoff). With want_acks, returns one Future per peer that resolves on its ack.
+    """
+    futures = []
+    for peer in replica_peers(key):
+        sender = SENDERS.get(peer)
+        if sender is None:
+            continue  # left the ring meanwhile
+        done = Future() if want_acks else None
+        sender.enqueue(key, value, ts, origin, done)
+        if done is not None:
+            futures.append(done)
+    return futures
+
+
+def replicate_group_to_peers(updates: List[Tuple[str, Tuple[Any, int, str]]], peers: List[str],
+                             want_acks: bool = False) -> List[Future]:
+    """Queue a multi-key write for each of `peers`, to be delivered as one message each."""
+    futures = []
+    for peer in peers:
+        sender = SENDERS.get(peer)
+        if sender is None:
+            continue
+        done = Future() if want_acks else None
+        sender.enqueue_group(updates, done)
+        if done is not None:
+            futures.append(done)
+    return futures
+
+
+def wait_for_acks(futures: List[Future], needed: int, timeout_s: float = QUORUM_TIMEOUT) -> int:
+    """Wait until `needed` peers have acked (or the timeout passes). Returns the number of acks."""
+    acks = 0
+    pending = set(futures)
+    deadline = time.time() + timeout_s
+    while acks < needed and pending:
+        done, pending = futures_wait(pending, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        acks += sum(1 for f in done if f.result())
+    return acks
+
+
+def quorum_size(requested: Any, default: int) -> Optional[int]:
+    """Validate a per-request W or R override against N = n_replicas(). None if invalid."""
+    try:
+        n = int(requested) if requested is not None else min(default, n_replicas())
+    except (TypeError, ValueError):
+        return None
+    return n if 1 <= n <= n_replicas() else None
+
+
+def _peer_post(peer: str, path: str, obj: Dict[str, Any], timeout_s: float = QUORUM_TIMEOUT) -> Dict[str, Any]:
+    """POST JSON to a peer over the pool; raises unless it answers 200 with ok."""
+    status, data = HTTP_POOL.request_json("POST", peer + path, obj, timeout_s)
+    if status != 200 or not data.get("ok"):
+        raise RuntimeError(f"HTTP {status}: {data.get('error')}")
+    return data
+
+
+def _peer_request(peer: str, method: str, path: str, obj: Optional[Dict[str, Any]] = None,
+                  timeout_s: float = FORWARD_TIMEOUT) -> Tuple[int, Dict[str, Any]]:
+    """One request to a peer, returning (status, JSON body) whatever the status."""
+    return HTTP_POOL.request_json(method, peer + path, obj, timeout_s)
+
+
+def forward(owners: List[str], method: str, path: str, obj: Optional[Dict[str, Any]] = None,
+            timeout_s: float = FORWARD_TIMEOUT) -> Tuple[int, Dict[str, Any]]:
+    """
+    Hand a client request to the first reachable of a key's replicas and
+    return its reply. Forwarded requests carry "fwd", so the replica serves
+    them itself even if its view of the ring differs from ours.
+    """
+    RING_STATS["forwarded"] += 1
+    for peer in owners:
+        try:
+            return _peer_request(peer, method, path, obj, timeout_s)
+        except Exception as e:
+            if VERBOSE:
+                print(f"[{NODE_ID}] WARN forward of {path} to {peer} failed: {e}")
+    return 503, {"ok": False, "error": "no replica reachable", "replicas": owners}
+
+
+def scatter(keys: List[str], local: Callable[[List[int]], Tuple[int, Dict[str, Any]]],
+            remote: Callable[[List[str], List[int]], Tuple[int, Dict[str, Any]]]) -> List[Tuple[List[int], int, Dict[str, Any]]]:
+    """
+    Split a multi-key request by replica set: local(indices) serves the sets
+    this node belongs to, remote(owners, indices) forwards the others. Every
+    forward is submitted before the local sets run (in this thread, since
+    their quorum writes use QUORUM_EXECUTOR themselves), so the request takes
+    about as long as the slowest set. Returns (indices, status, reply) per
+    replica set.
+    """
+    groups: "OrderedDict[Tuple[str, ...], List[int]]" = OrderedDict()
+    for i, key in enumerate(keys):
+        groups.setdefault(tuple(replicas(key)), []).append(i)
+    futures = [(indices, QUORUM_EXECUTOR.submit(remote, list(owners), indices))
+               for owners, indices in groups.items() if SELF_URL not in owners]
+    results = [(indices, *local(indices)) for owners, indices in groups.items() if SELF_URL in owners]
+    for indices, f in futures:
+        results.append((indices, *f.result()))
+    return results
+
+
+def fetch_from_peer(peer: str, keys: List[str]) -> List[Optional[Tuple[Any, int, str]]]:
+    """Raw stored entries for keys from one peer (POST /fetch)."""
+    entries = _peer_post(peer, "/fetch", {"keys": keys})["entries"]
+    return [tuple(e) if e is not None else None for e in entries]
+
+
+def newest(a: Optional[Tuple[Any, int, str]], b: Optional[Tuple[Any, int, str]]) -> Optional[Tuple[Any, int, str]]:
+    """Combine two replicas' entries for a key: LWW winner, or the merged state in "vv" mode."""
+    if a is None or b is None:
+        return a if b is None else b
+    if MODE == "vv":
+        return vclock.merge_entry(a, b) or a
+    return b if lww_wins(b, a) else a
+
+
+READ_ROTATION = 0  # rotates which peers a quorum read contacts first
+
+
+def quorum_read(keys: List[str], r: int, peers: List[str]) -> Optional[List[Optional[Tuple[Any, int, str]]]]:
+    """
+    Read keys from R replicas (this node plus R-1 of `peers`, the keys' other
+    replicas, asked in parallel; a peer that fails is replaced by the next
+    one) and combine the replies.
+    Replicas that returned an older version are repaired in the background.
+    Returns None if fewer than R replicas answered in time.
+    """
+    global READ_ROTATION
+    replies: Dict[str, List[Optional[Tuple[Any, int, str]]]] = {"": STORE.get_many(keys)}
+    if r > 1:
+        READ_ROTATION += 1
+        start = READ_ROTATION % len(peers)
+        order = peers[start:] + peers[:start]
+        spare = order[r - 1:]
+        futures = {QUORUM_EXECUTOR.submit(fetch_from_peer, peer, keys): peer for peer in order[:r - 1]}
+        deadline = time.time() + QUORUM_TIMEOUT
+        while futures and len(replies) < r:
+            done, _ = futures_wait(futures, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for f in done:
+                peer = futures.pop(f)
+                try:
+                    replies[peer] = f.result()
+                except Exception as e:
+                    if VERBOSE:
+                        print(f"[{NODE_ID}] WARN quorum read from {peer} failed: {e}")
+                    if spare:
+                        nxt = spare.pop(0)
+                        futures[QUORUM_EXECUTOR.submit(fetch_from_peer, nxt, keys)] = nxt
+        if len(replies) < r:
+            QUORUM_STATS["read_timeouts"] += 1
+            return None
+
+    merged: List[Optional[Tuple[Any, int, str]]] = []
+    for i in range(len(keys)):
+        best = None
+        for entries in replies.values():
+            best = newest(best, entries[i])
+        merged.append(best)
+    for source, entries in replies.items():
+        stale = [(k, m) for k, m, e in zip(keys, merged, entries) if m is not None and e != m]
+        if stale:
+            QUORUM_STATS["read_repairs"] += len(stale)
+            QUORUM_EXECUTOR.submit(read_repair, source, stale)
+    return merged
+
+
+def read_repair(source: str, stale: List[Tuple[str, Tuple[Any, int, str]]]) -> None:
+    """Push the newest versions to a replica that returned older ones ("" is this node)."""
+    try:
+        if source == "":
+            lamport_on_receive(max(ts for _, (_, ts, _) in stale))
+            apply_updates_many(stale)
+            return
+        updates = [{"key": k, "value": v, "ts": ts, "origin": o} for k, (v, ts, o) in stale]
+        _peer_post(source, "/replicate_batch", {"from": NODE_ID, "updates": updates})
+    except Exception as e:
+        if VERBOSE:
+            print(f"[{NODE_ID}] WARN read repair of {source or 'local'} failed: {e}")
+
+
+def set_ring(ring: HashRing) -> None:
+    """Adopt a new membership: start senders for new members, stop those of departed ones, then swap RING."""
+    global RING, PEERS
+    for member in ring.members:
+        if member != SELF_URL and member not in SENDERS:
+            SENDERS[member] = PeerSender(member, REPL_BATCH_SIZE, REPL_QUEUE_SIZE)
+    RING = ring
+    PEERS = [m for m in ring.members if m != SELF_URL]
+    for member in list(SENDERS):
+        if member not in ring and member != SELF_URL:
+            SENDERS.pop(member).stop()
+
+
+def change_membership(action: str, url: str) -> Tuple[HashRing, HashRing]:
+    """Apply a join or leave to this node's ring and queue the rebalance. Returns (old ring, new ring)."""
+    with MEMBERSHIP_LOCK:
+        old = RING
+        new = old.with_member(url) if action == "join" else old.without_member(url)
+        if new.members == old.members:
+            return old, old
+        set_ring(new)
+        REBALANCE_EXECUTOR.submit(rebalance, old, new)
+    print(f"[{NODE_ID}] ring {action} {url}: members={new.members}")
+    return old, new
+
+
+def rebalance(old: HashRing, new: HashRing) -> None:
+    """
+    Move keys whose replicas changed between two rings, one REBALANCE_PAGE of
+    the local store at a time, so a join or leave transfers only the keys on
+    arcs that changed hands.
+
+    For each such key, one node pushes it to its new replicas: the first of
+    its old replicas still in the ring (or its only old replica, if that is
+    the node leaving). A node that is no longer a replica drops its copy, but
+    only after the page's pushes are acked; if they are not, it keeps them.
+    """
+    start = time.perf_counter()
+    pushed = dropped = 0
+    cursor: Optional[str] = ""
+    while cursor is not None:
+        page, cursor = STORE.scan(cursor, REBALANCE_PAGE)
+        outgoing: Dict[str, List[Tuple[str, Tuple[Any, int, str]]]] = {}
+        lost = []
+        for key, entry in page:
+            before = old.preference_list(key, REPLICATION_FACTOR)
+            after = new.preference_list(key, REPLICATION_FACTOR)
+            if before == after:
+                continue
+            survivors = [m for m in before if m in new]
+            if (survivors or before)[0] == SELF_URL:
+                for peer in after:
+                    if peer not in before and peer != SELF_URL:
+                        outgoing.setdefault(peer, []).append((key, entry))
+            if SELF_URL not in after:
+                lost.append((key, entry))
+        futures = []
+        for peer, group in outgoing.items():
+            futures.extend(replicate_group_to_peers(group, [peer], want_acks=True))
+            pushed += len(group)
+        if wait_for_acks(futures, len(futures), REBALANCE_TIMEOUT) < len(futures):
+            print(f"[{NODE_ID}] WARN rebalance push not acked; keeping {len(lost)} keys")
+            continue
+        for key, entry in lost:
+            if STORE.delete(key, entry):
+                dropped += 1
+    RING_STATS["rebalances"] += 1
+    RING_STATS["keys_pushed"] += pushed
+    RING_STATS["keys_dropped"] += dropped
+    RING_STATS["last_rebalance_s"] = round(time.perf_counter() - start, 3)
+    print(f"[{NODE_ID}] rebalance done: pushed={pushed} dropped={dropped} in {RING_STATS['last_rebalance_s']}s")
+
+
+def join_ring(seed: str) -> None:
+    """Join the ring through any member; the members push this node its share of the keys."""
+    status, reply = _peer_request(seed.rstrip("/"), "POST", "/membership", {"action": "join", "url": SELF_URL})
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}: {reply.get('error')}")
+    with MEMBERSHIP_LOCK:
+        set_ring(HashRing(reply["members"], RING.vnodes))
+    print(f"[{NODE_ID}] joined ring via {seed}: members={reply['members']}")
+
+
+def mput_local(keys: List[str], items: List[Dict[str, Any]], w: int) -> Tuple[int, Dict[str, Any]]:
+    """Coordinate an /mput of keys this node replicates: one atomic local batch, replicated as one group."""
+    # One clock step reserves a timestamp per item; later duplicates of a key win
+    first = lamport_reserve(len(items))
+    stored = STORE.merge_many([(key, local_write(item.get("value"), first + i, parse_context(item.get("context"))))
+                               for i, (key, item) in enumerate(zip(keys, items))])
+    updates = [(key, entry) for key, entry in zip(keys, stored) if entry is not None]
+    wait_durable()
+    if VERBOSE:
+        print(f"[{NODE_ID}] MPUT n={len(items)} ts={first}..{first + len(items) - 1} applied={len(updates)}")
+
+    # On the ring every key here shares one replica set (scatter() grouped them)
+    futures = replicate_group_to_peers(updates, replica_peers(keys[0]), want_acks=w > 1)
+    acks = 1 + wait_for_acks(futures, w - 1, max(QUORUM_TIMEOUT, len(updates) / 5000))
+
+    reply = {"ok": True, "node": NODE_ID, "count": len(items), "applied": len(updates), "acks": acks,
+             "ts_first": first, "ts_last": first + len(items) - 1, "lamport": get_lamport()}
+    if acks < w:
+        QUORUM_STATS["write_timeouts"] += 1
+        return 504, {**reply, "ok": False, "error": "write quorum not reached", "w": w}
+    return 200, reply
+
+
+def mget_local(keys: List[str], r: int) -> Tuple[int, Dict[str, Any]]:
+    """Serve an /mget of keys this node replicates (all sharing one replica set on the ring)."""
+    found = quorum_read(keys, r, replica_peers(keys[0])) if r > 1 and keys else STORE.get_many(keys)
+    if found is None:
+        return 504, {"ok": False, "error": "read quorum not reached", "r": r}
+    entries = []
+    missing = []
+    for key, cur in zip(keys, found):
+        if cur is None:
+            missing.append(key)
+        else:
+            entries.append(client_view(key, cur))
+    return 200, {"ok": True, "node": NODE_ID, "entries": entries, "missing": missing, "lamport": get_lamport()}
 
 
 class Handler(BaseHTTPRequestHandler):
-    """HTTP handler implementing /put, /replicate, /get, /status."""
+    """HTTP handler implementing /put, /mput, /mget, /fetch, /replicate, /replicate_batch, /sync, /get, /scan, /status."""
+
+    # Keep-alive, so pooled connections (httppool.py) are reused. Headers and body
+    # go out in separate writes, so Nagle must be off or every keep-alive
+    # response stalls on the peer's delayed ACK.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
 
     def _send(self, code: int, obj: Dict[str, Any]) -> None:
         """Serialize obj as JSON and send to client."""
@@ -145,31 +811,90 @@ class Handler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(data)
 
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def _send_status(self, head: Dict[str, Any]) -> None:
+        """
+        Send head plus "store" as one JSON object, streaming the store in key
+        order one STATUS_PAGE at a time with chunked transfer encoding. Memory
+        stays bounded by the page size; each entry is its latest value when
+        its page is read (not a point-in-time snapshot of the whole store).
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_chunk(json.dumps(head)[:-1].encode("utf-8") + b', "store": {')
+        cursor: Optional[str] = ""
+        first = True
+        while cursor is not None:
+            page, cursor = STORE.scan(cursor, STATUS_PAGE)
+            if not page:
+                break
+            body = ", ".join(f'{json.dumps(k)}: {json.dumps({"value": v, "ts": ts, "origin": o})}'
+                             for k, (v, ts, o) in page)
+            self._write_chunk((body if first else ", " + body).encode("utf-8"))
+            first = False
+        self._write_chunk(b"}}")
+        self.wfile.write(b"0\r\n\r\n")
+
     def do_GET(self):
         """Handle GET /get?key=... and GET /status."""
         if self.path.startswith("/get"):
             qs = parse.urlparse(self.path).query
             params = parse.parse_qs(qs)
             key = params.get("key", [""])[0]
-            with lock:
-                cur = STORE.get(key)
+            if not is_replica(key) and "fwd" not in params:
+                self._send(*forward(replicas(key), "GET", self.path + "&fwd=1"))
+                return
+            r = quorum_size(params.get("r", [None])[0], QUORUM_R)
+            if r is None:
+                self._send(400, {"ok": False, "error": f"r must be between 1 and {n_replicas()}"})
+                return
+            found = quorum_read([key], r, replica_peers(key)) if r > 1 else [STORE.get(key)]
+            if found is None:
+                self._send(504, {"ok": False, "error": "read quorum not reached", "key": key, "r": r})
+                return
+            cur = found[0]
             if cur is None:
                 self._send(404, {"ok": False, "error": "key not found", "key": key, "lamport": get_lamport()})
             else:
-                value, ts, origin = cur
-                self._send(200, {"ok": True, "key": key, "value": value, "ts": ts, "origin": origin, "lamport": get_lamport()})
+                self._send(200, {"ok": True, **client_view(key, cur), "lamport": get_lamport()})
+            return
+
+        if self.path.startswith("/scan"):
+            params = parse.parse_qs(parse.urlparse(self.path).query)
+            try:
+                limit = int(params.get("limit", [SCAN_DEFAULT_LIMIT])[0])
+            except ValueError:
+                self._send(400, {"ok": False, "error": "limit must be an integer"})
+                return
+            limit = max(1, min(limit, SCAN_MAX_LIMIT))
+            page, cursor = STORE.scan(params.get("start", [""])[0], limit, params.get("prefix", [""])[0])
+            entries = [client_view(k, entry) for k, entry in page]
+            self._send(200, {"ok": True, "node": NODE_ID, "entries": entries, "next": cursor,
+                             "lamport": get_lamport()})
             return
 
         if self.path.startswith("/status"):
-            with lock:
-                snapshot = {k: {"value": v, "ts": ts, "origin": o} for k, (v, ts, o) in STORE.items()}
-            self._send(200, {"ok": True, "node": NODE_ID, "lamport": get_lamport(), "peers": PEERS, "store": snapshot})
+            replication = {peer: sender.stats() for peer, sender in SENDERS.items()}
+            ring = None
+            if RING is not None:
+                ring = {"members": RING.members, "vnodes": RING.vnodes,
+                        "replication_factor": REPLICATION_FACTOR, **RING_STATS}
+            head = {"ok": True, "node": NODE_ID, "lamport": get_lamport(), "peers": PEERS,
+                    "quorum": {"n": n_replicas(), "w": QUORUM_W, "r": QUORUM_R, **QUORUM_STATS}, "ring": ring,
+                    "replication": replication, "merkle_root": format(MERKLE.root(), "032x"),
+                    "anti_entropy": SYNC_STATS, "wal": WAL.stats() if WAL else None,
+                    "http_pool": HTTP_POOL.stats()}
+            self._send_status(head)
             return
 
         self._send(404, {"ok": False, "error": "not found"})
 
     def do_POST(self):
-        """Handle POST /put and POST /replicate."""
+        """Handle POST /put, /mput, /mget, /replicate, /replicate_batch, /sync and /membership."""
         length = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(length) if length > 0 else b"{}"
         try:
@@ -184,15 +909,105 @@ class Handler(BaseHTTPRequestHandler):
             if not key:
                 self._send(400, {"ok": False, "error": "key required"})
                 return
+            if not is_replica(key) and not body.get("fwd"):
+                self._send(*forward(replicas(key), "POST", "/put", {**body, "fwd": True}))
+                return
+            w = quorum_size(body.get("w"), QUORUM_W)
+            if w is None:
+                self._send(400, {"ok": False, "error": f"w must be between 1 and {n_replicas()}"})
+                return
 
             ts = lamport_tick_local()
-            applied = apply_lww(key, value, ts, NODE_ID)
-            print(f"[{NODE_ID}] PUT key={key} value={value} lamport={ts} applied={applied}")
+            entry = STORE.merge(key, local_write(value, ts, parse_context(body.get("context"))))
+            applied = entry is not None
+            wait_durable()
+            if VERBOSE:
+                print(f"[{NODE_ID}] PUT key={key} value={value} lamport={ts} applied={applied}")
 
-            t = threading.Thread(target=replicate_to_peers, args=(key, value, ts, NODE_ID), daemon=True)
-            t.start()
+            # In "vv" mode the entry is the key's whole merged state, which is what peers merge
+            futures = replicate_to_peers(key, *(entry or (value, ts, NODE_ID)), want_acks=w > 1)
+            acks = 1 + wait_for_acks(futures, w - 1)
 
-            self._send(200, {"ok": True, "node": NODE_ID, "key": key, "value": value, "ts": ts, "applied": applied, "lamport": get_lamport()})
+            reply = {"ok": True, "node": NODE_ID, "key": key, "value": value, "ts": ts, "applied": applied,
+                     "acks": acks, "lamport": get_lamport()}
+            if MODE == "vv":
+                reply["context"] = vclock.context(entry[0])
+                reply["siblings"] = len(entry[0]["sib"])
+            if acks < w:
+                # Not rolled back: the write stays here and keeps replicating in the background
+                QUORUM_STATS["write_timeouts"] += 1
+                self._send(504, {**reply, "ok": False, "error": "write quorum not reached", "w": w})
+                return
+            self._send(200, reply)
+            return
+
+        if self.path == "/mput":
+            items = body.get("items", [])
+            if not isinstance(items, list) or not items:
+                self._send(400, {"ok": False, "error": "items must be a non-empty list"})
+                return
+            keys = [str(item.get("key", "")) if isinstance(item, dict) else "" for item in items]
+            if not all(keys):
+                self._send(400, {"ok": False, "error": "every item needs a key"})
+                return
+            w = quorum_size(body.get("w"), QUORUM_W)
+            if w is None:
+                self._send(400, {"ok": False, "error": f"w must be between 1 and {n_replicas()}"})
+                return
+            if RING is None or body.get("fwd"):
+                self._send(*mput_local(keys, items, w))
+                return
+
+            # On the ring the batch is split by replica set; it is atomic within each set, not across them
+            parts = scatter(keys,
+                            lambda idx: mput_local([keys[i] for i in idx], [items[i] for i in idx], w),
+                            lambda owners, idx: forward(owners, "POST", "/mput",
+                                                        {"items": [items[i] for i in idx], "w": w, "fwd": True},
+                                                        max(FORWARD_TIMEOUT, len(idx) / 2000)))
+            failed = [(code, reply) for _, code, reply in parts if code != 200]
+            reply = {"ok": not failed, "node": NODE_ID, "count": len(items),
+                     "applied": sum(reply.get("applied", 0) for _, _, reply in parts),
+                     "acks": min(reply.get("acks", 0) for _, _, reply in parts),
+                     "partitions": len(parts), "lamport": get_lamport()}
+            if failed:
+                reply["error"] = failed[0][1].get("error")
+            self._send(failed[0][0] if failed else 200, reply)
+            return
+
+        if self.path == "/mget":
+            keys = body.get("keys", [])
+            if not isinstance(keys, list):
+                self._send(400, {"ok": False, "error": "keys must be a list"})
+                return
+            keys = [str(k) for k in keys]
+            r = quorum_size(body.get("r"), QUORUM_R)
+            if r is None:
+                self._send(400, {"ok": False, "error": f"r must be between 1 and {n_replicas()}"})
+                return
+            if RING is None or body.get("fwd"):
+                self._send(*mget_local(keys, r))
+                return
+
+            parts = scatter(keys,
+                            lambda idx: mget_local([keys[i] for i in idx], r),
+                            lambda owners, idx: forward(owners, "POST", "/mget",
+                                                        {"keys": [keys[i] for i in idx], "r": r, "fwd": True}))
+            failed = [(code, reply) for _, code, reply in parts if code != 200]
+            if failed:
+                self._send(failed[0][0], failed[0][1])
+                return
+            views = {e["key"]: e for _, _, reply in parts for e in reply["entries"]}
+            entries = [views[k] for k in keys if k in views]
+            missing = [k for k in keys if k not in views]
+            self._send(200, {"ok": True, "node": NODE_ID, "entries": entries, "missing": missing,
+                             "partitions": len(parts), "lamport": get_lamport()})
+            return
+
+        if self.path == "/fetch":
+            # Internal: raw local entries for a coordinator's quorum read (never fans out further)
+            keys = [str(k) for k in body.get("keys", [])]
+            entries = [list(e) if e is not None else None for e in STORE.get_many(keys)]
+            self._send(200, {"ok": True, "node": NODE_ID, "entries": entries})
             return
 
         if self.path == "/replicate":
@@ -205,15 +1020,86 @@ class Handler(BaseHTTPRequestHandler):
                 return
 
             new_clock = lamport_on_receive(ts)
-            applied = apply_lww(key, value, ts, origin)
-            print(f"[{NODE_ID}] RECV replicate key={key} value={value} ts={ts} origin={origin} -> lamport={new_clock} applied={applied}")
+            applied = apply_update(key, value, ts, origin)
+            wait_durable()
+            if VERBOSE:
+                print(f"[{NODE_ID}] RECV replicate key={key} value={value} ts={ts} origin={origin} -> lamport={new_clock} applied={applied}")
 
-            # YOUR CODE HERE (optional):
-            # If you implement vector clocks, merge and detect concurrency here.
+            # Vector clocks: with --mode vv, apply_update merges version vectors and keeps siblings.
 
             self._send(200, {"ok": True, "node": NODE_ID, "lamport": get_lamport(), "applied": applied})
             return
 
+        if self.path == "/replicate_batch":
+            updates = body.get("updates", [])
+            if not isinstance(updates, list):
+                self._send(400, {"ok": False, "error": "updates must be a list"})
+                return
+            max_ts = 0
+            valid = []
+            for u in updates:
+                key = str(u.get("key", ""))
+                ts = int(u.get("ts", 0))
+                origin = str(u.get("origin", ""))
+                if not key or not origin or ts <= 0:
+                    continue
+                max_ts = max(max_ts, ts)
+                valid.append((key, (u.get("value"), ts, origin)))
+            # The whole message is applied atomically, so an /mput replicated as one group stays atomic
+            applied = apply_updates_many(valid)
+            wait_durable()
+            # One receive event per batch: L = max(L, max_ts) + 1
+            new_clock = lamport_on_receive(max_ts)
+            if VERBOSE:
+                print(f"[{NODE_ID}] RECV replicate_batch from={body.get('from')} n={len(updates)} "
+                      f"applied={applied} -> lamport={new_clock}")
+            self._send(200, {"ok": True, "node": NODE_ID, "lamport": new_clock, "applied": applied})
+            return
+
+        if self.path == "/sync":
+            if "nodes" in body:
+                hashes = MERKLE.hashes([int(n) for n in body["nodes"]])
+                self._send(200, {"ok": True, "hashes": [format(h, "x") for h in hashes]})
+                return
+            entries = []
+            for bucket in body.get("buckets", []):
+                bucket = int(bucket)
+                if not 0 <= bucket < MERKLE.leaves:
+                    continue
+                for key in MERKLE.keys_in(bucket):
+                    cur = STORE.get(key)
+                    if cur is not None:
+                        value, ts, origin = cur
+                        entries.append({"key": key, "value": value, "ts": ts, "origin": origin})
+            self._send(200, {"ok": True, "entries": entries})
+            return
+
+        if self.path == "/membership":
+            action = body.get("action")
+            url = str(body.get("url", "")).rstrip("/")
+            if RING is None:
+                self._send(400, {"ok": False, "error": "not in ring mode (start nodes with --replication-factor)"})
+                return
+            if action not in ("join", "leave") or not url:
+                self._send(400, {"ok": False, "error": "action must be join or leave, with a url"})
+                return
+            old, new = change_membership(action, url)
+            unreachable = []
+            if not body.get("fwd"):
+                # Tell every member of either ring: a leaving node still has to hand its keys over
+                others = sorted((set(old.members) | set(new.members)) - {SELF_URL, url if action == "join" else ""})
+                futures = {QUORUM_EXECUTOR.submit(_peer_request, peer, "POST", "/membership",
+                                                  {"action": action, "url": url, "fwd": True}): peer for peer in others}
+                for f, peer in futures.items():
+                    try:
+                        f.result()
+                    except Exception as e:
+                        print(f"[{NODE_ID}] WARN could not tell {peer} about {action} {url}: {e}")
+                        unreachable.append(peer)
+            self._send(200, {"ok": True, "node": NODE_ID, "members": new.members, "vnodes": new.vnodes,
+                             "replication_factor": REPLICATION_FACTOR, "unreachable": unreachable})
+            return
+
         self._send(404, {"ok": False, "error": "not found"})
 
     def log_message(self, fmt, *args):
@@ -222,17 +1108,65 @@ class Handler(BaseHTTPRequestHandler):
 
 def main():
     """Parse CLI args, set NODE_ID/PEERS, start HTTP server."""
-    global NODE_ID, PEERS, LAMPORT, DELAY_RULES
+    global NODE_ID, PEERS, LAMPORT, DELAY_RULES, VERBOSE, STORE, MERKLE, WAL, MODE, QUORUM_W, QUORUM_R
+    global RING, SELF_URL, REPLICATION_FACTOR
     parser = argparse.ArgumentParser()
     parser.add_argument("--id", required=True, help="Node ID: A, B, or C")
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=8000)
     parser.add_argument("--peers", default="", help="Comma-separated base URLs of peers")
+    parser.add_argument("--batch-size", type=int, default=REPL_BATCH_SIZE,
+                        help="Max updates per /replicate_batch request")
+    parser.add_argument("--queue-size", type=int, default=REPL_QUEUE_SIZE,
+                        help="Max distinct keys queued per peer before writers wait")
+    parser.add_argument("--shards", type=int, default=STORE_SHARDS,
+                        help="Number of lock stripes in the key-value store")
+    parser.add_argument("--anti-entropy-interval", type=float, default=ANTI_ENTROPY_INTERVAL,
+                        help="Seconds between background Merkle syncs with each peer (0 disables)")
+    parser.add_argument("--w", type=int, default=QUORUM_W,
+                        help="Default write quorum: replicas (including this node) that must ack a write")
+    parser.add_argument("--r", type=int, default=QUORUM_R,
+                        help="Default read quorum: replicas (including this node) a read consults")
+    parser.add_argument("--mode", choices=["lww", "vv"], default=MODE,
+                        help="Conflict handling: lww (default) or vv (version vectors, concurrent writes kept as "
+                             "siblings); every node in a cluster must use the same mode")
+    parser.add_argument("--data-dir", default="",
+                        help="Directory for the write-ahead log and snapshots (default: in-memory only)")
+    parser.add_argument("--wal-compact-bytes", type=int, default=COMPACT_BYTES,
+                        help="Snapshot and drop old log segments once the current one exceeds this size")
+    parser.add_argument("--replication-factor", type=int, default=0,
+                        help="Partition keys on a consistent-hash ring with this many replicas each "
+                             "(default 0: every node stores every key)")
+    parser.add_argument("--vnodes", type=int, default=DEFAULT_VNODES,
+                        help="Virtual nodes per member on the ring; every node must use the same value")
+    parser.add_argument("--self-url", default="",
+                        help="This node's base URL as the other members reach it (default http://127.0.0.1:<port>)")
+    parser.add_argument("--join", default="", help="Ring mode: join the ring through this member's base URL")
+    parser.add_argument("--quiet", action="store_true", help="Disable per-request logging")
     args = parser.parse_args()
 
     NODE_ID = args.id
     PEERS = [p.strip() for p in args.peers.split(",") if p.strip()]
     LAMPORT = 0
+    VERBOSE = not args.quiet
+    MODE = args.mode
+    SELF_URL = (args.self_url or f"http://127.0.0.1:{args.port}").rstrip("/")
+    REPLICATION_FACTOR = max(0, args.replication_factor)
+    n = REPLICATION_FACTOR or 1 + len(PEERS)
+    QUORUM_W = max(1, min(args.w, n))
+    QUORUM_R = max(1, min(args.r, n))
+    MERKLE = MerkleTree()
+    STORE = StripedStore(args.shards, on_change=on_store_change)
+
+    if args.data_dir:
+        # Replay before WAL is set, so recovered entries are not logged again
+        wal = WriteAheadLog(args.data_dir, args.wal_compact_bytes)
+        info = wal.recover(lambda key, entry: apply_update(key, *entry), STORE.delete)
+        LAMPORT = info["max_ts"]
+        print(f"[{NODE_ID}] recovered {len(STORE)} keys from {args.data_dir} "
+              f"(snapshot={info['snapshot_entries']} replayed={info['replayed']}) in {info['seconds']:.3f}s")
+        wal.start(STORE.items)
+        WAL = wal
 
     # Configure DELAY_RULES based on NODE_ID to implement Scenario A deterministically.
     # Delay A -> C by ~2 seconds to demonstrate delay/reorder effects
@@ -243,11 +1177,22 @@ def main():
                 DELAY_RULES[(NODE_ID, peer)] = 2.0
                 print(f"[{NODE_ID}] Configured delay: {NODE_ID} -> {peer} = 2.0s")
 
-    # Sync from peers on startup (Scenario C: temporary outage recovery)
-    if PEERS:
+    if REPLICATION_FACTOR:
+        # Merkle anti-entropy compares whole stores, which partitioned nodes never share; on the ring,
+        # replicas catch up through read repair and rebalancing instead
+        RING = HashRing([SELF_URL] + PEERS, args.vnodes)
+    elif PEERS:
+        # Sync from peers on startup (Scenario C: temporary outage recovery)
         sync_from_peers()
 
+    start_senders(args.batch_size, args.queue_size)
+    if RING is None and PEERS and args.anti_entropy_interval > 0:
+        threading.Thread(target=anti_entropy_loop, args=(args.anti_entropy_interval,), daemon=True).start()
+
     server = ThreadingHTTPServer((args.host, args.port), Handler)
+    if RING is not None and args.join:
+        # Already listening, so the members' rebalance pushes queue up until serve_forever() starts
+        join_ring(args.join)
     print(f"[{NODE_ID}] listening on {args.host}:{args.port} peers={PEERS}")
     server.serve_forever()
 
@@ -0,0 +1,64 @@
+"""
+Consistent-hash ring with virtual nodes, for partitioning the Lab 2 store.
+
+Each member (a node's base URL) is hashed onto a 64-bit ring at `vnodes`
+points. A key's preference list is the first n distinct members found
+walking clockwise from the key's own hash; the first n of them store it.
+
+Virtual nodes spread each member over many small arcs, so load stays even
+and a join or leave only moves the keys on the arcs that change hands:
+about 1/N of the data per change, taken evenly from (or given evenly to)
+every other member.
+
+A HashRing is immutable. Membership changes build a new ring, so readers
+holding the old one never see it half-updated, and rebalancing can compare
+the old and new placement of every key.
+"""
+
+import bisect
+import hashlib
+from typing import Iterable, List, Tuple
+
+DEFAULT_VNODES = 64
+
+
+def _h(data: str) -> int:
+    """Stable 64-bit ring position (unlike hash(), the same in every process)."""
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, members: Iterable[str], vnodes: int = DEFAULT_VNODES) -> None:
+        self.members: List[str] = sorted(set(members))
+        self.vnodes = vnodes
+        points: List[Tuple[int, str]] = sorted((_h(f"{m}#{i}"), m) for m in self.members for i in range(vnodes))
+        self.positions = [p for p, _ in points]
+        self.owners = [m for _, m in points]
+
+    def preference_list(self, key: str, n: int) -> List[str]:
+        """The first n distinct members clockwise from key (fewer if the ring is smaller)."""
+        n = min(n, len(self.members))
+        out: List[str] = []
+        if n <= 0:
+            return out
+        i = bisect.bisect_right(self.positions, _h(key))
+        total = len(self.owners)
+        for step in range(total):
+            member = self.owners[(i + step) % total]
+            if member not in out:
+                out.append(member)
+                if len(out) == n:
+                    break
+        return out
+
+    def with_member(self, url: str) -> "HashRing":
+        return HashRing(self.members + [url], self.vnodes)
+
+    def without_member(self, url: str) -> "HashRing":
+        return HashRing([m for m in self.members if m != url], self.vnodes)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.members
+
+    def __len__(self) -> int:
+        return len(self.members)
@@ -0,0 +1,236 @@
+"""
+Striped key-value store for the Lab 2 node.
+
+Keys are spread over a fixed number of shards by hash; each shard has its
+own lock, so operations on different keys rarely contend. Snapshots are
+copy-on-write per shard: a shard's copy is reused until that shard is
+written again, and no lock is held while the caller walks the snapshot.
+
+Keys are also kept in a global ordered index (SortedKeys) so range, prefix
+and cursor scans do not need to sort or copy the whole store.
+
+An optional on_change(key, old, new) callback runs under the shard lock for
+every stored write or delete (new is None), so derived state (e.g. the
+Merkle tree) sees each key's changes in order.
+"""
+
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Entry = Tuple[Any, int, str]  # (value, ts, origin)
+
+
+class SortedKeys:
+    """
+    Blocked sorted list of keys: a list of sorted blocks plus each block's
+    max key. Inserts touch one block (split when it doubles past LOAD) and
+    range reads bisect straight to their start, so both stay cheap at
+    millions of keys without a tree of Python objects.
+    """
+
+    LOAD = 512
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.blocks: List[List[str]] = []
+        self.maxes: List[str] = []
+        self.size = 0
+
+    def add(self, key: str) -> None:
+        with self.lock:
+            if not self.blocks:
+                self.blocks.append([key])
+                self.maxes.append(key)
+                self.size = 1
+                return
+            i = min(bisect.bisect_left(self.maxes, key), len(self.blocks) - 1)
+            block = self.blocks[i]
+            j = bisect.bisect_left(block, key)
+            if j < len(block) and block[j] == key:
+                return
+            block.insert(j, key)
+            self.maxes[i] = block[-1]
+            self.size += 1
+            if len(block) > 2 * self.LOAD:
+                self.blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+                self.maxes[i:i + 1] = [block[self.LOAD - 1], block[-1]]
+
+    def remove(self, key: str) -> None:
+        with self.lock:
+            i = bisect.bisect_left(self.maxes, key)
+            if i == len(self.blocks):
+                return
+            block = self.blocks[i]
+            j = bisect.bisect_left(block, key)
+            if j == len(block) or block[j] != key:
+                return
+            del block[j]
+            self.size -= 1
+            if not block:
+                del self.blocks[i]
+                del self.maxes[i]
+            else:
+                self.maxes[i] = block[-1]
+
+    def range(self, start: str = "", limit: int = 100) -> List[str]:
+        """Up to `limit` keys >= start, in order."""
+        out: List[str] = []
+        with self.lock:
+            i = bisect.bisect_left(self.maxes, start)
+            if i < len(self.blocks):
+                j = bisect.bisect_left(self.blocks[i], start)
+                while i < len(self.blocks) and len(out) < limit:
+                    block = self.blocks[i]
+                    out.extend(block[j:j + limit - len(out)])
+                    i, j = i + 1, 0
+        return out
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class _Shard:
+    __slots__ = ("lock", "data", "version", "snap_version", "snap")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.data: Dict[str, Entry] = {}
+        self.version = 0
+        self.snap_version = -1
+        self.snap: Dict[str, Entry] = {}
+
+
+class StripedStore:
+    """Dict-like store with one lock per key-hash shard."""
+
+    def __init__(self, shards: int = 16,
+                 on_change: Optional[Callable[[str, Optional[Entry], Optional[Entry]], None]] = None) -> None:
+        self.shards: List[_Shard] = [_Shard() for _ in range(max(1, shards))]
+        self.on_change = on_change  # (key, old, new); new is None on delete
+        self.index = SortedKeys()
+
+    def _shard(self, key: str) -> _Shard:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def get(self, key: str) -> Optional[Entry]:
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.data.get(key)
+
+    def merge(self, key: str, fn: Callable[[Optional[Entry]], Optional[Entry]]) -> Optional[Entry]:
+        """
+        Replace the key's entry with fn(current entry or None), under the shard
+        lock. fn returns None to leave the key unchanged. Returns the stored
+        entry, or None if nothing was stored.
+        """
+        shard = self._shard(key)
+        with shard.lock:
+            return self._merge_locked(shard, key, fn)
+
+    def _merge_locked(self, shard: _Shard, key: str,
+                      fn: Callable[[Optional[Entry]], Optional[Entry]]) -> Optional[Entry]:
+        cur = shard.data.get(key)
+        entry = fn(cur)
+        if entry is None:
+            return None
+        shard.data[key] = entry
+        shard.version += 1
+        if cur is None:
+            self.index.add(key)
+        if self.on_change is not None:
+            self.on_change(key, cur, entry)
+        return entry
+
+    def apply(self, key: str, entry: Entry, wins: Callable[[Entry, Entry], bool]) -> bool:
+        """Store entry if the key is absent or wins(entry, current) is true. Returns True if stored."""
+        return self.merge(key, lambda cur: entry if cur is None or wins(entry, cur) else None) is not None
+
+    def delete(self, key: str, expected: Optional[Entry] = None) -> bool:
+        """Remove a key (only if it still holds `expected`, when given). Returns True if removed."""
+        shard = self._shard(key)
+        with shard.lock:
+            cur = shard.data.get(key)
+            if cur is None or (expected is not None and cur != expected):
+                return False
+            del shard.data[key]
+            shard.version += 1
+            self.index.remove(key)
+            if self.on_change is not None:
+                self.on_change(key, cur, None)
+            return True
+
+    def _locked(self, keys: Iterable[str]) -> List[_Shard]:
+        """Distinct shards holding keys, in shard order (the lock order for multi-key ops)."""
+        n = len(self.shards)
+        return [self.shards[i] for i in sorted({hash(k) % n for k in keys})]
+
+    def merge_many(self, items: List[Tuple[str, Callable[[Optional[Entry]], Optional[Entry]]]]) -> List[Optional[Entry]]:
+        """
+        merge() a batch atomically: every shard it touches is locked (in shard
+        order, so concurrent batches cannot deadlock) before any key changes.
+        Returns the stored entry (or None) per item.
+        """
+        shards = self._locked(k for k, _ in items)
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            return [self._merge_locked(self._shard(key), key, fn) for key, fn in items]
+        finally:
+            for shard in reversed(shards):
+                shard.lock.release()
+
+    def apply_many(self, items: List[Tuple[str, Entry]], wins: Callable[[Entry, Entry], bool]) -> int:
+        """apply() a batch atomically. Returns how many entries were stored."""
+        stored = self.merge_many([(key, lambda cur, e=entry: e if cur is None or wins(e, cur) else None)
+                                  for key, entry in items])
+        return sum(e is not None for e in stored)
+
+    def get_many(self, keys: List[str]) -> List[Optional[Entry]]:
+        """Read several keys as of one instant (all their shards locked together)."""
+        shards = self._locked(keys)
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            return [self._shard(k).data.get(k) for k in keys]
+        finally:
+            for shard in reversed(shards):
+                shard.lock.release()
+
+    def shard_snapshots(self) -> List[Dict[str, Entry]]:
+        """Return a read-only copy of every shard, copying only shards written since the last call."""
+        snaps = []
+        for shard in self.shards:
+            with shard.lock:
+                if shard.snap_version != shard.version:
+                    shard.snap = dict(shard.data)
+                    shard.snap_version = shard.version
+                snaps.append(shard.snap)
+        return snaps
+
+    def items(self) -> Iterator[Tuple[str, Entry]]:
+        """Iterate over a consistent-per-shard snapshot without holding any lock."""
+        for snap in self.shard_snapshots():
+            yield from snap.items()
+
+    def scan(self, start: str = "", limit: int = 100,
+             prefix: str = "") -> Tuple[List[Tuple[str, Entry]], Optional[str]]:
+        """
+        Return up to `limit` (key, entry) pairs with key >= start (and starting
+        with `prefix`, if given), in key order, plus the cursor to pass as
+        `start` for the next page (None when there are no more keys).
+        """
+        start = max(start, prefix)
+        keys = self.index.range(start, limit + 1)
+        if prefix:
+            keys = [k for k in keys if k.startswith(prefix)]
+        cursor = keys[limit] if len(keys) > limit else None
+        page = []
+        for key in keys[:limit]:
+            entry = self.get(key)
+            if entry is not None:
+                page.append((key, entry))
+        return page, cursor
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self.shards)
@@ -0,0 +1,113 @@
+"""
+Dotted version vectors for the Lab 2 node's opt-in vector-clock mode.
+
+A key's state is a JSON-friendly dict:
+
+  {"vv":  {node: [counter, ts], ...},        # causal context of the key
+   "sib": [[node, counter, ts, value], ...]}  # siblings, each tagged by its dot
+
+Every sibling carries only its dot (node, counter), not a full vector, and
+the key carries one version vector covering all of them. That keeps the
+metadata to one vector per key plus one small tuple per sibling.
+
+  put     - a write at `node` with the client's context (the vector it last
+            read) drops every sibling that context covers and adds a new
+            sibling with dot (node, vv[node] + 1). Writes that did not see
+            each other therefore both survive as siblings.
+  merge   - a sibling survives if the other side also has it, or if the other
+            side's vector does not cover it; vectors take pointwise maxima.
+            Merge is idempotent, commutative and associative, so replication,
+            anti-entropy and WAL replay can all apply whole states freely.
+
+ts is the writer's Lamport timestamp. It orders siblings and drives pruning:
+  - at most MAX_SIBLINGS siblings are kept (oldest dropped first; their dots
+    stay covered, so they cannot come back), and
+  - at most MAX_VV_ENTRIES vector entries are kept, dropping the oldest entries
+    of nodes that no longer own a sibling.
+Both bounds trade a little precision (an extra false conflict, or a dropped
+ancient sibling) for metadata that cannot grow without limit.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_SIBLINGS = 8
+MAX_VV_ENTRIES = 16
+
+State = Dict[str, Any]
+Entry = Tuple[Any, int, str]  # (state, ts, origin), as stored in StripedStore
+
+
+def is_state(obj: Any) -> bool:
+    return isinstance(obj, dict) and isinstance(obj.get("vv"), dict) and isinstance(obj.get("sib"), list)
+
+
+def context(state: Optional[State]) -> Dict[str, int]:
+    """The plain {node: counter} vector a client sends back with its next write."""
+    return {node: c for node, (c, _) in state["vv"].items()} if state else {}
+
+
+def values(state: State) -> List[Any]:
+    return [s[3] for s in state["sib"]]
+
+
+def _normalize(vv: Dict[str, List[int]], siblings: List[List[Any]]) -> State:
+    siblings.sort(key=lambda s: (s[2], s[0], s[1]))
+    if len(siblings) > MAX_SIBLINGS:
+        del siblings[:len(siblings) - MAX_SIBLINGS]
+    if len(vv) > MAX_VV_ENTRIES:
+        live = {s[0] for s in siblings}
+        prunable = sorted((e[1], node) for node, e in vv.items() if node not in live)
+        for _, node in prunable[:len(vv) - MAX_VV_ENTRIES]:
+            del vv[node]
+    return {"vv": vv, "sib": siblings}
+
+
+def put(state: Optional[State], value: Any, node: str, ts: int, ctx: Dict[str, int]) -> State:
+    """Record a local write at `node` that supersedes everything in `ctx`."""
+    vv = {n: list(e) for n, e in state["vv"].items()} if state else {}
+    siblings = [s for s in state["sib"] if s[1] > ctx.get(s[0], 0)] if state else []
+    for n, c in ctx.items():
+        if c > vv.get(n, [0, 0])[0]:
+            vv[n] = [int(c), ts]
+    counter = vv.get(node, [0, 0])[0] + 1
+    vv[node] = [counter, ts]
+    siblings.append([node, counter, ts, value])
+    return _normalize(vv, siblings)
+
+
+def merge(a: State, b: State) -> State:
+    ca, cb = context(a), context(b)
+    dots_a = {(s[0], s[1]) for s in a["sib"]}
+    dots_b = {(s[0], s[1]) for s in b["sib"]}
+    kept: Dict[Tuple[str, int], List[Any]] = {}
+    for s in a["sib"]:
+        if (s[0], s[1]) in dots_b or s[1] > cb.get(s[0], 0):
+            kept[(s[0], s[1])] = s
+    for s in b["sib"]:
+        if (s[0], s[1]) in dots_a or s[1] > ca.get(s[0], 0):
+            kept.setdefault((s[0], s[1]), s)
+    vv = {n: list(e) for n, e in a["vv"].items()}
+    for n, e in b["vv"].items():
+        if n not in vv or (e[0], e[1]) > (vv[n][0], vv[n][1]):
+            vv[n] = list(e)
+    return _normalize(vv, [list(s) for s in kept.values()])
+
+
+def to_entry(state: State) -> Entry:
+    """Wrap a state for the store: ts/origin are those of its newest sibling."""
+    if not state["sib"]:
+        return state, 0, ""
+    top = state["sib"][-1]
+    return state, top[2], top[0]
+
+
+def put_entry(cur: Optional[Entry], value: Any, node: str, ts: int, ctx: Dict[str, int]) -> Entry:
+    return to_entry(put(cur[0] if cur else None, value, node, ts, ctx))
+
+
+def merge_entry(cur: Optional[Entry], new: Entry) -> Optional[Entry]:
+    """Merge a received state into the stored one; None if nothing changed."""
+    if cur is None:
+        return to_entry(merge(new[0], {"vv": {}, "sib": []}))
+    merged = merge(cur[0], new[0])
+    return None if merged == cur[0] else to_entry(merged)
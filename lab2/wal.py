@@ -0,0 +1,271 @@
+"""
+Write-ahead log and snapshots for the Lab 2 node's store.
+
+Layout of the data directory:
+  wal-<n>.log        log segments, appended in order; a restart always starts
+                     a new segment instead of appending to an old one
+  snapshot-<n>.snap  the full store, covering every segment numbered below n
+
+Records (both files) are framed as  length:u32 | crc32:u32 | JSON payload.
+A WAL record is [key, value, ts, origin], or [key] for a delete (tombstone);
+a snapshot holds one record whose payload is the list of all live entries.
+
+Group commit: append() only buffers the record. A single flusher thread
+writes everything buffered so far with one write() and one fsync(), then
+wakes every writer whose record that covered. sync() blocks the calling
+thread until its own appends are durable, so many concurrent writers share
+each fsync.
+
+Compaction: when the current segment grows past compact_bytes, the flusher
+rotates to a new segment n and a background thread writes snapshot-<n> from
+a copy-on-write store snapshot, then deletes older segments and snapshots.
+Every record in an older segment is already applied to the store when it is
+logged, so the snapshot covers them; records it may also contain from
+segment n are simply applied again on replay, which is harmless under LWW.
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Entry = Tuple[Any, int, str]  # (value, ts, origin)
+
+RECORD = struct.Struct("!II")  # payload length, crc32
+COMPACT_BYTES = 64 * 1024 * 1024
+
+_SEGMENT = re.compile(r"^wal-(\d+)\.log$")
+_SNAPSHOT = re.compile(r"^snapshot-(\d+)\.snap$")
+
+
+def _frame(obj: Any) -> bytes:
+    payload = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _records(buf) -> Iterator[Tuple[int, memoryview]]:
+    """Yield (end offset, payload) for each intact record; stops at the first torn or corrupt one."""
+    view = memoryview(buf)
+    offset = 0
+    while offset + RECORD.size <= len(view):
+        length, crc = RECORD.unpack_from(view, offset)
+        start = offset + RECORD.size
+        payload = view[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        offset = start + length
+        yield offset, payload
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    def __init__(self, data_dir: str, compact_bytes: int = COMPACT_BYTES) -> None:
+        self.dir = data_dir
+        self.compact_bytes = compact_bytes
+        os.makedirs(data_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.flush_cond = threading.Condition(self.lock)
+        self.durable_cond = threading.Condition(self.lock)
+        self.buffer: List[bytes] = []
+        self.appended = 0
+        self.durable = 0
+        self.local = threading.local()
+        self.closed = False
+
+        self.segment = 0
+        self.file = None
+        self.segment_bytes = 0
+        self.replayed_bytes = 0
+        self.compact_event = threading.Event()
+        self.snapshot_items: Optional[Callable[[], Iterable[Tuple[str, Entry]]]] = None
+
+        self.fsyncs = 0
+        self.snapshots = 0
+        self.last_snapshot_s = 0.0
+
+    def _path(self, kind: str, n: int) -> str:
+        return os.path.join(self.dir, f"{kind}-{n:08d}.{'log' if kind == 'wal' else 'snap'}")
+
+    def _listing(self, pattern) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(pattern.match, os.listdir(self.dir)) if m)
+
+    # ---- recovery ----
+
+    def _load_snapshot(self, n: int, apply: Callable[[str, Entry], None]) -> Tuple[int, int]:
+        # mmap lets the checksum run over the page cache directly; only the
+        # JSON decode needs its own copy of the payload.
+        with open(self._path("snapshot", n), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            if len(view) < RECORD.size:
+                raise ValueError("truncated snapshot")
+            length, crc = RECORD.unpack_from(view, 0)
+            with view[RECORD.size:RECORD.size + length] as payload:
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    raise ValueError("corrupt snapshot")
+                entries = json.loads(bytes(payload))
+        max_ts = 0
+        for key, value, ts, origin in entries:
+            apply(key, (value, ts, origin))
+            max_ts = max(max_ts, ts)
+        return len(entries), max_ts
+
+    def _replay_segment(self, n: int, apply: Callable[[str, Entry], None],
+                        delete: Optional[Callable[[str], None]]) -> Tuple[int, int]:
+        path = self._path("wal", n)
+        with open(path, "rb") as f:
+            data = f.read()
+        count = max_ts = good = 0
+        for good, payload in _records(data):
+            record = json.loads(bytes(payload))
+            count += 1
+            if len(record) == 1:
+                if delete is not None:
+                    delete(record[0])
+                continue
+            key, value, ts, origin = record
+            apply(key, (value, ts, origin))
+            max_ts = max(max_ts, ts)
+        self.replayed_bytes += good
+        if good < len(data):
+            # Torn write from a crash: drop the partial tail
+            with open(path, "r+b") as f:
+                f.truncate(good)
+        return count, max_ts
+
+    def recover(self, apply: Callable[[str, Entry], None],
+                delete: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Load the newest snapshot and replay the segments after it, calling apply(key, entry) / delete(key)."""
+        start = time.perf_counter()
+        snapshot_entries = replayed = max_ts = 0
+        first_segment = 0
+        for n in reversed(self._listing(_SNAPSHOT)):
+            try:
+                snapshot_entries, max_ts = self._load_snapshot(n, apply)
+                first_segment = n
+                break
+            except (OSError, ValueError) as e:
+                print(f"[wal] WARN ignoring snapshot {n}: {e}")
+        segments = [n for n in self._listing(_SEGMENT) if n >= first_segment]
+        for n in segments:
+            count, seg_max = self._replay_segment(n, apply, delete)
+            replayed += count
+            max_ts = max(max_ts, seg_max)
+        self.segment = max(segments + [first_segment - 1, -1]) + 1
+        return {"snapshot_entries": snapshot_entries, "replayed": replayed, "max_ts": max_ts,
+                "seconds": time.perf_counter() - start}
+
+    # ---- logging ----
+
+    def start(self, snapshot_items: Callable[[], Iterable[Tuple[str, Entry]]]) -> None:
+        """Open a fresh segment and start the flusher and compaction threads."""
+        self.snapshot_items = snapshot_items
+        self.file = open(self._path("wal", self.segment), "ab")
+        _fsync_dir(self.dir)
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        threading.Thread(target=self._compact_loop, daemon=True).start()
+        if self.replayed_bytes >= self.compact_bytes:
+            self.compact_event.set()  # long tail from the last run: snapshot it right away
+
+    def append(self, key: str, entry: Optional[Entry]) -> int:
+        """Buffer a record (entry None = delete) for the next group commit and return its sequence number."""
+        record = _frame([key, *entry] if entry is not None else [key])
+        with self.lock:
+            self.buffer.append(record)
+            self.appended += 1
+            seq = self.appended
+            self.flush_cond.notify()
+        self.local.seq = seq
+        return seq
+
+    def sync(self) -> None:
+        """Block until everything this thread appended is on disk."""
+        seq = getattr(self.local, "seq", 0)
+        with self.lock:
+            while self.durable < seq:
+                self.durable_cond.wait()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self.lock:
+                while not self.buffer and not self.closed:
+                    self.flush_cond.wait()
+                if not self.buffer:
+                    self.file.close()
+                    return
+                chunk = b"".join(self.buffer)
+                self.buffer = []
+                target = self.appended
+            self.file.write(chunk)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.fsyncs += 1
+            with self.lock:
+                self.durable = target
+                self.durable_cond.notify_all()
+            self.segment_bytes += len(chunk)
+            if self.segment_bytes >= self.compact_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        """Switch to a new segment (flusher thread only) and ask for a snapshot."""
+        self.file.close()
+        self.segment += 1
+        self.file = open(self._path("wal", self.segment), "ab")
+        self.segment_bytes = 0
+        _fsync_dir(self.dir)
+        self.compact_event.set()
+
+    # ---- compaction ----
+
+    def _compact_loop(self) -> None:
+        while True:
+            self.compact_event.wait()
+            self.compact_event.clear()
+            try:
+                self.write_snapshot(self.segment)
+            except OSError as e:
+                print(f"[wal] WARN snapshot failed: {e}")
+
+    def write_snapshot(self, n: int) -> None:
+        """Write snapshot-<n> from the live store, then drop the files it supersedes."""
+        start = time.perf_counter()
+        entries = [[k, v, ts, o] for k, (v, ts, o) in self.snapshot_items()]
+        path = self._path("snapshot", n)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_frame(entries))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.dir)
+        for old in self._listing(_SEGMENT):
+            if old < n:
+                os.remove(self._path("wal", old))
+        for old in self._listing(_SNAPSHOT):
+            if old < n:
+                os.remove(self._path("snapshot", old))
+        self.snapshots += 1
+        self.last_snapshot_s = time.perf_counter() - start
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.flush_cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"segment": self.segment, "segment_bytes": self.segment_bytes, "appended": self.appended,
+                "durable": self.durable, "fsyncs": self.fsyncs, "snapshots": self.snapshots,
+                "last_snapshot_s": round(self.last_snapshot_s, 3)}
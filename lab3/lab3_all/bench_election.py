@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: leader failover time with unresponsive peers.
+
+Starts an --nodes cluster, then freezes --dead followers with SIGSTOP. A
+stopped process still accepts TCP connections but never answers, which is
+what a crashed or partitioned EC2 instance looks like to its peers: every
+RPC to it waits for its full timeout. Then, --trials times, it freezes the
+leader and measures how long the remaining nodes take to elect a new one,
+and how many terms that took. The old leader is resumed (it rejoins as a
+follower) before the next trial.
+
+Usage:
+  python3 bench_election.py [--nodes 5] [--dead 0,1] [--trials 20]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_PORT = 9220
+
+
+def status(port, timeout_s=0.2):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout_s)
+    try:
+        conn.request("GET", "/status")
+        return json.loads(conn.getresponse().read().decode())
+    finally:
+        conn.close()
+
+
+def find_leader(ports, min_term=0):
+    """(port, term) of a node that is leader in a term >= min_term, or None."""
+    for port in ports:
+        try:
+            st = status(port)
+        except OSError:
+            continue
+        if st["role"] == "leader" and st["term"] >= min_term:
+            return port, st["term"]
+    return None
+
+
+def wait_leader(ports, min_term=0, timeout_s=20.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        found = find_leader(ports, min_term)
+        if found:
+            return found
+        time.sleep(0.005)
+    raise RuntimeError("no leader elected")
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def run(n, dead, trials):
+    data_root = tempfile.mkdtemp(prefix="raft-election-")
+    ports = [BASE_PORT + i for i in range(n)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    procs = {}
+    for i, port in enumerate(ports):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        procs[port] = subprocess.Popen([sys.executable, "raft_node.py", "--id", node_id, "--port", str(port),
+                                        "--peers", peers, "--data-dir", f"{data_root}/{node_id}"],
+                                       stdout=subprocess.DEVNULL)
+    try:
+        leader, term = wait_leader(ports)
+        frozen = [p for p in ports if p != leader][:dead]
+        for port in frozen:
+            os.kill(procs[port].pid, signal.SIGSTOP)
+        live = [p for p in ports if p not in frozen]
+        time.sleep(1.0)
+        leader, term = wait_leader(live)
+
+        times, terms = [], []
+        for _ in range(trials):
+            others = [p for p in live if p != leader]
+            os.kill(procs[leader].pid, signal.SIGSTOP)
+            start = time.perf_counter()
+            new_leader, new_term = wait_leader(others, term + 1)
+            times.append(time.perf_counter() - start)
+            terms.append(new_term - term)
+            os.kill(procs[leader].pid, signal.SIGCONT)
+            time.sleep(1.0)  # let the old leader step down and catch up
+            leader, term = wait_leader(live)
+        times.sort()
+        print(f"nodes={n} dead={dead}  failover p50={percentile(times, 50) * 1000:6.0f}ms "
+              f"p90={percentile(times, 90) * 1000:6.0f}ms max={times[-1] * 1000:6.0f}ms  "
+              f"terms/failover avg={sum(terms) / len(terms):.2f} max={max(terms)}")
+    finally:
+        for proc in procs.values():
+            os.kill(proc.pid, signal.SIGCONT)
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raft election convergence benchmark")
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--dead", default="0,1")
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+    for dead in [int(d) for d in args.dead.split(",")]:
+        run(args.nodes, dead, args.trials)
+
+
+if __name__ == "__main__":
+    main()
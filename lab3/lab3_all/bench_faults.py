@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Fault-injection harness: leader downtime when nodes drop out and rejoin.
+
+For each --modes entry ("off": --no-prevote --no-check-quorum, "on": both
+enabled), starts an --nodes cluster with --fault-injection and keeps
+--writers client threads writing to the leader. It then runs --events
+faults, alternating between:
+
+  follower  cut one follower off from its peers (POST /fault) for
+            --isolate seconds, then reconnect it. Its timers keep running,
+            so without PreVote it keeps raising its term while cut off.
+  leader    the same for the current leader
+
+and waits --settle seconds after each. An event's downtime is the longest
+gap between two committed writes from the fault to the end of its settle
+time. Writes take a few milliseconds, so for a rejoining follower anything
+much longer means the leader was deposed.
+
+Usage:
+  python3 bench_faults.py [--modes off,on] [--nodes 5] [--events 20] [--isolate 1.0]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_PORT = 9300
+
+
+def request(port, method, path, body=None, timeout_s=1.0):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout_s)
+    try:
+        data = json.dumps(body).encode() if body is not None else None
+        conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read().decode())
+    finally:
+        conn.close()
+
+
+def find_leader(ports):
+    """Port of the leader with the highest term (a cut-off old leader may still think it leads)."""
+    best = None
+    for port in ports:
+        try:
+            st = request(port, "GET", "/status", timeout_s=0.2)[1]
+        except OSError:
+            continue
+        if st["role"] == "leader" and (best is None or st["term"] > best[1]):
+            best = (port, st["term"])
+    return best[0] if best else None
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def run(mode, args):
+    data_root = tempfile.mkdtemp(prefix="raft-faults-")
+    ports = [BASE_PORT + i for i in range(args.nodes)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    extra = ["--fault-injection"] + (["--no-prevote", "--no-check-quorum"] if mode == "off" else [])
+    procs = []
+    for i, port in enumerate(ports):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        procs.append(subprocess.Popen([sys.executable, "raft_node.py", "--id", node_id, "--port", str(port),
+                                       "--peers", peers, "--data-dir", f"{data_root}/{node_id}", *extra],
+                                      stdout=subprocess.DEVNULL))
+    stop = threading.Event()
+    commits = []  # perf_counter() of each committed write
+    commits_lock = threading.Lock()
+
+    def writer(t):
+        leader, n = None, 0
+        while not stop.is_set():
+            if leader is None:
+                leader = find_leader(ports)
+                if leader is None:
+                    time.sleep(0.01)
+                    continue
+            try:
+                code, _ = request(leader, "POST", "/put", {"key": f"w{t}", "value": n})
+            except OSError:
+                code = None
+            if code == 200:
+                with commits_lock:
+                    commits.append(time.perf_counter())
+                n += 1
+            else:
+                leader = None
+
+    try:
+        deadline = time.time() + 10
+        while True:
+            try:
+                statuses = [request(p, "GET", "/status")[1] for p in ports]
+                if any(st["role"] == "leader" for st in statuses):
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("no leader elected")
+            time.sleep(0.05)
+        first_term = max(st["term"] for st in statuses)
+        workers = [threading.Thread(target=writer, args=(t,)) for t in range(args.writers)]
+        for w in workers:
+            w.start()
+        time.sleep(1.0)
+
+        rng = random.Random(1)
+        downtime = {"follower": [], "leader": []}
+        start = time.perf_counter()
+        for e in range(args.events):
+            kind = "follower" if e % 2 == 0 else "leader"
+            leader = find_leader(ports)
+            target = leader if kind == "leader" else rng.choice([p for p in ports if p != leader])
+            t0 = time.perf_counter()
+            request(target, "POST", "/fault", {"isolate": True})
+            time.sleep(args.isolate)
+            request(target, "POST", "/fault", {"isolate": False})
+            time.sleep(args.settle)
+            t1 = time.perf_counter()
+            with commits_lock:
+                before = [c for c in commits if c < t0]
+                inside = [c for c in commits if t0 <= c <= t1]
+            points = ([before[-1]] if before else [t0]) + inside + [t1]
+            downtime[kind].append(max(b - a for a, b in zip(points, points[1:])))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for w in workers:
+            w.join()
+
+        statuses = [request(p, "GET", "/status")[1] for p in ports]
+        churn = max(st["term"] for st in statuses) - first_term
+        elections = sum(st["elections"]["elections"] for st in statuses)
+        with commits_lock:
+            writes = sum(1 for c in commits if c >= start)
+        print(f"prevote+checkquorum {mode}: {writes / elapsed:6.0f} writes/sec during faults, "
+              f"{churn} terms, {elections} elections")
+        for kind, values in downtime.items():
+            values.sort()
+            print(f"  {kind:<8} isolated {args.isolate}s x{len(values)}: downtime "
+                  f"p50={percentile(values, 50) * 1000:6.0f}ms p90={percentile(values, 90) * 1000:6.0f}ms "
+                  f"max={values[-1] * 1000:6.0f}ms")
+    finally:
+        stop.set()
+        for p in procs:
+            p.terminate()
+            p.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raft fault-injection harness")
+    parser.add_argument("--modes", default="off,on", help="PreVote/CheckQuorum off, on, or both")
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--isolate", type=float, default=1.0, help="seconds a node stays cut off")
+    parser.add_argument("--settle", type=float, default=1.5, help="seconds measured after reconnecting")
+    args = parser.parse_args()
+    for mode in args.modes.split(","):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: put and get throughput of the replicated key-value store.
+
+Starts nodes A, B, C (fresh data directories), waits for a leader, then has
+--clients keep-alive client threads send PUT /put to it for --seconds (one
+key per request, from --keys keys), and then GET /get for --seconds. Reports
+operations/sec and latency for each, plus how the leader batched the writes
+(commands per log append) and how many extra heartbeats the ReadIndex reads
+needed to confirm leadership.
+
+Usage:
+  python3 bench_kv.py [--clients 16] [--seconds 5] [--keys 1000]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_PORT = 9260
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read().decode())
+
+
+def status(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        return request(conn, "GET", "/status")[1]
+    finally:
+        conn.close()
+
+
+def wait_for_leader(ports, timeout_s=10.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        for port in ports:
+            try:
+                if status(port)["role"] == "leader":
+                    return port
+            except OSError:
+                pass
+        time.sleep(0.05)
+    raise RuntimeError("no leader elected")
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def load(name, port, args, make_request):
+    """Run --clients threads calling make_request(conn, rng) for --seconds; print the results."""
+    stop = threading.Event()
+    latencies = [[] for _ in range(args.clients)]
+    failed = [0]
+
+    def client(t):
+        rng = random.Random(t)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        while not stop.is_set():
+            start = time.perf_counter()
+            code, _ = make_request(conn, rng)
+            if code == 200:
+                latencies[t].append(time.perf_counter() - start)
+            else:
+                failed[0] += 1
+        conn.close()
+
+    workers = [threading.Thread(target=client, args=(t,)) for t in range(args.clients)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    done = sorted(x for per in latencies for x in per)
+    print(f"{name:<4} {len(done) / elapsed:>8.0f} ops/sec  p50={percentile(done, 50) * 1000:6.2f}ms "
+          f"p99={percentile(done, 99) * 1000:6.2f}ms  failed={failed[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raft key-value store benchmark")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--keys", type=int, default=1000)
+    args = parser.parse_args()
+
+    data_root = tempfile.mkdtemp(prefix="raft-kv-")
+    ports = [BASE_PORT + i for i in range(3)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    procs = []
+    for i, port in enumerate(ports):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        procs.append(subprocess.Popen([sys.executable, "raft_node.py", "--id", node_id, "--port", str(port),
+                                       "--peers", peers, "--data-dir", f"{data_root}/{node_id}"],
+                                      stdout=subprocess.DEVNULL))
+    try:
+        leader = wait_for_leader(ports)
+        load("put", leader, args, lambda conn, rng: request(
+            conn, "POST", "/put", {"key": f"k{rng.randrange(args.keys)}", "value": rng.random()}))
+        st = status(leader)
+        batching = st["batching"]
+        print(f"     {batching['commands'] / max(1, batching['appends']):.1f} commands per log append, "
+              f"{batching['appends']} appends, leader fsyncs={st['log']['fsyncs']}")
+
+        load("get", leader, args, lambda conn, rng: request(conn, "GET", f"/get?key=k{rng.randrange(args.keys)}"))
+        st = status(leader)
+        confirms = sum(r["read_confirms"] for r in st["replication"].values())
+        print(f"     {st['reads']['reads']} reads confirmed with {confirms} extra heartbeats "
+              f"({confirms / max(1, st['reads']['reads']):.2f} per read, all followers)")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
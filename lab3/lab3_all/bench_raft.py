@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: committed log entries per second on a local 3-node Raft cluster.
+
+For each --pipeline value, starts nodes A, B, C (fresh data directories,
+--max-batch entries per AppendEntries), waits for a leader, and then has
+--clients keep-alive client threads POST /propose to it for --seconds, each
+proposal carrying --batch commands. Reports committed entries/sec, proposal
+latency, and how many fsyncs the leader's group commit needed.
+
+Usage:
+  python3 bench_raft.py [--pipeline 1,4] [--clients 16] [--batch 1] [--seconds 5]
+"""
+
+import argparse
+import http.client
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_PORT = 9200
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read().decode())
+
+
+def status(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        return request(conn, "GET", "/status")[1]
+    finally:
+        conn.close()
+
+
+def start_cluster(n, data_root, extra):
+    ports = [BASE_PORT + i for i in range(n)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    procs = []
+    for i, port in enumerate(ports):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        procs.append(subprocess.Popen([sys.executable, "raft_node.py", "--id", node_id, "--port", str(port),
+                                       "--peers", peers, "--data-dir", f"{data_root}/{node_id}", *extra],
+                                      stdout=subprocess.DEVNULL))
+    return procs, ports
+
+
+def wait_for_leader(ports, timeout_s=10.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        for port in ports:
+            try:
+                if status(port)["role"] == "leader":
+                    return port
+            except OSError:
+                pass
+        time.sleep(0.05)
+    raise RuntimeError("no leader elected")
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def run(pipeline, args):
+    data_root = tempfile.mkdtemp(prefix="raft-bench-")
+    procs, ports = start_cluster(3, data_root, ["--pipeline-depth", str(pipeline), "--max-batch", str(args.max_batch)])
+    try:
+        leader = wait_for_leader(ports)
+        fsyncs_before = status(leader)["log"]["fsyncs"]
+        stop = threading.Event()
+        latencies = [[] for _ in range(args.clients)]
+        failed = [0]
+
+        def client(t):
+            conn = http.client.HTTPConnection("127.0.0.1", leader, timeout=10)
+            commands = [{"client": t, "n": i} for i in range(args.batch)]
+            while not stop.is_set():
+                start = time.perf_counter()
+                code, _ = request(conn, "POST", "/propose", {"commands": commands})
+                if code == 200:
+                    latencies[t].append(time.perf_counter() - start)
+                else:
+                    failed[0] += 1
+            conn.close()
+
+        workers = [threading.Thread(target=client, args=(t,)) for t in range(args.clients)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        done = sorted(x for per in latencies for x in per)
+        st = status(leader)
+        entries = len(done) * args.batch
+        print(f"pipeline={pipeline}  {entries / elapsed:>8.0f} entries/sec  "
+              f"p50={percentile(done, 50) * 1000:6.2f}ms p99={percentile(done, 99) * 1000:6.2f}ms  "
+              f"leader fsyncs={st['log']['fsyncs'] - fsyncs_before}  commit_index={st['commit_index']}  "
+              f"failed={failed[0]}")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raft log replication benchmark")
+    parser.add_argument("--pipeline", default="1,4")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1, help="commands per /propose")
+    parser.add_argument("--max-batch", type=int, default=512, help="entries per AppendEntries")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    for pipeline in [int(p) for p in args.pipeline.split(",")]:
+        run(pipeline, args)
+
+
+if __name__ == "__main__":
+    main()
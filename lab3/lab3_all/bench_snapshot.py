@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: on-disk size and follower catch-up time, with and without snapshots.
+
+For each --threshold value (0 = snapshots off), starts nodes A, B, C, waits
+for a leader and kills one follower. It then writes --entries puts over
+--keys keys (--value-bytes each, 50 per /propose, from 4 client threads),
+sampling the leader's data directory size as it goes. Finally it restarts
+the follower and times how long it takes to apply everything the leader
+had committed: the whole log replayed through AppendEntries without
+snapshots, a streamed InstallSnapshot plus the log tail with them.
+
+Usage:
+  python3 bench_snapshot.py [--threshold 0,5000] [--entries 50000] [--keys 2000]
+"""
+
+import argparse
+import http.client
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_PORT = 9280
+PER_PROPOSAL = 50
+CLIENTS = 4
+
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read().decode())
+
+
+def status(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        return request(conn, "GET", "/status")[1]
+    finally:
+        conn.close()
+
+
+def wait_for_leader(ports, timeout_s=10.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        for port in ports:
+            try:
+                if status(port)["role"] == "leader":
+                    return port
+            except OSError:
+                pass
+        time.sleep(0.05)
+    raise RuntimeError("no leader elected")
+
+
+def mib(n):
+    return n / (1024 * 1024)
+
+
+def run(threshold, args):
+    data_root = tempfile.mkdtemp(prefix="raft-snap-")
+    ports = [BASE_PORT + i for i in range(3)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+    extra = ["--snapshot-threshold", str(threshold), "--segment-bytes", str(args.segment_bytes)]
+
+    def start(i):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        return subprocess.Popen([sys.executable, "raft_node.py", "--id", node_id, "--port", str(ports[i]),
+                                 "--peers", peers, "--data-dir", f"{data_root}/{node_id}", *extra],
+                                stdout=subprocess.DEVNULL)
+
+    procs = [start(i) for i in range(3)]
+    try:
+        leader = wait_for_leader(ports)
+        lagging = next(i for i, p in enumerate(ports) if p != leader)
+        procs[lagging].kill()
+        procs[lagging].wait()
+
+        value = "x" * args.value_bytes
+        proposals = args.entries // PER_PROPOSAL
+        next_proposal = [0]
+        lock = threading.Lock()
+
+        def client():
+            conn = http.client.HTTPConnection("127.0.0.1", leader, timeout=10)
+            while True:
+                with lock:
+                    n = next_proposal[0]
+                    next_proposal[0] += 1
+                if n >= proposals:
+                    break
+                commands = [{"op": "put", "key": f"k{(n * PER_PROPOSAL + i) % args.keys}", "value": value}
+                            for i in range(PER_PROPOSAL)]
+                code, body = request(conn, "POST", "/propose", {"commands": commands})
+                if code != 200:
+                    raise RuntimeError(body)
+            conn.close()
+
+        workers = [threading.Thread(target=client) for _ in range(CLIENTS)]
+        for w in workers:
+            w.start()
+        peak = 0
+        while any(w.is_alive() for w in workers):
+            peak = max(peak, status(leader)["log"]["disk_bytes"])
+            time.sleep(0.2)
+        for w in workers:
+            w.join()
+        st = status(leader)
+        peak = max(peak, st["log"]["disk_bytes"])
+        target = st["commit_index"]
+
+        procs[lagging] = start(lagging)
+        start_time = time.perf_counter()
+        while True:
+            try:
+                if status(ports[lagging])["kv"]["last_applied"] >= target:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.01)
+        catch_up = time.perf_counter() - start_time
+        follower = status(ports[lagging])
+        label = f"threshold={threshold}" if threshold else "no snapshots"
+        print(f"{label:<16} {target} entries  leader disk: peak {mib(peak):6.2f} MiB, final "
+              f"{mib(st['log']['disk_bytes']):6.2f} MiB (snapshot {mib(st['log']['snapshot_bytes']):.2f} MiB)  "
+              f"follower catch-up {catch_up:6.2f}s, disk {mib(follower['log']['disk_bytes']):6.2f} MiB")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raft snapshot benchmark")
+    parser.add_argument("--threshold", default="0,5000", help="snapshot thresholds to compare (0: off)")
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--value-bytes", type=int, default=100)
+    parser.add_argument("--segment-bytes", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+    for threshold in [int(t) for t in args.threshold.split(",")]:
+        run(threshold, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU used by an idle cluster, and how late the election timers fire.
+
+Starts an --nodes cluster, waits for a leader, lets it settle, then samples
+each node's user+system CPU time from /proc/<pid>/stat over --seconds with
+no client traffic: all that runs is heartbeats and timers. Then it freezes
+the leader (SIGSTOP) --trials times and reads from /status how late each
+election timer fired relative to its deadline. A frozen leader's own timers
+fire late by the whole freeze once it resumes, so each frozen node is
+restarted (same data directory, fresh timer statistics) before the next
+trial: only timers on running nodes are measured.
+
+Linux only (/proc).
+
+Usage:
+  python3 bench_timers.py [--nodes 5] [--seconds 10] [--trials 10]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_PORT = 9240
+TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def status(port, timeout_s=0.2):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout_s)
+    try:
+        conn.request("GET", "/status")
+        return json.loads(conn.getresponse().read().decode())
+    finally:
+        conn.close()
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / TICKS  # utime + stime
+
+
+def wait_leader(ports, min_term=0, timeout_s=20.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        for port in ports:
+            try:
+                st = status(port)
+            except OSError:
+                continue
+            if st["role"] == "leader" and st["term"] >= min_term:
+                return port, st["term"]
+        time.sleep(0.01)
+    raise RuntimeError("no leader elected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raft idle CPU and timer accuracy benchmark")
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--trials", type=int, default=10)
+    args = parser.parse_args()
+
+    data_root = tempfile.mkdtemp(prefix="raft-timers-")
+    ports = [BASE_PORT + i for i in range(args.nodes)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+
+    def start(i):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        return subprocess.Popen([sys.executable, "raft_node.py", "--id", node_id, "--port", str(ports[i]),
+                                 "--peers", peers, "--data-dir", f"{data_root}/{node_id}"],
+                                stdout=subprocess.DEVNULL)
+
+    procs = {port: start(i) for i, port in enumerate(ports)}
+    try:
+        leader, term = wait_leader(ports)
+        time.sleep(2.0)
+        before = {port: cpu_seconds(proc.pid) for port, proc in procs.items()}
+        time.sleep(args.seconds)
+        used = {port: cpu_seconds(proc.pid) - before[port] for port, proc in procs.items()}
+        followers = [used[p] for p in ports if p != leader]
+        print(f"idle CPU over {args.seconds:.0f}s: leader {used[leader] / args.seconds * 100:5.1f}%  "
+              f"followers avg {sum(followers) / len(followers) / args.seconds * 100:5.1f}%  "
+              f"total {sum(used.values()) / args.seconds * 100:5.1f}%")
+
+        for _ in range(args.trials):
+            os.kill(procs[leader].pid, signal.SIGSTOP)
+            wait_leader([p for p in ports if p != leader], term + 1)
+            procs[leader].kill()  # SIGKILL works on a stopped process; its late timers go with it
+            procs[leader].wait()
+            procs[leader] = start(ports.index(leader))
+            time.sleep(1.0)
+            leader, term = wait_leader(ports)
+        timers = [status(p).get("timers") for p in ports]
+        if any(t is None for t in timers):
+            print("election timer lateness: not reported by this raft_node.py")
+            return
+        fired = sum(t["fired"] for t in timers)
+        print(f"election timer lateness over {fired} firings: "
+              f"p50={max(t['late_p50_ms'] for t in timers):.2f}ms "
+              f"p99={max(t['late_p99_ms'] for t in timers):.2f}ms "
+              f"max={max(t['late_max_ms'] for t in timers):.2f}ms (worst node)")
+    finally:
+        for proc in procs.values():
+            os.kill(proc.pid, signal.SIGCONT)
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,40 @@ Query node status and trigger actions for testing.
 Usage:
   python3 raft_client.py --node http://IP:PORT status
   python3 raft_client.py --nodes http://A:8000,http://B:8001,http://C:8002 status-all
+  python3 raft_client.py --nodes http://A:8000,http://B:8001,http://C:8002 put --key k --value v
+  python3 raft_client.py --nodes http://A:8000,http://B:8001,http://C:8002 get --key k
+  python3 raft_client.py --nodes http://A:8000,http://B:8001,http://C:8002 collect --out metrics.jsonl
+  python3 raft_client.py scenario --count 5 --kills 20 --target leader --out scenario.jsonl
+
+collect scrapes every node's /metrics concurrently each --interval and
+appends one JSON line per round to --out: {"t", "leader", "nodes": {url:
+metrics or null}}. "leader" is the effective leader: a node in the leader
+role whose term and leadership a majority of the cluster reports. On exit
+(after --duration, or Ctrl+C) it prints per-node elections, term changes,
+time without a leader and heartbeat RTT percentiles, and how long the
+cluster as a whole went without an effective leader.
+
+scenario starts --count local nodes (ports from --base-port, fresh data
+directories), collects metrics the same way, and --kills times kills a
+node (SIGKILL), measures how long until the survivors have an effective
+leader again, restarts it after --down seconds and measures how long it
+takes to rejoin. It reports the failover and rejoin latency distributions.
 """
 
-from urllib import request
+from concurrent.futures import ThreadPoolExecutor
+from urllib import error, parse, request
 import argparse
 import json
+import os
+import random
+import shutil
+import subprocess
 import sys
+import tempfile
+import threading
+import time
+
+SCRAPE_POOL = ThreadPoolExecutor(max_workers=16)  # one request per node per scrape round
 
 
 def http_get(url: str, timeout: float = 2.0) -> dict:
@@ -30,6 +58,40 @@ def http_post(url: str, payload: dict, timeout: float = 2.0) -> dict:
         return json.loads(resp.read().decode())
 
 
+def leader_call(nodes: list, path: str, payload: dict = None) -> dict:
+    """GET (or POST payload to) path on whichever node is leader; followers answer 503."""
+    last_error = "no nodes given"
+    for node in nodes:
+        url = node.rstrip("/") + path
+        try:
+            return http_post(url, payload) if payload is not None else http_get(url)
+        except error.HTTPError as e:
+            last_error = json.loads(e.read().decode()).get("error", str(e))
+        except Exception as e:
+            last_error = str(e)
+    raise RuntimeError(last_error)
+
+
+def cmd_put(nodes: list, key: str, value: str) -> None:
+    """Replicate key=value through the leader's log."""
+    try:
+        data = leader_call(nodes, "/put", {"key": key, "value": value})
+        print(f"OK: {key}={value} committed at index {data['index']} (term {data['term']})")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+def cmd_get(nodes: list, key: str) -> None:
+    """Linearizable read through the leader."""
+    try:
+        data = leader_call(nodes, "/get?" + parse.urlencode({"key": key}))
+        print(f"{key}={data['value']}" if data["found"] else f"{key} not found")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
 def cmd_status(node: str) -> None:
     """Get status of single node."""
     url = node.rstrip("/") + "/status"
@@ -41,21 +103,29 @@ def cmd_status(node: str) -> None:
         sys.exit(1)
 
 
+def scrape(nodes: list, path: str, timeout: float = 1.0) -> list:
+    """GET path from all nodes at once; one result per node, None if it did not answer."""
+    def fetch(node):
+        try:
+            return http_get(node.rstrip("/") + path, timeout=timeout)
+        except Exception:
+            return None
+    return list(SCRAPE_POOL.map(fetch, nodes))
+
+
 def cmd_status_all(nodes: list) -> None:
     """Get status of all nodes."""
     print(f"{'Node':<6} {'Term':<6} {'Role':<12} {'Leader':<8} {'Voted For':<10}")
     print("-" * 50)
     
-    for node in nodes:
-        url = node.rstrip("/") + "/status"
-        try:
-            data = http_get(url, timeout=1.0)
+    for node, data in zip(nodes, scrape(nodes, "/status")):
+        if data is not None:
             print(f"{data.get('node', '?'):<6} "
                   f"{data.get('term', '?'):<6} "
                   f"{data.get('role', '?'):<12} "
                   f"{data.get('leader') or '-':<8} "
                   f"{data.get('voted_for') or '-':<10}")
-        except Exception as e:
+        else:
             # Extract node ID from URL for display
             node_id = node.split(":")[-1]
             print(f"?:{node_id:<4} {'?':<6} {'UNREACHABLE':<12} {'-':<8} {'-':<10}")
@@ -63,8 +133,6 @@ def cmd_status_all(nodes: list) -> None:
 
 def cmd_watch(nodes: list, interval: float = 1.0) -> None:
     """Continuously watch cluster status."""
-    import time
-    
     try:
         while True:
             print("\033[2J\033[H")  # Clear screen
@@ -75,13 +143,276 @@ def cmd_watch(nodes: list, interval: float = 1.0) -> None:
         print("\nStopped.")
 
 
+def effective_leader(metrics: list, cluster_size: int):
+    """(term, node) of a leader that a majority of the cluster follows in its term, or None."""
+    for m in metrics:
+        if m is None or m["role"] != "leader":
+            continue
+        backers = sum(1 for o in metrics if o is not None and o["term"] == m["term"] and o["leader"] == m["node"])
+        if backers >= cluster_size // 2 + 1:
+            return m["term"], m["node"]
+    return None
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+def histogram_percentile(buckets_ms: list, counts: list, pct: float) -> str:
+    """Upper bound of the bucket holding the pct-th percentile observation."""
+    rank = pct / 100.0 * sum(counts)
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if count and seen >= rank:
+            return f"<={buckets_ms[i]:g}ms" if i < len(buckets_ms) else f">{buckets_ms[-1]:g}ms"
+    return "-"
+
+
+class Collector:
+    """
+    Scrapes /metrics from every node each interval, appends each round to a
+    JSONL file and keeps running totals for summary().
+
+    Node counters are cumulative since the node started, so totals add up
+    the differences between consecutive answers from the same process
+    ("started" changes when a node restarts, and its counters start from
+    zero again). Nodes already running when collection starts count from
+    their first answer.
+    """
+
+    def __init__(self, nodes: list, interval: float, out_path: str) -> None:
+        self.nodes = nodes
+        self.interval = interval
+        self.out_path = out_path
+        self.out = open(out_path, "a")
+        self.stop = threading.Event()
+        self.rounds = 0
+        self.first_t = None
+        self.last_t = None
+        self.last_leader = None     # effective leader in the previous round
+        self.known_leader = None    # latest effective leader seen
+        self.leader_changes = 0
+        self.leaderless_s = 0.0     # cluster time without an effective leader
+        self.terms = [None, None]   # highest term in the first and latest round
+        self.prev = {}              # node -> its previous answer
+        self.prev_rtt = {node: {} for node in nodes}  # node -> peer -> previous histogram
+        self.totals = {node: {"answered": 0, "elections": 0, "term_changes": 0, "leaderless_s": 0.0,
+                              "rtt": None} for node in nodes}
+
+    def run(self, duration: float = None) -> None:
+        """Scrape every interval until stop is set (or for duration seconds)."""
+        deadline = time.monotonic() + duration if duration else None
+        next_round = time.monotonic()
+        while not self.stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            self.scrape_once()
+            next_round = max(next_round + self.interval, time.monotonic())
+            self.stop.wait(next_round - time.monotonic())
+
+    def scrape_once(self) -> dict:
+        t = time.time()
+        metrics = scrape(self.nodes, "/metrics", timeout=min(1.0, self.interval))
+        leader = effective_leader(metrics, len(self.nodes))
+        record = {"t": round(t, 3), "leader": leader[1] if leader else None, "term": leader[0] if leader else None,
+                  "nodes": dict(zip(self.nodes, metrics))}
+        self.out.write(json.dumps(record) + "\n")
+        self.out.flush()
+        self._account(t, leader, metrics)
+        return record
+
+    def _account(self, t: float, leader, metrics: list) -> None:
+        if self.first_t is None:
+            self.first_t = t
+        if self.last_t is not None and self.last_leader is None:
+            self.leaderless_s += t - self.last_t
+        if leader is not None:
+            if self.known_leader is not None and leader != self.known_leader:
+                self.leader_changes += 1
+            self.known_leader = leader
+        self.last_t, self.last_leader = t, leader
+        self.rounds += 1
+        terms = [m["term"] for m in metrics if m is not None]
+        if terms:
+            self.terms[1] = max(terms)
+            if self.terms[0] is None:
+                self.terms[0] = self.terms[1]
+
+        for node, m in zip(self.nodes, metrics):
+            if m is None:
+                continue
+            totals = self.totals[node]
+            totals["answered"] += 1
+            prev = self.prev.get(node)
+            if prev is not None and prev["started"] != m["started"]:
+                prev = None
+                self.prev_rtt[node] = {}
+            fresh = m["started"] >= self.first_t  # started during collection: count from zero
+            if prev is None and not fresh:
+                prev = m
+            for key in ("elections", "term_changes"):
+                totals[key] += m["elections"][key] - (prev["elections"][key] if prev else 0)
+            totals["leaderless_s"] += m["leaderless_s"] - (prev["leaderless_s"] if prev else 0.0)
+            self.prev[node] = m
+
+            for peer, hist in m["heartbeat_rtt"].items():
+                base = self.prev_rtt[node].get(peer)
+                if base is None:
+                    base = {"counts": [0] * len(hist["counts"])} if fresh else hist
+                if totals["rtt"] is None:
+                    totals["rtt"] = {"buckets_ms": hist["buckets_ms"], "counts": [0] * len(hist["counts"])}
+                for i, (now, before) in enumerate(zip(hist["counts"], base["counts"])):
+                    totals["rtt"]["counts"][i] += now - before
+                self.prev_rtt[node][peer] = hist
+
+    def close(self) -> None:
+        self.stop.set()
+        self.out.close()
+
+    def summary(self) -> None:
+        elapsed = (self.last_t - self.first_t) if self.rounds > 1 else 0.0
+        print(f"{self.rounds} rounds over {elapsed:.1f}s -> {self.out_path}")
+        if not self.rounds:
+            return
+        print(f"cluster: no effective leader for {self.leaderless_s:.2f}s "
+              f"({100.0 * self.leaderless_s / max(elapsed, 1e-9):.1f}%), {self.leader_changes} leader changes, "
+              f"term {self.terms[0]} -> {self.terms[1]}")
+        print(f"{'Node':<24} {'Answered':>8} {'Elections':>9} {'Terms':>6} {'No leader':>10} "
+              f"{'HB RTTs':>8} {'p50':>9} {'p99':>9}")
+        for node in self.nodes:
+            totals = self.totals[node]
+            rtt = totals["rtt"] or {"buckets_ms": [], "counts": []}
+            print(f"{node:<24} {totals['answered']:>8} {totals['elections']:>9} {totals['term_changes']:>6} "
+                  f"{totals['leaderless_s']:>9.2f}s {sum(rtt['counts']):>8} "
+                  f"{histogram_percentile(rtt['buckets_ms'], rtt['counts'], 50):>9} "
+                  f"{histogram_percentile(rtt['buckets_ms'], rtt['counts'], 99):>9}")
+
+
+def cmd_collect(nodes: list, interval: float, out_path: str, duration: float = None) -> None:
+    """Scrape metrics into out_path until duration has passed or Ctrl+C, then summarize."""
+    collector = Collector(nodes, interval, out_path)
+    try:
+        collector.run(duration)
+    except KeyboardInterrupt:
+        pass
+    collector.close()
+    collector.summary()
+
+
+def wait_for(check, timeout_s: float, poll_s: float = 0.01):
+    """Call check() every poll_s until it returns something truthy; None on timeout."""
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        result = check()
+        if result:
+            return result
+        time.sleep(poll_s)
+    return None
+
+
+def cmd_scenario(args) -> None:
+    """Start local nodes, kill and restart them, and report failover and rejoin latencies."""
+    count = args.count
+    data_root = tempfile.mkdtemp(prefix="raft-scenario-")
+    urls = [f"http://127.0.0.1:{args.base_port + i}" for i in range(count)]
+    node_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "raft_node.py")
+
+    def start(i):
+        node_id = chr(ord("A") + i)
+        peers = ",".join(u for j, u in enumerate(urls) if j != i)
+        return subprocess.Popen([sys.executable, node_script, "--id", node_id, "--port", str(args.base_port + i),
+                                 "--peers", peers, "--data-dir", os.path.join(data_root, node_id)],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def leader_of(nodes, min_term=0):
+        leader = effective_leader(scrape(nodes, "/metrics", timeout=0.2), count)
+        return leader if leader and leader[0] >= min_term else None
+
+    procs = [start(i) for i in range(count)]
+    collector = Collector(urls, args.interval, args.out)
+    collector_thread = threading.Thread(target=collector.run, daemon=True)
+    failover = {"leader": [], "follower": []}
+    rejoin = []
+    timeouts = 0
+    rng = random.Random(args.seed)
+    try:
+        if not wait_for(lambda: leader_of(urls), 10.0):
+            raise RuntimeError("no leader elected")
+        collector_thread.start()
+        for _ in range(args.kills):
+            term, leader_id = wait_for(lambda: leader_of(urls), 10.0) or (0, None)
+            leader = ord(leader_id) - ord("A") if leader_id else None
+            target = args.target if args.target != "random" else rng.choice(["leader", "follower"])
+            if target == "leader" and leader is not None:
+                victim = leader
+            else:
+                victim = rng.choice([i for i in range(count) if i != leader])
+            kind = "leader" if victim == leader else "follower"
+            survivors = [u for i, u in enumerate(urls) if i != victim]
+
+            procs[victim].kill()
+            procs[victim].wait()
+            start_time = time.perf_counter()
+            # A dead leader needs a new term; with a follower down the old leader should stay put
+            if wait_for(lambda: leader_of(survivors, term + 1 if kind == "leader" else term), 10.0):
+                failover[kind].append(time.perf_counter() - start_time)
+            else:
+                timeouts += 1
+
+            time.sleep(args.down)
+            procs[victim] = start(victim)
+            start_time = time.perf_counter()
+
+            def rejoined():
+                metrics = scrape(urls, "/metrics", timeout=0.2)
+                current = effective_leader(metrics, count)
+                return current and metrics[victim] is not None and metrics[victim]["leader"] == current[1]
+
+            if wait_for(rejoined, 10.0):
+                rejoin.append(time.perf_counter() - start_time)
+            else:
+                timeouts += 1
+            time.sleep(args.settle)
+    finally:
+        collector.close()
+        if collector_thread.is_alive():
+            collector_thread.join()
+        for p in procs:
+            p.terminate()
+            p.wait()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+    print(f"{count} nodes, {args.kills} kills (target={args.target}, down {args.down}s), {timeouts} timeouts")
+    for label, values in [("failover, leader killed", failover["leader"]),
+                          ("failover, follower killed", failover["follower"]),
+                          ("rejoin after restart", rejoin)]:
+        if not values:
+            continue
+        values.sort()
+        print(f"  {label:<26} x{len(values):<3} p50={percentile(values, 50) * 1000:6.0f}ms "
+              f"p90={percentile(values, 90) * 1000:6.0f}ms p99={percentile(values, 99) * 1000:6.0f}ms "
+              f"max={values[-1] * 1000:6.0f}ms")
+    collector.summary()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Raft Client Utility")
     parser.add_argument("--node", help="Single node URL")
     parser.add_argument("--nodes", help="Comma-separated node URLs")
-    parser.add_argument("cmd", choices=["status", "status-all", "watch"])
+    parser.add_argument("cmd", choices=["status", "status-all", "watch", "put", "get", "collect", "scenario"])
+    parser.add_argument("--key", help="Key for put/get")
+    parser.add_argument("--value", help="Value for put")
     parser.add_argument("--interval", type=float, default=1.0, 
-                        help="Watch interval in seconds")
+                        help="Watch/collect interval in seconds")
+    parser.add_argument("--out", default="metrics.jsonl", help="Time series file for collect/scenario")
+    parser.add_argument("--duration", type=float, help="Seconds to collect (default: until Ctrl+C)")
+    parser.add_argument("--count", type=int, default=3, help="Local nodes for scenario")
+    parser.add_argument("--kills", type=int, default=10, help="Nodes killed (and restarted) by scenario")
+    parser.add_argument("--target", choices=["leader", "follower", "random"], default="leader",
+                        help="Which node scenario kills")
+    parser.add_argument("--down", type=float, default=1.0, help="Seconds a killed node stays down")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds between a rejoin and the next kill")
+    parser.add_argument("--base-port", type=int, default=9320, help="First port of the scenario's nodes")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for scenario's choice of victims")
     args = parser.parse_args()
     
     if args.cmd == "status":
@@ -104,6 +435,26 @@ def main():
         nodes = [n.strip() for n in args.nodes.split(",") if n.strip()]
         cmd_watch(nodes, args.interval)
 
+    elif args.cmd in ("put", "get"):
+        nodes = [n.strip() for n in (args.nodes or args.node or "").split(",") if n.strip()]
+        if not nodes or not args.key or (args.cmd == "put" and args.value is None):
+            print(f"--nodes (or --node) and --key{' and --value' if args.cmd == 'put' else ''} required for {args.cmd}")
+            sys.exit(2)
+        if args.cmd == "put":
+            cmd_put(nodes, args.key, args.value)
+        else:
+            cmd_get(nodes, args.key)
+
+    elif args.cmd == "collect":
+        if not args.nodes:
+            print("--nodes required for collect command")
+            sys.exit(2)
+        nodes = [n.strip() for n in args.nodes.split(",") if n.strip()]
+        cmd_collect(nodes, args.interval, args.out, args.duration)
+
+    elif args.cmd == "scenario":
+        cmd_scenario(args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,389 @@
+"""
+Persistent Raft state for the Lab 3 node: the log plus current_term/voted_for.
+
+Layout of the data directory:
+  meta.json     {"term": ..., "voted_for": ...}, replaced atomically on change
+  log-<n>.seg   log segments, appended in order; a restart starts a new one
+  snapshot.dat  state machine as of snapshot_index: a JSON header line
+                {"index": ..., "term": ...} and then the state as JSON
+
+Records are framed as  length:u32 | crc32:u32 | JSON payload,  and each
+payload is [index, term, command]. A record whose index is not past the
+current end of the log replaces the entries from that index on. That is how
+a follower drops a conflicting suffix without rewriting any file: replay
+applies the records in order and ends with exactly the log that was written.
+
+Group commit: append() only buffers records. One flusher thread writes
+everything buffered so far with one write() and one fsync(), then advances
+durable_index and calls on_durable(durable_index). A leader counts its own
+durable_index towards commitment; a follower acknowledges entries only once
+wait_durable() returns for them.
+
+Compaction: once a snapshot covers the log up to base_index, the entries up
+to it are dropped from memory, and every closed segment holding only
+records at or below base_index is deleted. Replay starts from the snapshot.
+A record at or below base_index still truncates every entry after
+base_index, exactly as it would have without the deleted segments. A
+follower that installs a leader's snapshot conflicting with its log writes
+a record at the snapshot index for that reason.
+"""
+
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+RECORD = struct.Struct("!II")  # payload length, crc32
+SEGMENT_BYTES = 16 * 1024 * 1024
+
+_SEGMENT = re.compile(r"^log-(\d+)\.seg$")
+SNAPSHOT = "snapshot.dat"
+SNAPSHOT_TMP = "snapshot.tmp"    # being written by this node
+SNAPSHOT_RECV = "snapshot.recv"  # being received from the leader
+
+Entry = Tuple[int, Any]  # (term, command)
+
+
+def _frame(obj: Any) -> bytes:
+    payload = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _records(buf: bytes) -> Iterator[Tuple[int, bytes]]:
+    """Yield (end offset, payload) for each intact record; stops at the first torn or corrupt one."""
+    offset = 0
+    while offset + RECORD.size <= len(buf):
+        length, crc = RECORD.unpack_from(buf, offset)
+        start = offset + RECORD.size
+        payload = buf[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        offset = start + length
+        yield offset, payload
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class RaftLog:
+    def __init__(self, data_dir: str, segment_bytes: int = SEGMENT_BYTES,
+                 on_durable: Optional[Callable[[int], None]] = None) -> None:
+        self.dir = data_dir
+        self.segment_bytes = segment_bytes
+        self.on_durable = on_durable
+        os.makedirs(data_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.flush_cond = threading.Condition(self.lock)
+        self.durable_cond = threading.Condition(self.lock)
+        self.entries: List[Entry] = []  # entries[i] is log index base_index + 1 + i
+        self.base_index = 0             # last index covered by the snapshot (0: none)
+        self.base_term = 0
+        self.snapshot_bytes = 0
+        self.buffer: List[bytes] = []
+        self.buffer_last = 0      # index written by the newest buffered record
+        self.buffer_max = 0       # highest index among the buffered records
+        self.low_water = 0        # lowest index overwritten since the flusher took its chunk (0 = none)
+        self.durable_index = 0
+
+        self.segment = 0
+        self.segment_max: Dict[int, int] = {}  # segment -> highest index recorded in it
+        self.rotate_requested = False
+        self.file = None
+        self.segment_bytes_written = 0
+        self.fsyncs = 0
+        self.snapshots = 0
+
+    def _path(self, n: int) -> str:
+        return os.path.join(self.dir, f"log-{n:08d}.seg")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    # ---- term and vote ----
+
+    def load_meta(self) -> Tuple[int, Optional[str]]:
+        try:
+            with open(os.path.join(self.dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            return int(meta["term"]), meta.get("voted_for")
+        except FileNotFoundError:
+            return 0, None
+
+    def save_meta(self, term: int, voted_for: Optional[str]) -> None:
+        """Durably record term and vote; must complete before the node acts on them."""
+        path = os.path.join(self.dir, "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"term": term, "voted_for": voted_for}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_dir(self.dir)
+
+    # ---- recovery ----
+
+    def recover(self) -> int:
+        """Replay every segment in order (after load_snapshot()). Returns the number of records replayed."""
+        count = 0
+        segments = sorted(int(m.group(1)) for m in map(_SEGMENT.match, os.listdir(self.dir)) if m)
+        for n in segments:
+            path = self._path(n)
+            with open(path, "rb") as f:
+                data = f.read()
+            good = 0
+            self.segment_max[n] = 0
+            for good, payload in _records(data):
+                index, term, command = json.loads(payload)
+                self._place(index, (term, command))
+                self.segment_max[n] = max(self.segment_max[n], index)
+                count += 1
+            if good < len(data):
+                # Torn write from a crash: drop the partial tail
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+        self.segment = (segments[-1] + 1) if segments else 0
+        self.durable_index = self.last_index()
+        return count
+
+    def _place(self, index: int, entry: Entry) -> None:
+        """Put entry at index, dropping whatever was at index and after it (at or below base_index: just drop)."""
+        del self.entries[max(0, index - self.base_index - 1):]
+        if index > self.base_index:
+            self.entries.append(entry)
+
+    # ---- reads (callers needing a consistent view hold their own lock across calls) ----
+
+    def last_index(self) -> int:
+        return self.base_index + len(self.entries)
+
+    def last_term(self) -> int:
+        return self.entries[-1][0] if self.entries else self.base_term
+
+    def term_at(self, index: int) -> Optional[int]:
+        """Term of the entry at index (0 for index 0), or None if the log does not reach it."""
+        if index == self.base_index:
+            return self.base_term
+        if self.base_index < index <= self.last_index():
+            return self.entries[index - self.base_index - 1][0]
+        return None
+
+    def first_index_of_term(self, index: int) -> int:
+        """First index of the run of entries sharing index's term (a follower's conflict hint)."""
+        term = self.term_at(index)
+        while index - 1 > self.base_index and self.term_at(index - 1) == term:
+            index -= 1
+        return index
+
+    def entries_from(self, index: int, limit: int) -> List[Entry]:
+        start = index - self.base_index - 1
+        return self.entries[start:start + limit]
+
+    # ---- writes ----
+
+    def _write(self, index: int, entry: Entry) -> None:
+        record = _frame([index, entry[0], entry[1]])
+        with self.lock:
+            if index <= self.last_index():
+                self.durable_index = min(self.durable_index, index - 1)
+                self.low_water = index if not self.low_water else min(self.low_water, index)
+            self.buffer.append(record)
+            self.buffer_last = index
+            self.buffer_max = max(self.buffer_max, index)
+            self.flush_cond.notify()
+        self._place(index, entry)
+
+    def append(self, term: int, commands: List[Any]) -> int:
+        """Leader: append commands at the end of the log in `term`. Returns the last index."""
+        first = self.last_index() + 1
+        if not commands:
+            return first - 1
+        # Nothing is overwritten at the end of the log, so the whole batch is buffered under one lock
+        records = [_frame([first + i, term, command]) for i, command in enumerate(commands)]
+        with self.lock:
+            self.buffer.extend(records)
+            self.buffer_last = self.buffer_max = first + len(commands) - 1
+            self.flush_cond.notify()
+        self.entries.extend((term, command) for command in commands)
+        return self.last_index()
+
+    def append_entries(self, prev_index: int, entries: List[Entry]) -> int:
+        """
+        Follower: place entries after prev_index (which must match). Entries
+        already present with the same term are kept; the first conflicting one
+        and everything after it are replaced. Returns the index of the last
+        entry placed.
+        """
+        index = prev_index
+        for term, command in entries:
+            index += 1
+            if self.term_at(index) == term:
+                continue
+            self._write(index, (term, command))
+        return index
+
+    def wait_durable(self, index: int, timeout_s: Optional[float] = None) -> bool:
+        """Block until entries up to index are on disk. False on timeout."""
+        with self.lock:
+            return self.durable_cond.wait_for(lambda: self.durable_index >= index, timeout_s)
+
+    # ---- flushing ----
+
+    def start(self) -> None:
+        """Open a fresh segment and start the flusher thread."""
+        self.file = open(self._path(self.segment), "ab")
+        self.segment_max[self.segment] = 0
+        _fsync_dir(self.dir)
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self.lock:
+                while not self.buffer:
+                    self.flush_cond.wait()
+                chunk = b"".join(self.buffer)
+                self.buffer = []
+                target = self.buffer_last
+                chunk_max, self.buffer_max = self.buffer_max, 0
+                self.low_water = 0
+            self.file.write(chunk)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.fsyncs += 1
+            with self.lock:
+                if self.low_water:
+                    # Entries from low_water on were overwritten meanwhile; their new records are not flushed yet
+                    target = min(target, self.low_water - 1)
+                self.durable_index = max(self.durable_index, target)
+                durable = self.durable_index
+                self.segment_max[self.segment] = max(self.segment_max[self.segment], chunk_max)
+                rotate = self.rotate_requested
+                self.durable_cond.notify_all()
+            if self.on_durable is not None:
+                self.on_durable(durable)
+            self.segment_bytes_written += len(chunk)
+            if rotate or self.segment_bytes_written >= self.segment_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        self.file.close()
+        with self.lock:
+            self.segment += 1
+            self.segment_max[self.segment] = 0
+            self.rotate_requested = False
+        self.file = open(self._path(self.segment), "ab")
+        self.segment_bytes_written = 0
+        _fsync_dir(self.dir)
+
+    # ---- snapshots ----
+
+    def load_snapshot(self) -> Optional[Any]:
+        """Start the log after the snapshot on disk, if any. Returns the snapshot's state (None if there is none)."""
+        for name in (SNAPSHOT_TMP, SNAPSHOT_RECV):
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))  # unfinished when the node stopped
+        try:
+            index, term, state = self._parse_snapshot(self._file(SNAPSHOT))
+        except FileNotFoundError:
+            return None
+        self.base_index, self.base_term = index, term
+        self.snapshot_bytes = os.path.getsize(self._file(SNAPSHOT))
+        return state
+
+    @staticmethod
+    def _parse_snapshot(path: str) -> Tuple[int, int, Any]:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            return int(header["index"]), int(header["term"]), json.loads(f.read())
+
+    def write_snapshot(self, index: int, term: int, state: Any) -> str:
+        """Durably write a snapshot of the state as of index, to be installed with use_snapshot()."""
+        path = self._file(SNAPSHOT_TMP)
+        with open(path, "wb") as f:
+            f.write(json.dumps({"index": index, "term": term}).encode("utf-8") + b"\n")
+            f.write(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        return path
+
+    def read_snapshot(self, offset: int, size: int) -> bytes:
+        """Bytes [offset, offset + size) of the current snapshot file (for InstallSnapshot)."""
+        with open(self._file(SNAPSHOT), "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def receive_snapshot_chunk(self, offset: int, data: bytes) -> bool:
+        """Follower: add a chunk of the leader's snapshot file. offset 0 starts over. False if out of order."""
+        path = self._file(SNAPSHOT_RECV)
+        have = os.path.getsize(path) if offset and os.path.exists(path) else 0
+        if offset != have:
+            return False
+        with open(path, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.write(data)
+        return True
+
+    def received_snapshot(self) -> Tuple[str, int, int, Any]:
+        """Follower: fsync the completely received snapshot. Returns (path, index, term, state)."""
+        path = self._file(SNAPSHOT_RECV)
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+        return (path,) + self._parse_snapshot(path)
+
+    def use_snapshot(self, path: str, index: int, term: int) -> None:
+        """
+        Make the durable snapshot at path (covering the log up to index) the
+        current one and compact the log behind it. Entries after index are
+        kept if the log has the snapshot's last entry, and dropped otherwise.
+        """
+        os.replace(path, self._file(SNAPSHOT))
+        _fsync_dir(self.dir)
+        keep = self.term_at(index) == term
+        with self.lock:
+            if keep:
+                self.durable_index = max(self.durable_index, index)
+            else:
+                # Our entries after index conflict with the snapshot: record that for replay
+                self.buffer.append(_frame([index, term, None]))
+                self.buffer_last = index
+                self.buffer_max = max(self.buffer_max, index)
+                self.low_water = index + 1 if not self.low_water else min(self.low_water, index + 1)
+                self.durable_index = index
+                self.flush_cond.notify()
+            if keep:
+                del self.entries[:index - self.base_index]
+            else:
+                self.entries = []
+            self.base_index, self.base_term = index, term
+            self.snapshot_bytes = os.path.getsize(self._file(SNAPSHOT))
+            self.snapshots += 1
+            # Drop closed segments from the oldest while the snapshot covers all they hold
+            for n in sorted(self.segment_max):
+                if n >= self.segment or self.segment_max[n] > index:
+                    break
+                os.remove(self._path(n))
+                del self.segment_max[n]
+            # Close the current segment at its next flush, so the next snapshot can drop it too
+            self.rotate_requested = True
+
+    def disk_bytes(self) -> int:
+        total = 0
+        for name in os.listdir(self.dir):
+            try:
+                total += os.path.getsize(self._file(name))
+            except FileNotFoundError:
+                pass  # a segment deleted meanwhile
+        return total
+
+    def stats(self) -> dict:
+        return {"last_index": self.last_index(), "durable_index": self.durable_index,
+                "segment": self.segment, "segments": len(self.segment_max), "fsyncs": self.fsyncs,
+                "snapshot_index": self.base_index, "snapshot_bytes": self.snapshot_bytes,
+                "snapshots": self.snapshots, "disk_bytes": self.disk_bytes()}
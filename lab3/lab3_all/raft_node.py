@@ -7,17 +7,45 @@ This node implements the Raft consensus leader election logic including:
 - Randomized election timeouts [cite: 62]
 - Majority-based voting [cite: 14]
 - Heartbeat-driven leader maintenance [cite: 19]
+- PreVote: a node asks whether it could win before it raises its term
+- CheckQuorum: a leader that loses touch with a majority steps down, and
+  nodes that still hear from a leader ignore vote requests
+
+and log replication on top of it:
+- A persistent log, term and vote (raft_log.py: segmented files, group-commit fsync)
+- AppendEntries with nextIndex/matchIndex per follower, batched and pipelined
+- Commitment by majority match, for entries of the leader's current term
+
+log compaction:
+- Periodic state-machine snapshots; the log behind a snapshot is deleted
+- InstallSnapshot, streamed in chunks, for followers behind the leader's snapshot
+
+and a key-value store on top of the log:
+- Committed entries are applied in order to a KVStateMachine (state_machine.py)
+- /put: concurrent writes are batched into one log append
+- /get: linearizable reads via ReadIndex (a heartbeat round, no log entry)
+
+/metrics reports the counters raft_client.py's collector scrapes: elections,
+term changes, time without a known leader and heartbeat RTT histograms.
 """
 
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib import request
+from urllib import parse
 import argparse
+import base64
+import bisect
+import http.client
 import json
 import threading
 import time
 import random
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from raft_log import SEGMENT_BYTES, RaftLog
+from state_machine import KVStateMachine
+from timers import Timer, TimerQueue
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
@@ -27,6 +55,19 @@ ELECTION_TIMEOUT_MIN = 150  # ms [cite: 62]
 ELECTION_TIMEOUT_MAX = 300  # ms [cite: 62]
 HEARTBEAT_INTERVAL = 50     # ms [cite: 62]
 
+RPC_TIMEOUT = 0.5           # s, one AppendEntries round trip (including the follower's fsync)
+VOTE_TIMEOUT = 0.1          # s an election round waits for vote replies
+MAX_BATCH = 512             # entries per AppendEntries request
+PIPELINE_DEPTH = 4          # AppendEntries requests in flight per follower
+APPEND_WAIT = 0.05          # s a follower waits for an earlier pipelined batch that is still on its way
+PROPOSE_TIMEOUT = 5.0       # s a client proposal waits to be committed
+READ_TIMEOUT = 1.0          # s a ReadIndex read waits for a majority to confirm leadership
+SNAPSHOT_THRESHOLD = 10000  # entries applied since the last snapshot that trigger a new one (0: never)
+SNAPSHOT_CHUNK = 64 * 1024  # bytes of snapshot file per InstallSnapshot request
+PREVOTE = True              # run a PreVote round before each election (Raft thesis, section 9.6)
+CHECK_QUORUM = True         # leader steps down without a majority; followers stick to a live leader
+RTT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500)  # heartbeat RTT histogram upper bounds (+ overflow)
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Node State
 # ─────────────────────────────────────────────────────────────────────────────
@@ -37,18 +78,52 @@ class Role(Enum):
     LEADER = "leader"
 
 lock = threading.Lock()
+state_cond = threading.Condition(lock)  # notified when the log, commit index or role changes (Replicators have their own)
 
 NODE_ID: str = ""
 PEERS: List[str] = []
+STARTED = time.time()  # lets /metrics scrapers tell a restart (counters back at zero) from a gap
 
-# Persistent state
+# Persistent state (saved in LOG's data directory before the node acts on it)
 current_term: int = 0
 voted_for: Optional[str] = None
+LOG: Optional[RaftLog] = None
 
 # Volatile state
 role: Role = Role.FOLLOWER
 current_leader: Optional[str] = None
-last_heartbeat: float = 0.0
+last_heartbeat: float = 0.0         # time.monotonic() of the last leader contact or granted vote
+election_timeout: float = 0.0       # s, re-randomized for every election
+election_started: float = 0.0       # time.monotonic() of the last PreVote or election this node started
+election_timer: Optional[Timer] = None
+TIMERS: Optional[TimerQueue] = None
+commit_index: int = 0
+SM = KVStateMachine()               # applied up to SM.last_applied == commit_index
+snapshot_cond = threading.Condition(lock)  # notified when SNAPSHOT_THRESHOLD more entries are applied
+
+# Leader state: one Replicator (nextIndex, matchIndex, in-flight requests) per peer
+REPLICATORS: Dict[str, "Replicator"] = {}
+
+# Leader state: client proposals waiting for the batcher to append them
+propose_cond = threading.Condition(lock)
+PENDING: List["Proposal"] = []
+batch_stats = {"appends": 0, "proposals": 0, "commands": 0}
+read_stats = {"reads": 0}
+
+# Election counters (reported in /status)
+election_stats = {"prevotes": 0, "prevotes_lost": 0, "elections": 0, "quorum_lost": 0, "votes_ignored": 0,
+                  "term_changes": 0}
+leaderless_since: Optional[float] = None  # time.monotonic() since when this node has known no leader
+leaderless_total: float = 0.0             # s without a known leader before that
+
+# Fault injection (--fault-injection): an isolated node can reach no peer and no peer can reach it
+FAULTS_ENABLED = False
+ISOLATED = False
+
+# Vote requests: sent to all peers at once, over kept-alive connections
+VOTE_POOL: Optional[ThreadPoolExecutor] = None
+idle_lock = threading.Lock()
+IDLE_CONNS: Dict[str, List[http.client.HTTPConnection]] = {}
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Helper Functions
@@ -62,209 +137,763 @@ def log(msg: str) -> None:
     """Print timestamped log message."""
     print(f"[{NODE_ID}] term={current_term} role={role.value} | {msg}")
 
+def majority() -> int:
+    return (len(PEERS) + 1) // 2 + 1
+
+def persist() -> None:
+    """Save current_term and voted_for (call with lock held, before replying or acting on them)."""
+    LOG.save_meta(current_term, voted_for)
+
+def set_leader(leader: Optional[str]) -> None:
+    """Lock held: record the known leader, accounting time spent without one."""
+    global current_leader, leaderless_since, leaderless_total
+    now = time.monotonic()
+    if leader is None and leaderless_since is None:
+        leaderless_since = now
+    elif leader is not None and leaderless_since is not None:
+        leaderless_total += now - leaderless_since
+        leaderless_since = None
+    current_leader = leader
+
+def leaderless_seconds() -> float:
+    """Lock held: total time this node has known no leader."""
+    return leaderless_total + (time.monotonic() - leaderless_since if leaderless_since is not None else 0.0)
+
 def become_follower(new_term: int, leader: Optional[str] = None) -> None:
     """Transition to follower state[cite: 17, 30]."""
-    global role, current_term, voted_for, current_leader, last_heartbeat
+    global role, current_term, voted_for, last_heartbeat
     if new_term > current_term:
         current_term = new_term
         voted_for = None
+        election_stats["term_changes"] += 1
+        persist()
     role = Role.FOLLOWER
-    current_leader = leader
-    last_heartbeat = time.time()
+    set_leader(leader)
+    last_heartbeat = time.monotonic()
+    arm_election_timer()
+    state_cond.notify_all()
     log(f"became FOLLOWER (leader={leader})")
 
 def become_candidate() -> None:
     """Transition to candidate state and start election[cite: 18, 22]."""
-    global role, current_term, voted_for, current_leader, last_heartbeat
+    global role, current_term, voted_for, last_heartbeat, election_timeout, election_started
     role = Role.CANDIDATE
     current_term += 1
+    election_stats["elections"] += 1
+    election_stats["term_changes"] += 1
     voted_for = NODE_ID  # Vote for self [cite: 22]
-    current_leader = None
-    last_heartbeat = time.time() # Reset timer to allow election to run
+    persist()
+    set_leader(None)
+    last_heartbeat = election_started = time.monotonic() # Reset timer to allow election to run
+    election_timeout = random_election_timeout()
+    arm_election_timer()
+    state_cond.notify_all()
     log("became CANDIDATE, starting election")
 
 def become_leader() -> None:
     """Transition to leader state[cite: 19, 23]."""
-    global role, current_leader
+    global role
     role = Role.LEADER
-    current_leader = NODE_ID
-    log("became LEADER")
+    set_leader(NODE_ID)
+    for replicator in REPLICATORS.values():
+        replicator.reset(LOG.last_index() + 1)
+    # A no-op entry of the new term lets entries from earlier terms commit (Raft paper, section 8)
+    LOG.append(current_term, [None])
+    if CHECK_QUORUM:
+        term = current_term
+        TIMERS.call_later(HEARTBEAT_INTERVAL / 1000.0, lambda: check_quorum(term))
+    wake_replicators()
+    state_cond.notify_all()
+    log(f"became LEADER (last_index={LOG.last_index()})")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # RPC: Vote Request
 # ─────────────────────────────────────────────────────────────────────────────
 
-def handle_vote_request(term: int, candidate_id: str) -> dict:
+def leader_active() -> bool:
+    """Lock held: this node leads, or heard from its leader within the minimum election timeout."""
+    return role == Role.LEADER or (current_leader is not None and
+                                   time.monotonic() - last_heartbeat < ELECTION_TIMEOUT_MIN / 1000.0)
+
+def handle_vote_request(term: int, candidate_id: str, last_log_index: int = 0, last_log_term: int = 0,
+                        pre_vote: bool = False) -> dict:
     """Handle incoming vote request from a candidate[cite: 48]."""
     global current_term, voted_for, last_heartbeat
     
     with lock:
+        # Only a candidate whose log is at least as up-to-date as ours can hold every committed entry
+        up_to_date = (last_log_term, last_log_index) >= (LOG.last_term(), LOG.last_index())
+        if pre_vote:
+            # Would we vote for it in `term` (its term + 1)? Answering changes nothing here
+            vote_granted = term > current_term and up_to_date and not leader_active()
+            return {"term": current_term, "vote_granted": vote_granted}
+        if CHECK_QUORUM and term > current_term and leader_active():
+            # Our leader is alive: a node rejoining with an inflated term must not depose it
+            election_stats["votes_ignored"] += 1
+            log(f"vote request from {candidate_id} term={term} -> IGNORED (leader {current_leader} active)")
+            return {"term": current_term, "vote_granted": False}
         if term > current_term:
             become_follower(term)
             
         vote_granted = False
         # Grant vote if term is current and haven't voted or already voted for this candidate [cite: 28, 29]
-        if term == current_term and (voted_for is None or voted_for == candidate_id):
+        if term == current_term and (voted_for is None or voted_for == candidate_id) and up_to_date:
             vote_granted = True
             voted_for = candidate_id
-            last_heartbeat = time.time()  # Reset election timeout on granting vote
+            persist()
+            last_heartbeat = time.monotonic()  # Reset election timeout on granting vote
             
         log(f"vote request from {candidate_id} term={term} -> granted={vote_granted}")
         return {"term": current_term, "vote_granted": vote_granted}
 
-def request_votes() -> int:
-    """Send vote requests to all peers[cite: 18, 22]."""
+def rpc(peer: str, path: str, obj: dict, timeout_s: float) -> dict:
+    """POST obj to a peer on a kept-alive connection and return its JSON reply."""
+    if ISOLATED:
+        raise ConnectionError("isolated by fault injection")
+    with idle_lock:
+        idle = IDLE_CONNS.setdefault(peer, [])
+        conn = idle.pop() if idle else None
+    reused = conn is not None
+    if conn is None:
+        parsed = parse.urlparse(peer)
+        conn = http.client.HTTPConnection(parsed.hostname or "127.0.0.1", parsed.port or 80, timeout=timeout_s)
+    elif conn.sock is not None:
+        conn.sock.settimeout(timeout_s)
+    try:
+        conn.request("POST", path, body=json.dumps(obj).encode(), headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        data = json.loads(resp.read().decode())
+    except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine):
+        conn.close()
+        if reused:
+            return rpc(peer, path, obj, timeout_s)  # the peer restarted since: retry on a fresh connection
+        raise
+    except Exception:
+        conn.close()  # a reply may still arrive on it after a timeout, so it cannot be reused
+        raise
+    if resp.status != 200:
+        conn.close()
+        raise RuntimeError(f"HTTP {resp.status}")
+    with idle_lock:
+        IDLE_CONNS[peer].append(conn)
+    return data
+
+def request_votes(pre_vote: bool = False) -> int:
+    """
+    Send vote requests to all peers at once[cite: 18, 22] and count the
+    grants as they come in. Returns as soon as a majority has granted (or a
+    higher term shows up), otherwise after VOTE_TIMEOUT, so an unreachable
+    peer costs one timeout per round instead of one per peer. A PreVote
+    round asks about the next term and changes no state anywhere.
+    """
     votes = 1  # self-vote
-    my_term = current_term
-    
-    for peer in PEERS:
-        url = peer.rstrip("/") + "/vote"
-        payload = json.dumps({"term": my_term, "candidate_id": NODE_ID}).encode()
-        
-        try:
-            req = request.Request(url, data=payload, 
-                                  headers={"Content-Type": "application/json"}, 
-                                  method="POST")
-            with request.urlopen(req, timeout=0.1) as resp:
-                data = json.loads(resp.read().decode())
-                
-                # Check response term - if higher, step down [cite: 30]
-                resp_term = data.get("term", 0)
-                if resp_term > my_term:
-                    with lock:
+    with lock:
+        my_term = current_term
+        last_index, last_term = LOG.last_index(), LOG.last_term()
+    payload = {"term": my_term + 1 if pre_vote else my_term, "candidate_id": NODE_ID,
+               "last_log_index": last_index, "last_log_term": last_term, "pre_vote": pre_vote}
+
+    futures = [VOTE_POOL.submit(rpc, peer.rstrip("/"), "/vote", payload, VOTE_TIMEOUT) for peer in PEERS]
+    try:
+        for future in as_completed(futures, timeout=VOTE_TIMEOUT):
+            try:
+                data = future.result()
+            except Exception:
+                continue  # Peer unreachable
+
+            # Check response term - if higher, step down [cite: 30]
+            resp_term = data.get("term", 0)
+            if resp_term > my_term and not pre_vote:
+                with lock:
+                    if resp_term > current_term:
                         become_follower(resp_term)
-                    return votes
+                return votes
+
+            if data.get("vote_granted"):
+                votes += 1
+                if votes >= majority():
+                    break
+    except FutureTimeout:
+        pass  # the rest did not answer in time
 
-                if data.get("vote_granted"):
-                    votes += 1
-                    
-        except Exception as e:
-            pass # Peer unreachable
-    
     return votes
 
 # ─────────────────────────────────────────────────────────────────────────────
-# RPC: Heartbeat
+# RPC: AppendEntries (log replication; an empty one is the leader's heartbeat)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def handle_heartbeat(term: int, leader_id: str) -> dict:
-    """Handle incoming heartbeat from leader[cite: 48]."""
-    global current_term, role, current_leader, last_heartbeat
-    
+def handle_append_entries(term: int, leader_id: str, prev_log_index: int, prev_log_term: Optional[int],
+                          entries: List[list], leader_commit: int) -> dict:
+    """Handle AppendEntries from a leader; replies only once the accepted entries are durable."""
+    global commit_index, last_heartbeat
+
     with lock:
-        # Reject if leader term is outdated [cite: 29]
         if term < current_term:
-            log(f"heartbeat from {leader_id} term={term} -> REJECTED (current={current_term})")
+            log(f"append from {leader_id} term={term} -> REJECTED (current={current_term})")
             return {"term": current_term, "success": False}
-        
-        # Accept heartbeat: update term and stay/become follower [cite: 24, 30]
-        success = True
-        become_follower(term, leader_id)
-        
-        log(f"heartbeat from {leader_id} term={term} -> success={success}")
-        return {"term": current_term, "success": success}
+        if term > current_term or role != Role.FOLLOWER or current_leader != leader_id:
+            become_follower(term, leader_id)
+        last_heartbeat = time.monotonic()
 
-def send_heartbeats() -> None:
-    """Send heartbeat to all peers[cite: 19]."""
-    my_term = current_term
-    
-    for peer in PEERS:
-        url = peer.rstrip("/") + "/heartbeat"
-        payload = json.dumps({"term": my_term, "leader_id": NODE_ID}).encode()
-        
-        try:
-            req = request.Request(url, data=payload,
-                                  headers={"Content-Type": "application/json"},
-                                  method="POST")
-            with request.urlopen(req, timeout=0.1) as resp:
-                data = json.loads(resp.read().decode())
-                
-                # If peer has higher term, step down immediately [cite: 19, 30]
-                if data.get("term", 0) > my_term:
-                    with lock:
-                        become_follower(data["term"])
-                    return
-                    
-        except Exception as e:
-            pass  # Peer unreachable, continue
+        # Pipelined batches can arrive out of order: give the one before this a moment to land
+        deadline = time.time() + APPEND_WAIT
+        while prev_log_index > LOG.last_index() and current_term == term and time.time() < deadline:
+            state_cond.wait(deadline - time.time())
+        if current_term != term:
+            return {"term": current_term, "success": False}
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Background Loops
-# ─────────────────────────────────────────────────────────────────────────────
+        if prev_log_index < LOG.base_index:
+            # The start of this batch is committed and already in our snapshot: skip that part
+            skip = min(len(entries), LOG.base_index - prev_log_index)
+            entries = entries[skip:]
+            prev_log_index += skip
+            prev_log_term = LOG.term_at(prev_log_index)
 
-def election_loop() -> None:
-    """Monitors heartbeat timeout and triggers elections[cite: 51]."""
-    global last_heartbeat
-    
-    last_heartbeat = time.time()
-    timeout = random_election_timeout()
-    
+        if LOG.term_at(prev_log_index) != prev_log_term:
+            # Consistency check failed: tell the leader where to back up to
+            if prev_log_index > LOG.last_index():
+                conflict = LOG.last_index() + 1
+            else:
+                conflict = LOG.first_index_of_term(prev_log_index)
+            return {"term": current_term, "success": False, "conflict_index": conflict}
+
+        match = LOG.append_entries(prev_log_index, [(t, c) for t, c in entries])
+        if leader_commit > commit_index:
+            commit_index = max(commit_index, min(leader_commit, match))
+            apply_committed()
+        state_cond.notify_all()
+        reply_term = current_term
+
+    LOG.wait_durable(match)
+    return {"term": reply_term, "success": True, "match_index": match}
+
+
+def advance_commit() -> None:
+    """Leader (lock held): commit the highest index a majority stores, if it is from this term."""
+    global commit_index
+    if role != Role.LEADER:
+        return
+    matches = sorted([LOG.durable_index] + [r.match_index for r in REPLICATORS.values()], reverse=True)
+    n = matches[majority() - 1]
+    if n > commit_index and LOG.term_at(n) == current_term:
+        commit_index = n
+        apply_committed()
+        state_cond.notify_all()
+
+
+def apply_committed() -> None:
+    """Lock held: apply entries up to commit_index to the state machine, in log order."""
+    while SM.last_applied < commit_index:
+        index = SM.last_applied + 1
+        for _, command in LOG.entries_from(index, commit_index - SM.last_applied):
+            SM.apply(index, command)
+            index += 1
+    if SNAPSHOT_THRESHOLD and SM.last_applied - LOG.base_index >= SNAPSHOT_THRESHOLD:
+        snapshot_cond.notify()
+
+
+def snapshot_loop() -> None:
+    """
+    Snapshots the state machine once SNAPSHOT_THRESHOLD entries were applied
+    since the last snapshot, then compacts the log behind it. The state is
+    copied under the lock but written to disk outside it.
+    """
     while True:
-        time.sleep(0.01)
-        
+        with snapshot_cond:
+            snapshot_cond.wait_for(lambda: SM.last_applied - LOG.base_index >= SNAPSHOT_THRESHOLD)
+            index, term, state = SM.last_applied, LOG.term_at(SM.last_applied), SM.snapshot()
+        path = LOG.write_snapshot(index, term, state)
         with lock:
-            current_role = role
-            elapsed = time.time() - last_heartbeat
-        
-        if current_role == Role.LEADER:
-            continue
-        
-        # Follower times out -> starts election [cite: 21]
-        if current_role == Role.FOLLOWER and elapsed > timeout:
-            with lock:
-                become_candidate()
-            timeout = random_election_timeout()
-        
-        # Candidate logic: request votes and check majority [cite: 23]
-        if role == Role.CANDIDATE:
-            votes = request_votes()
-            majority = (len(PEERS) + 1) // 2 + 1
-            log(f"got {votes}/{len(PEERS)+1} votes (need {majority})")
-            
-            with lock:
-                if role == Role.CANDIDATE:
-                    if votes >= majority:
-                        become_leader()
+            if index > LOG.base_index:  # unless a snapshot from the leader overtook this one
+                LOG.use_snapshot(path, index, term)
+                log(f"snapshot at index {index} ({LOG.snapshot_bytes} bytes), log compacted")
+
+
+def handle_install_snapshot(term: int, leader_id: str, index: int, snap_term: int, offset: int,
+                            data: bytes, done: bool) -> dict:
+    """
+    Handle one InstallSnapshot chunk (Raft paper, figure 13). Chunks are
+    appended to a temporary file; the last one replaces the state machine
+    and compacts (or discards) the log. Replies with the bytes received so
+    far, so the leader can resume from there.
+    """
+    global commit_index, last_heartbeat
+
+    with lock:
+        if term < current_term:
+            return {"term": current_term, "success": False}
+        if term > current_term or role != Role.FOLLOWER or current_leader != leader_id:
+            become_follower(term, leader_id)
+        last_heartbeat = time.monotonic()
+        if index <= SM.last_applied:
+            return {"term": current_term, "success": True, "done": True}  # we already have all of it
+        if not LOG.receive_snapshot_chunk(offset, data):
+            return {"term": current_term, "success": False, "offset": 0}
+        if not done:
+            return {"term": current_term, "success": True, "offset": offset + len(data)}
+
+    path, index, snap_term, state = LOG.received_snapshot()
+    with lock:
+        if current_term != term or index <= SM.last_applied:
+            return {"term": current_term, "success": False, "offset": 0}
+        LOG.use_snapshot(path, index, snap_term)
+        SM.restore(state, index)
+        commit_index = max(commit_index, index)
+        state_cond.notify_all()
+        log(f"installed snapshot at index {index} from {leader_id} ({LOG.snapshot_bytes} bytes)")
+        return {"term": current_term, "success": True, "done": True}
+
+
+def on_durable(index: int) -> None:
+    """Called by the log's flusher after each group commit."""
+    with lock:
+        advance_commit()
+
+
+class Histogram:
+    """Counts of observations per RTT_BUCKETS_MS bucket, the last one open-ended (lock held to use)."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(RTT_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(RTT_BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+
+    def stats(self) -> dict:
+        return {"buckets_ms": list(RTT_BUCKETS_MS), "counts": list(self.counts),
+                "count": sum(self.counts), "sum_ms": round(self.total_ms, 3)}
+
+
+class Replicator:
+    """
+    Ships the leader's log to one follower.
+
+    Each AppendEntries carries up to MAX_BATCH entries, and up to
+    PIPELINE_DEPTH of them are in flight at once, each on its own keep-alive
+    connection. next_index advances when a batch is sent and match_index
+    when the follower acknowledges it; a rejection moves next_index back to
+    the follower's conflict hint. With nothing new to send, an empty
+    AppendEntries goes out every HEARTBEAT_INTERVAL, or at once when a
+    ReadIndex read is waiting for leadership to be confirmed. A follower
+    that needs entries already compacted into the snapshot gets the
+    snapshot file instead, one SNAPSHOT_CHUNK at a time.
+    """
+
+    def __init__(self, peer: str) -> None:
+        self.peer = peer.rstrip("/")
+        parsed = parse.urlparse(self.peer)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 80
+        self.next_index = 1
+        self.match_index = 0
+        self.inflight = 0
+        self.last_sent = 0.0
+        self.retry_at = 0.0
+        self.failures = 0
+        self.sent_seq = 0       # requests sent to this follower so far (any term)
+        self.acked_seq = 0      # newest of them the follower answered in the leader's term
+        self.confirm_seq = 0    # a ReadIndex read needs request confirm_seq answered (0 = none)
+        self.confirms = 0       # requests sent early only to confirm leadership for reads
+        self.snapshot_index = 0     # snapshot being streamed (the leader's base_index when it started)
+        self.snapshot_offset = 0    # bytes of it the follower has
+        self.snapshots_sent = 0
+        self.last_ack = 0.0         # time.monotonic() of the last reply in the leader's term (CheckQuorum)
+        self.heartbeat_rtt = Histogram()  # round trips of empty AppendEntries (no disk write on either side)
+        self.cond = threading.Condition(lock)  # wakes only this replicator: its reply came back or the log grew
+        self.local = threading.local()  # one connection per pipeline slot
+        self.pool = ThreadPoolExecutor(max_workers=PIPELINE_DEPTH)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def reset(self, next_index: int) -> None:
+        """New leadership (lock held): start from the end of the leader's log."""
+        self.next_index = next_index
+        self.match_index = 0
+        self.retry_at = 0.0
+        self.last_ack = time.monotonic()  # give each follower one CheckQuorum window to answer
+
+    def request_confirm(self) -> int:
+        """Lock held: a read needs a reply to a request sent from now on. Returns that request's number."""
+        seq = self.sent_seq + 1
+        if self.confirm_seq < seq:
+            self.confirm_seq = seq
+            self.cond.notify()
+        return seq
+
+    def _next_request(self) -> Optional[Tuple[dict, int]]:
+        """Lock held: the next AppendEntries to send now and its number, or None."""
+        now = time.time()
+        if role != Role.LEADER or self.inflight >= PIPELINE_DEPTH or now < self.retry_at:
+            return None
+        if self.next_index <= LOG.base_index:
+            return self._snapshot_request(now)
+        heartbeat_due = now - self.last_sent >= HEARTBEAT_INTERVAL / 1000.0
+        confirm_due = self.confirm_seq > self.sent_seq
+        if self.next_index > LOG.last_index() and not heartbeat_due:
+            if not confirm_due:
+                return None
+            self.confirms += 1
+        prev = self.next_index - 1
+        entries = LOG.entries_from(self.next_index, MAX_BATCH)
+        req = {"term": current_term, "leader_id": NODE_ID, "prev_log_index": prev,
+               "prev_log_term": LOG.term_at(prev), "entries": entries, "leader_commit": commit_index}
+        self.next_index += len(entries)
+        self.inflight += 1
+        self.last_sent = now
+        self.sent_seq += 1
+        return req, self.sent_seq
+
+    def _snapshot_request(self, now: float) -> Optional[Tuple[dict, int]]:
+        """Lock held: the next InstallSnapshot chunk. Chunks go one at a time, each after the last is acknowledged."""
+        if self.inflight:
+            return None
+        if self.snapshot_index != LOG.base_index:
+            self.snapshot_index, self.snapshot_offset = LOG.base_index, 0  # a newer snapshot: start over
+        data = LOG.read_snapshot(self.snapshot_offset, SNAPSHOT_CHUNK)
+        req = {"term": current_term, "leader_id": NODE_ID, "last_included_index": LOG.base_index,
+               "last_included_term": LOG.base_term, "offset": self.snapshot_offset,
+               "data": base64.b64encode(data).decode("ascii"),
+               "done": self.snapshot_offset + len(data) >= LOG.snapshot_bytes}
+        self.inflight += 1
+        self.last_sent = now
+        self.sent_seq += 1
+        return req, self.sent_seq
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                req = self._next_request()
+                while req is None:
+                    # Sleep until the next heartbeat or retry is due (or forever as a follower)
+                    wake = max(self.retry_at, self.last_sent + HEARTBEAT_INTERVAL / 1000.0)
+                    self.cond.wait(max(0.001, wake - time.time()) if role == Role.LEADER else None)
+                    req = self._next_request()
+            self.pool.submit(self._send, *req)
+
+    def _post(self, path: str, payload: bytes) -> dict:
+        if ISOLATED:
+            raise ConnectionError("isolated by fault injection")
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=RPC_TIMEOUT)
+        try:
+            conn.request("POST", path, body=payload, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            data = json.loads(resp.read().decode())
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status}")
+            return data
+        except Exception:
+            conn.close()
+            self.local.conn = None
+            raise
+
+    def _send(self, req: dict, seq: int) -> None:
+        try:
+            path = "/snapshot" if "last_included_index" in req else "/append"
+            start = time.perf_counter()
+            data = self._post(path, json.dumps(req).encode())
+            rtt_ms = (time.perf_counter() - start) * 1000
+        except Exception:
+            with state_cond:
+                self.inflight -= 1
+                if current_term == req["term"]:
+                    # Resend from the last acknowledged entry, at most once per heartbeat interval
+                    self.next_index = self.match_index + 1
+                    self.failures += 1
+                    self.retry_at = time.time() + HEARTBEAT_INTERVAL / 1000.0
+                self.cond.notify()
+            return
+        with state_cond:
+            self.inflight -= 1
+            self.failures = 0
+            # If peer has higher term, step down immediately [cite: 19, 30]
+            if data.get("term", 0) > current_term:
+                become_follower(data["term"])
+                return
+            if role == Role.LEADER and current_term == req["term"]:
+                # Any reply in our term shows the follower still took us as leader when it answered
+                self.acked_seq = max(self.acked_seq, seq)
+                self.last_ack = time.monotonic()
+                if not req.get("entries", True):
+                    self.heartbeat_rtt.observe(rtt_ms)
+                if self.confirm_seq:
+                    if seq >= self.confirm_seq:
+                        self.confirm_seq = 0
+                    state_cond.notify_all()  # wake waiting reads
+                if "last_included_index" in req:
+                    if data.get("done"):
+                        self.match_index = max(self.match_index, req["last_included_index"])
+                        self.next_index = max(self.next_index, self.match_index + 1)
+                        self.snapshot_index = self.snapshot_offset = 0
+                        self.snapshots_sent += 1
+                        advance_commit()
                     else:
-                        # Wait remaining timeout or a random one before checking again
-                        remaining = timeout - (time.time() - last_heartbeat)
-                        if remaining > 0:
-                            time.sleep(remaining)
-                        if role == Role.CANDIDATE:  # Recheck after sleep
-                            become_candidate()  # New term
-                            timeout = random_election_timeout()
-
-def leader_loop() -> None:
-    """Sends heartbeats periodically when in leader state[cite: 19, 51]."""
+                        self.snapshot_offset = data.get("offset", 0)
+                elif data.get("success"):
+                    self.match_index = max(self.match_index, data["match_index"])
+                    advance_commit()
+                else:
+                    conflict = data.get("conflict_index", req["prev_log_index"])
+                    self.next_index = max(self.match_index + 1, min(self.next_index, conflict))
+            self.cond.notify()
+
+    def stats(self) -> dict:
+        return {"next_index": self.next_index, "match_index": self.match_index,
+                "inflight": self.inflight, "failures": self.failures, "read_confirms": self.confirms,
+                "snapshots_sent": self.snapshots_sent, "heartbeat_rtt": self.heartbeat_rtt.stats()}
+
+
+def wake_replicators() -> None:
+    """Lock held: the leader's log grew, so every follower has something to send."""
+    for replicator in REPLICATORS.values():
+        replicator.cond.notify()
+
+
+class Proposal:
+    __slots__ = ("commands", "term", "index")
+
+    def __init__(self, commands: List[Any], term: int) -> None:
+        self.commands = commands
+        self.term = term
+        self.index: Optional[int] = None  # index of the last command, once appended
+
+
+def propose(commands: List[Any]) -> dict:
+    """Leader: queue commands for the next log append and wait until they are committed."""
+    with state_cond:
+        if role != Role.LEADER:
+            return {"ok": False, "error": "not leader", "leader": current_leader}
+        proposal = Proposal(commands, current_term)
+        PENDING.append(proposal)
+        propose_cond.notify()
+        state_cond.wait_for(lambda: (proposal.index is not None and commit_index >= proposal.index)
+                            or current_term != proposal.term or role != Role.LEADER, PROPOSE_TIMEOUT)
+        index = proposal.index
+        # In the proposal's own term nothing can have replaced the entry, and it may already be
+        # compacted into a snapshot (term_at() is None then); after a term change, check the log
+        committed = index is not None and commit_index >= index and (
+            current_term == proposal.term or LOG.term_at(index) == proposal.term)
+        if committed:
+            return {"ok": True, "index": index, "term": proposal.term}
+        return {"ok": False, "error": "not committed (leadership lost or timed out)", "index": index}
+
+
+def batch_loop() -> None:
+    """
+    Appends every queued proposal with one LOG.append, so writes that arrive
+    while the previous batch is being handled share a log append (and, in
+    the log's group commit, an fsync and AppendEntries requests).
+    """
     while True:
-        time.sleep(HEARTBEAT_INTERVAL / 1000.0)
-        
-        with lock:
-            if role != Role.LEADER:
-                continue
-        
-        send_heartbeats()
+        with propose_cond:
+            while not PENDING:
+                propose_cond.wait()
+            batch = [p for p in PENDING if p.term == current_term and role == Role.LEADER]
+            PENDING.clear()
+            if not batch:
+                continue  # leadership changed: the waiters see it and give up
+            commands = [c for p in batch for c in p.commands]
+            index = LOG.append(current_term, commands) - len(commands)
+            for p in batch:
+                index += len(p.commands)
+                p.index = index
+            batch_stats["appends"] += 1
+            batch_stats["proposals"] += len(batch)
+            batch_stats["commands"] += len(commands)
+            wake_replicators()
+            state_cond.notify_all()
+
+
+def read_index() -> Optional[int]:
+    """
+    Leader: ReadIndex (Raft thesis, section 6.4). Takes commit_index as the
+    read index, then confirms this node is still leader by getting a
+    heartbeat reply from a majority for a heartbeat sent after the read
+    arrived. Every read waiting at the same time shares that round. Once it
+    returns, the state machine (applied up to commit_index) is at least as
+    new as any write acknowledged before the read. Returns None if this node
+    is not (or stops being) the leader.
+    """
+    with state_cond:
+        if role != Role.LEADER:
+            return None
+        term = current_term
+        # The read index must include everything earlier leaders committed: wait for this term's no-op
+        state_cond.wait_for(lambda: LOG.term_at(commit_index) == term or current_term != term
+                            or role != Role.LEADER, READ_TIMEOUT)
+        if current_term != term or role != Role.LEADER or LOG.term_at(commit_index) != term:
+            return None
+        index = commit_index
+        read_stats["reads"] += 1
+        if majority() > 1:
+            targets = {r: r.request_confirm() for r in REPLICATORS.values()}
+            confirmed = state_cond.wait_for(
+                lambda: current_term != term or role != Role.LEADER
+                or sum(r.acked_seq >= seq for r, seq in targets.items()) + 1 >= majority(), READ_TIMEOUT)
+            if not confirmed or current_term != term or role != Role.LEADER:
+                return None
+        return index
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Elections
+# ─────────────────────────────────────────────────────────────────────────────
+
+def arm_election_timer() -> None:
+    """
+    Lock held: make sure the election timer will fire at the election
+    deadline. Moving last_heartbeat forward does not touch a pending timer;
+    when it fires early it just re-arms for the new deadline, so a follower
+    wakes once per timeout rather than once per heartbeat.
+    """
+    global election_timer
+    if election_timer is None or not election_timer.pending:
+        election_timer = TIMERS.call_at(election_deadline(), on_election_timer)
+
+
+def election_deadline() -> float:
+    """Lock held: election_timeout after the last leader contact, granted vote, or election attempt."""
+    return max(last_heartbeat, election_started) + election_timeout
+
+
+def on_election_timer() -> None:
+    """Election timer fired (timer thread): start an election if the leader went quiet[cite: 51]."""
+    global election_started, election_timeout
+    with lock:
+        if role == Role.LEADER:
+            return  # become_follower re-arms it when this node steps down
+        if time.monotonic() < election_deadline():
+            arm_election_timer()  # heard from a leader (or voted) since this was armed
+            return
+        if PREVOTE:
+            # Ask before raising our term; try again after another timeout if the round fails
+            election_started = time.monotonic()
+            election_timeout = random_election_timeout()
+            arm_election_timer()
+            term = current_term
+            target = run_prevote
+        else:
+            # Follower times out -> starts election; a candidate that did not win starts a new term [cite: 21]
+            become_candidate()
+            term = current_term
+            target = run_election
+    threading.Thread(target=target, args=(term,), daemon=True).start()
+
+
+def run_prevote(term: int) -> None:
+    """
+    PreVote: would a majority vote for us in term + 1? Only then start the
+    real election. A node that cannot win (it is cut off, or the others
+    still hear from a leader) thus never raises its term, and cannot force
+    a healthy leader out with that term when it reconnects.
+    """
+    started = time.monotonic()
+    votes = request_votes(pre_vote=True)
+    with lock:
+        election_stats["prevotes"] += 1
+        if role == Role.LEADER or current_term != term or last_heartbeat > started:
+            return  # a leader showed up meanwhile
+        if votes < majority():
+            election_stats["prevotes_lost"] += 1
+            log(f"prevote got {votes}/{len(PEERS)+1} (need {majority()}), staying in term {term}")
+            return
+        become_candidate()
+        term = current_term
+    run_election(term)
+
+
+def check_quorum(term: int) -> None:
+    """
+    Leader (timer thread), every HEARTBEAT_INTERVAL: step down unless a
+    majority answered within the last ELECTION_TIMEOUT_MAX. A leader cut off
+    from the majority then stops accepting writes it can never commit, and
+    its clients can find the new leader.
+    """
+    with lock:
+        if role != Role.LEADER or current_term != term:
+            return
+        window = ELECTION_TIMEOUT_MAX / 1000.0
+        now = time.monotonic()
+        recent = sum(now - r.last_ack < window for r in REPLICATORS.values()) + 1
+        if recent < majority():
+            election_stats["quorum_lost"] += 1
+            log(f"CheckQuorum: only {recent}/{len(PEERS)+1} nodes answered in {window}s, stepping down")
+            become_follower(current_term)
+            return
+    TIMERS.call_later(HEARTBEAT_INTERVAL / 1000.0, lambda: check_quorum(term))
+
+
+def run_election(term: int) -> None:
+    """Candidate logic: request votes and check majority[cite: 23]. A lost round waits for the timer."""
+    votes = request_votes()
+    log(f"got {votes}/{len(PEERS)+1} votes (need {majority()})")
+    with lock:
+        if role == Role.CANDIDATE and current_term == term and votes >= majority():
+            become_leader()
+
+def set_isolated(isolated: bool) -> None:
+    """Fault injection: cut this node off from its peers (both ways), or reconnect it."""
+    global ISOLATED
+    with lock:
+        ISOLATED = isolated
+        log(f"fault injection: {'ISOLATED from' if isolated else 'reconnected to'} peers")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # HTTP Handler
 # ─────────────────────────────────────────────────────────────────────────────
 
 class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so each Replicator pipeline slot reuses one connection. Headers and
+    # body go out in separate writes, so Nagle must be off or responses stall on delayed ACKs.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
     def _send(self, code: int, obj: dict) -> None:
         data = json.dumps(obj).encode()
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
+        try:
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the caller's RPC timeout expired first
     
     def do_GET(self):
+        if self.path.startswith("/get"):
+            key = parse.parse_qs(parse.urlparse(self.path).query).get("key", [""])[0]
+            if not key:
+                self._send(400, {"ok": False, "error": "key required"})
+                return
+            if read_index() is None:
+                self._send(503, {"ok": False, "error": "not leader", "leader": current_leader})
+                return
+            with lock:
+                found, value = SM.get(key)
+            self._send(200, {"ok": True, "key": key, "found": found, "value": value})
+            return
+        if self.path.startswith("/metrics"):
+            with lock:
+                self._send(200, {
+                    "ok": True, "node": NODE_ID, "time": time.time(), "started": STARTED, "term": current_term,
+                    "role": role.value, "leader": current_leader, "commit_index": commit_index,
+                    "elections": election_stats, "leaderless_s": round(leaderless_seconds(), 3),
+                    "heartbeat_rtt": {p: r.heartbeat_rtt.stats() for p, r in REPLICATORS.items()}
+                    if role == Role.LEADER else {},
+                })
+            return
         if self.path.startswith("/status"):
             with lock:
                 self._send(200, {
                     "ok": True, "node": NODE_ID, "term": current_term,
                     "role": role.value, "leader": current_leader,
-                    "voted_for": voted_for, "peers": PEERS
+                    "voted_for": voted_for, "peers": PEERS,
+                    "commit_index": commit_index, "log": LOG.stats(), "timers": TIMERS.stats(),
+                    "replication": {p: r.stats() for p, r in REPLICATORS.items()} if role == Role.LEADER else None,
+                    "kv": SM.stats(), "batching": batch_stats, "reads": read_stats,
+                    "elections": election_stats, "prevote": PREVOTE, "check_quorum": CHECK_QUORUM,
+                    "isolated": ISOLATED,
                 })
             return
         self._send(404, {"ok": False, "error": "not found"})
@@ -277,6 +906,17 @@ class Handler(BaseHTTPRequestHandler):
         except:
             self._send(400, {"ok": False, "error": "invalid json"})
             return
+
+        if self.path == "/fault":
+            if not FAULTS_ENABLED:
+                self._send(404, {"ok": False, "error": "start the node with --fault-injection"})
+                return
+            set_isolated(bool(body.get("isolate")))
+            self._send(200, {"ok": True, "isolated": ISOLATED})
+            return
+        if ISOLATED and self.path in ("/vote", "/append", "/snapshot"):
+            self._send(503, {"ok": False, "error": "isolated by fault injection"})
+            return
         
         if self.path == "/vote":
             # Validate required fields
@@ -285,17 +925,40 @@ class Handler(BaseHTTPRequestHandler):
             if not candidate_id:
                 self._send(400, {"ok": False, "error": "candidate_id required"})
                 return
-            result = handle_vote_request(term, candidate_id)
+            result = handle_vote_request(term, candidate_id, int(body.get("last_log_index", 0)),
+                                         int(body.get("last_log_term", 0)), bool(body.get("pre_vote")))
             self._send(200, result)
-        elif self.path == "/heartbeat":
-            # Validate required fields
+        elif self.path == "/append":
             term = int(body.get("term", 0))
             leader_id = str(body.get("leader_id", ""))
             if not leader_id:
                 self._send(400, {"ok": False, "error": "leader_id required"})
                 return
-            result = handle_heartbeat(term, leader_id)
+            result = handle_append_entries(term, leader_id, int(body.get("prev_log_index", 0)),
+                                           body.get("prev_log_term"), body.get("entries", []),
+                                           int(body.get("leader_commit", 0)))
             self._send(200, result)
+        elif self.path == "/snapshot":
+            term = int(body.get("term", 0))
+            leader_id = str(body.get("leader_id", ""))
+            if not leader_id:
+                self._send(400, {"ok": False, "error": "leader_id required"})
+                return
+            result = handle_install_snapshot(term, leader_id, int(body["last_included_index"]),
+                                             int(body["last_included_term"]), int(body.get("offset", 0)),
+                                             base64.b64decode(body.get("data", "")), bool(body.get("done")))
+            self._send(200, result)
+        elif self.path == "/put":
+            key = str(body.get("key", ""))
+            if not key:
+                self._send(400, {"ok": False, "error": "key required"})
+                return
+            result = propose([{"op": "put", "key": key, "value": body.get("value")}])
+            self._send(200 if result["ok"] else 503, result)
+        elif self.path == "/propose":
+            commands = body["commands"] if isinstance(body.get("commands"), list) else [body.get("command")]
+            result = propose(commands)
+            self._send(200 if result["ok"] else 503, result)
         else:
             self._send(404, {"ok": False, "error": "not found"})
 
@@ -306,20 +969,59 @@ class Handler(BaseHTTPRequestHandler):
 # ─────────────────────────────────────────────────────────────────────────────
 
 def main():
-    global NODE_ID, PEERS, last_heartbeat
+    global NODE_ID, PEERS, LOG, current_term, voted_for, MAX_BATCH, PIPELINE_DEPTH, VOTE_POOL, TIMERS, election_timeout
+    global commit_index, SNAPSHOT_THRESHOLD, SNAPSHOT_CHUNK, PREVOTE, CHECK_QUORUM, FAULTS_ENABLED
     parser = argparse.ArgumentParser(description="Raft-Lite Node")
     parser.add_argument("--id", required=True)
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=8000)
     parser.add_argument("--peers", default="")
+    parser.add_argument("--data-dir", default="", help="Log, term and vote directory (default: raft-<id>)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Entries per AppendEntries")
+    parser.add_argument("--pipeline-depth", type=int, default=PIPELINE_DEPTH,
+                        help="AppendEntries requests in flight per follower")
+    parser.add_argument("--snapshot-threshold", type=int, default=SNAPSHOT_THRESHOLD,
+                        help="Snapshot after this many newly applied entries (0: never)")
+    parser.add_argument("--snapshot-chunk", type=int, default=SNAPSHOT_CHUNK, help="Bytes per InstallSnapshot")
+    parser.add_argument("--segment-bytes", type=int, default=SEGMENT_BYTES, help="Log segment size")
+    parser.add_argument("--no-prevote", action="store_true", help="Start elections without a PreVote round")
+    parser.add_argument("--no-check-quorum", action="store_true",
+                        help="Leaders never step down on their own; vote requests always count")
+    parser.add_argument("--fault-injection", action="store_true",
+                        help="Enable POST /fault {isolate: true|false} to cut this node off from its peers")
     args = parser.parse_args()
     
     NODE_ID = args.id
     PEERS = [p.strip() for p in args.peers.split(",") if p.strip()]
-    last_heartbeat = time.time()
+    MAX_BATCH = max(1, args.max_batch)
+    PIPELINE_DEPTH = max(1, args.pipeline_depth)
+    PREVOTE = not args.no_prevote
+    CHECK_QUORUM = not args.no_check_quorum
+    FAULTS_ENABLED = args.fault_injection
+    SNAPSHOT_THRESHOLD = max(0, args.snapshot_threshold)
+    SNAPSHOT_CHUNK = max(1, args.snapshot_chunk)
+    LOG = RaftLog(args.data_dir or f"raft-{NODE_ID}", args.segment_bytes, on_durable=on_durable)
+    current_term, voted_for = LOG.load_meta()
+    state = LOG.load_snapshot()
+    if state is not None:
+        SM.restore(state, LOG.base_index)
+        commit_index = LOG.base_index
+    replayed = LOG.recover()
+    LOG.start()
+    log(f"recovered snapshot at {LOG.base_index} and log to {LOG.last_index()} ({replayed} records), "
+        f"voted_for={voted_for}")
+    for peer in PEERS:
+        REPLICATORS[peer] = Replicator(peer)
+    # Twice the peers, so a round can start while the last round's calls to dead peers time out
+    VOTE_POOL = ThreadPoolExecutor(max_workers=2 * max(1, len(PEERS)))
     
-    threading.Thread(target=election_loop, daemon=True).start()
-    threading.Thread(target=leader_loop, daemon=True).start()
+    threading.Thread(target=batch_loop, daemon=True).start()
+    if SNAPSHOT_THRESHOLD:
+        threading.Thread(target=snapshot_loop, daemon=True).start()
+    TIMERS = TimerQueue()
+    election_timeout = random_election_timeout()
+    with lock:
+        become_follower(current_term)
     
     log(f"starting on {args.host}:{args.port} peers={PEERS}")
     ThreadingHTTPServer((args.host, args.port), Handler).serve_forever()
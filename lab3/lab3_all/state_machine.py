@@ -0,0 +1,47 @@
+"""
+Key-value state machine driven by the Raft log.
+
+Every node applies committed entries in log order, so all nodes hold the
+same map once they have applied the same prefix. Commands are JSON objects:
+
+  {"op": "put", "key": "k", "value": <any JSON>}
+
+Anything else in the log (the leader's no-op, raw /propose payloads) is
+skipped, but still advances last_applied.
+
+snapshot() and restore() let the log be compacted: a node restarting from
+(or installing) a snapshot restores the map and applies the log after it.
+"""
+
+from typing import Any, Dict, Tuple
+
+
+class KVStateMachine:
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self.last_applied = 0
+        self.puts = 0
+
+    def apply(self, index: int, command: Any) -> None:
+        if isinstance(command, dict) and command.get("op") == "put":
+            self.data[str(command["key"])] = command.get("value")
+            self.puts += 1
+        self.last_applied = index
+
+    def snapshot(self) -> Dict[str, Any]:
+        """A copy of the state to serialize outside the node lock (values are never mutated in place)."""
+        return {"data": dict(self.data), "puts": self.puts}
+
+    def restore(self, state: Dict[str, Any], index: int) -> None:
+        self.data = dict(state["data"])
+        self.puts = state.get("puts", 0)
+        self.last_applied = index
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(found, value) for key."""
+        if key in self.data:
+            return True, self.data[key]
+        return False, None
+
+    def stats(self) -> dict:
+        return {"keys": len(self.data), "last_applied": self.last_applied, "puts": self.puts}
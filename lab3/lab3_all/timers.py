@@ -0,0 +1,102 @@
+"""
+Deadline timers for the Lab 3 node.
+
+One thread keeps a heap of (deadline, callback) and sleeps until the
+earliest deadline, or until a new, earlier timer is armed. Nothing polls,
+so an idle node wakes up only when a timer is actually due.
+
+Callbacks run on the timer thread and must not block: anything slow (an
+election round, for example) belongs on a thread of its own. Deadlines are
+time.monotonic() values. A cancelled timer stays in the heap and is skipped
+when it comes up.
+
+The queue records how late each callback ran relative to its deadline, so
+timer accuracy can be checked from /status.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+LATENESS_SAMPLES = 1024  # most recent firings kept for the lateness percentiles
+
+
+class Timer:
+    __slots__ = ("deadline", "seq", "callback")
+
+    def __init__(self, deadline: float, seq: int, callback: Optional[Callable[[], None]]) -> None:
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+
+    def __lt__(self, other: "Timer") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+    def cancel(self) -> None:
+        self.callback = None
+
+    @property
+    def pending(self) -> bool:
+        return self.callback is not None
+
+
+class TimerQueue:
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.heap: List[Timer] = []
+        self.seq = itertools.count()
+        self.fired = 0
+        self.lateness: Deque[float] = deque(maxlen=LATENESS_SAMPLES)
+        threading.Thread(target=self._run, daemon=True, name="timers").start()
+
+    def call_at(self, deadline: float, callback: Callable[[], None]) -> Timer:
+        """Run callback on the timer thread at monotonic time `deadline`."""
+        timer = Timer(deadline, next(self.seq), callback)
+        with self.cond:
+            heapq.heappush(self.heap, timer)
+            if self.heap[0] is timer:
+                self.cond.notify()  # earlier than what the thread is sleeping towards
+        return timer
+
+    def call_later(self, delay_s: float, callback: Callable[[], None]) -> Timer:
+        return self.call_at(time.monotonic() + delay_s, callback)
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while True:
+                    while self.heap and not self.heap[0].pending:
+                        heapq.heappop(self.heap)
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    delay = self.heap[0].deadline - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self.cond.wait(delay)
+                timer = heapq.heappop(self.heap)
+                callback, timer.callback = timer.callback, None
+                self.lateness.append(time.monotonic() - timer.deadline)
+                self.fired += 1
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> dict:
+        with self.cond:
+            late = sorted(self.lateness)
+            pending = sum(1 for t in self.heap if t.pending)
+        if not late:
+            return {"fired": self.fired, "pending": pending,
+                    "late_p50_ms": 0.0, "late_p99_ms": 0.0, "late_max_ms": 0.0}
+
+        def pick(pct: float) -> float:
+            return round(late[min(len(late) - 1, int(pct / 100.0 * len(late)))] * 1000, 3)
+
+        return {"fired": self.fired, "pending": pending, "late_p50_ms": pick(50),
+                "late_p99_ms": pick(99), "late_max_ms": round(late[-1] * 1000, 3)}